@@ -5,6 +5,8 @@ from rest_framework import status
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import Http404
 
+from contas.metricas import registrar_erro
+
 
 def custom_api_exception_handler(exc, context):
     # Primeiro, chame o handler de exceção padrão do DRF para obter a resposta base.
@@ -55,4 +57,5 @@ def custom_api_exception_handler(exc, context):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+    registrar_erro(exc, response.status_code)
     return response
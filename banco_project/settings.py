@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,7 +52,7 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "contas.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
@@ -86,10 +87,11 @@ SPECTACULAR_SETTINGS = {
 }
 
 AUTHENTICATION_BACKENDS = [
-    "django.contrib.auth.backends.ModelBackend",
+    "contas.backends.ClienteBackend",
 ]
 
 MIDDLEWARE = [
+    "contas.middleware.MetricasMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -99,6 +101,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "contas.middleware.LeituraAposEscritaMiddleware",
 ]
 
 ROOT_URLCONF = "banco_project.urls"
@@ -137,6 +140,119 @@ DATABASES = {
     )
 }
 
+# SQLite (desenvolvimento): WAL deixa leituras seguirem durante uma escrita e
+# BEGIN IMMEDIATE pega a trava de escrita no início do atomic(). Sem isso,
+# duas transações que leem e depois escrevem (select_for_update não existe no
+# SQLite) falham com "database is locked" em vez de esperar o busy timeout.
+if DATABASES["default"]["ENGINE"].endswith("sqlite3"):
+    DATABASES["default"].setdefault("OPTIONS", {}).update(
+        {
+            "init_command": "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL",
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        }
+    )
+
+# Cache compartilhado entre os workers: CACHE_URL=redis://host:6379/0 (exige o
+# pacote redis). Sem ele, cada processo tem o seu LocMem, e os caches de saldo
+# e de token ficam desligados: com vários workers do gunicorn, a invalidação
+# feita em um não chegaria aos outros.
+CACHE_URL = config("CACHE_URL", default="")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def _cache_compartilhado(alias):
+    backend = CACHES.get(alias, {}).get("BACKEND", "")
+    return bool(backend) and not backend.endswith(("LocMemCache", "DummyCache"))
+
+
+# Réplicas de leitura (contas.replicas): URLs separadas por vírgula, viram os
+# aliases replica_0, replica_1, ... Sem réplicas, tudo vai para a default.
+DATABASE_REPLICA_URLS = config("DATABASE_REPLICA_URLS", default="")
+DATABASE_REPLICAS = []
+for indice, url in enumerate(u for u in DATABASE_REPLICA_URLS.split(",") if u.strip()):
+    DATABASES[f"replica_{indice}"] = dj_database_url.parse(url.strip())
+    DATABASE_REPLICAS.append(f"replica_{indice}")
+
+DATABASE_ROUTERS = ["contas.replicas.RoteadorReplicas"]
+
+# Depois de uma escrita, o cliente lê do primário por esse tempo (segundos),
+# que deve cobrir o atraso de replicação. A marcação fica em CACHES e precisa
+# ser vista por todos os workers: com réplicas, o alias tem de ser compartilhado.
+REPLICA_JANELA_PRIMARIO = config("REPLICA_JANELA_PRIMARIO", default=5, cast=int)
+REPLICA_CACHE_ALIAS = config("REPLICA_CACHE_ALIAS", default="default")
+if DATABASE_REPLICAS and not _cache_compartilhado(REPLICA_CACHE_ALIAS):
+    raise ImproperlyConfigured(
+        "DATABASE_REPLICA_URLS exige REPLICA_CACHE_ALIAS com um cache "
+        "compartilhado entre os workers (CACHE_URL): num cache por processo, a "
+        "leitura logo após uma escrita poderia ir para uma réplica atrasada."
+    )
+
+# Gerenciamento de conexões (vale para a default e as réplicas PostgreSQL):
+#   "nova"        abre e fecha uma conexão por requisição;
+#   "persistente" cada thread reaproveita a sua por DB_CONN_MAX_AGE segundos;
+#   "pool"        pool do psycopg 3 por processo: cada worker do gunicorn tem
+#                 o seu, então o total no banco chega a WEB_WORKERS x DB_POOL_MAX.
+# Nos modos persistente e pool a conexão é testada antes de ser reutilizada.
+DB_CONEXOES = config("DB_CONEXOES", default="nova")
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=60, cast=int)
+DB_POOL_MIN = config("DB_POOL_MIN", default=2, cast=int)
+DB_POOL_MAX = config("DB_POOL_MAX", default=10, cast=int)
+# Espera máxima (segundos) por uma conexão livre antes de falhar a requisição.
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=10.0, cast=float)
+# Conexões são recicladas depois desse tempo de vida / tempo ociosas (segundos).
+DB_POOL_MAX_LIFETIME = config("DB_POOL_MAX_LIFETIME", default=1800.0, cast=float)
+DB_POOL_MAX_IDLE = config("DB_POOL_MAX_IDLE", default=600.0, cast=float)
+
+for _banco in DATABASES.values():
+    if DB_CONEXOES == "persistente":
+        _banco["CONN_MAX_AGE"] = DB_CONN_MAX_AGE
+        _banco["CONN_HEALTH_CHECKS"] = True
+    elif DB_CONEXOES == "pool" and _banco["ENGINE"].endswith("postgresql"):
+        # Exige psycopg 3 com psycopg-pool; o pool não aceita CONN_MAX_AGE.
+        _banco["CONN_MAX_AGE"] = 0
+        _banco["CONN_HEALTH_CHECKS"] = True
+        _banco.setdefault("OPTIONS", {})["pool"] = {
+            "min_size": DB_POOL_MIN,
+            "max_size": DB_POOL_MAX,
+            "timeout": DB_POOL_TIMEOUT,
+            "max_lifetime": DB_POOL_MAX_LIFETIME,
+            "max_idle": DB_POOL_MAX_IDLE,
+        }
+
+
+# Password hashing
+# SENHA_HASHER escolhe o hasher usado para novos hashes; os demais continuam
+# aceitos na verificação e são migrados no próximo login (rehash transparente).
+# argon2 e bcrypt exigem os pacotes argon2-cffi / bcrypt instalados.
+
+HASHERS_DISPONIVEIS = {
+    "pbkdf2": "contas.hashers.PBKDF2ConfiguravelPasswordHasher",
+    "scrypt": "contas.hashers.ScryptConfiguravelPasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "bcrypt": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+}
+SENHA_HASHER = config("SENHA_HASHER", default="pbkdf2")
+PASSWORD_HASHERS = [HASHERS_DISPONIVEIS[SENHA_HASHER]] + [
+    hasher for nome, hasher in HASHERS_DISPONIVEIS.items() if nome != SENHA_HASHER
+]
+SENHA_PBKDF2_ITERACOES = config("SENHA_PBKDF2_ITERACOES", default=1_000_000, cast=int)
+SENHA_SCRYPT_WORK_FACTOR = config("SENHA_SCRYPT_WORK_FACTOR", default=2**14, cast=int)
+
+# Limite de concorrência do hashing de senhas (contas.hashers.PoolHashing):
+# hashes simultâneos, logins em espera e o tempo até o 503. 0 workers = inline.
+SENHA_POOL_WORKERS = config("SENHA_POOL_WORKERS", default=4, cast=int)
+SENHA_POOL_FILA = config("SENHA_POOL_FILA", default=32, cast=int)
+SENHA_POOL_TIMEOUT = config("SENHA_POOL_TIMEOUT", default=5.0, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -189,3 +305,63 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "contas.Cliente"
 
 INTERNAL_IPS = ["127.0.0.1"]
+
+# Retentativa de transações abortadas por deadlock/falha de serialização
+TRANSACAO_MAX_TENTATIVAS = config("TRANSACAO_MAX_TENTATIVAS", default=3, cast=int)
+TRANSACAO_RETENTATIVA_ESPERA_BASE = config(
+    "TRANSACAO_RETENTATIVA_ESPERA_BASE", default=0.05, cast=float
+)
+
+# Cache de autenticação por token (contas.authentication.CachedTokenAuthentication)
+# O alias de CACHES é o segundo nível compartilhado entre workers e guarda a
+# geração de cada token, conferida a cada acerto do LRU local. Sem ele um
+# logout não chegaria aos LRUs dos outros workers, então o cache fica
+# desligado (TTL 0) e só pode ser ligado com DEBUG.
+TOKEN_AUTH_CACHE_ALIAS = (
+    config("TOKEN_AUTH_CACHE_ALIAS", default="default" if CACHE_URL else "") or None
+)
+_TOKEN_CACHE_COMPARTILHADO = bool(TOKEN_AUTH_CACHE_ALIAS) and _cache_compartilhado(
+    TOKEN_AUTH_CACHE_ALIAS
+)
+TOKEN_AUTH_CACHE_TTL = config(
+    "TOKEN_AUTH_CACHE_TTL",
+    default=30 if _TOKEN_CACHE_COMPARTILHADO else 0,
+    cast=int,
+)
+if TOKEN_AUTH_CACHE_TTL > 0 and not _TOKEN_CACHE_COMPARTILHADO and not DEBUG:
+    raise ImproperlyConfigured(
+        "TOKEN_AUTH_CACHE_TTL > 0 exige TOKEN_AUTH_CACHE_ALIAS com um cache "
+        "compartilhado entre os workers; o cache local só é aceito com DEBUG."
+    )
+TOKEN_AUTH_CACHE_MAX_ENTRADAS = config(
+    "TOKEN_AUTH_CACHE_MAX_ENTRADAS", default=10000, cast=int
+)
+
+# Tempo (em segundos) que uma resposta com Idempotency-Key fica disponível
+# para repetição (contas.idempotencia). Chaves vencidas são removidas por
+# `manage.py limpar_chaves_idempotencia`.
+IDEMPOTENCIA_TTL = config("IDEMPOTENCIA_TTL", default=86400, cast=int)
+
+# Cache de saldo por conta (contas.services.cache_saldo_service). 0 desliga.
+# Ligado por padrão só com cache compartilhado: num cache por processo, um
+# depósito atendido por um worker não atualizaria o saldo em cache nos outros.
+SALDO_CACHE_ALIAS = config("SALDO_CACHE_ALIAS", default="default")
+SALDO_CACHE_TTL = config(
+    "SALDO_CACHE_TTL",
+    default=60 if _cache_compartilhado(SALDO_CACHE_ALIAS) else 0,
+    cast=int,
+)
+if SALDO_CACHE_TTL > 0 and not _cache_compartilhado(SALDO_CACHE_ALIAS) and not DEBUG:
+    raise ImproperlyConfigured(
+        "SALDO_CACHE_TTL > 0 exige um cache compartilhado entre os workers "
+        "(CACHE_URL ou SALDO_CACHE_ALIAS); o cache local só é aceito com DEBUG."
+    )
+
+# /metrics (contas.metricas). O Prometheus precisa mandar
+# "Authorization: Bearer <token>"; vazio nega todo acesso, exceto com DEBUG.
+METRICAS_TOKEN = config("METRICAS_TOKEN", default="")
+
+# Arquivo frio (contas.services.arquivamento_service): diretório dos segmentos
+# de transações antigas movidas por `manage.py arquivar_transacoes`. Precisa
+# ser persistente e visível por todos os workers que servem extratos.
+ARQUIVO_FRIO_DIR = config("ARQUIVO_FRIO_DIR", default=str(BASE_DIR / "arquivo_frio"))
@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
+from contas.metricas import metricas
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularRedocView,
@@ -9,6 +10,7 @@ from drf_spectacular.views import (
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metricas, name="metricas"),
     path("api/", include("contas.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path(
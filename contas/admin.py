@@ -1,21 +1,55 @@
 from django.contrib import admin
-from .models import Cliente, ContaBancaria, Transacao
+from .models import Cliente, ContaBancaria, SaldoDiario, SegmentoArquivado, Transacao
+from .replicas import leitura_replica
+
+
+class LeituraReplicaAdmin(admin.ModelAdmin):
+    # As listagens (GET) leem de uma réplica. O TemplateResponse é renderizado
+    # ainda dentro do bloco, porque as consultas da lista só rodam na renderização.
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            return super().changelist_view(request, extra_context)
+        with leitura_replica(request.user.pk):
+            response = super().changelist_view(request, extra_context)
+            if hasattr(response, "render"):
+                response.render()
+            return response
 
 
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
+class ClienteAdmin(LeituraReplicaAdmin):
     list_display = ("nome", "cpf", "email")
     search_fields = ("nome", "cpf")
 
 
 @admin.register(ContaBancaria)
-class ContaBancariaAdmin(admin.ModelAdmin):
+class ContaBancariaAdmin(LeituraReplicaAdmin):
     list_display = ("numero_conta", "cliente", "saldo")
     search_fields = ("numero_conta", "cliente__nome")
+    list_select_related = ("cliente",)
 
 
 @admin.register(Transacao)
-class TransacaoAdmin(admin.ModelAdmin):
+class TransacaoAdmin(LeituraReplicaAdmin):
     list_display = ("conta", "tipo", "valor", "data")
     search_fields = ("conta__numero_conta",)
     list_filter = ("tipo",)
+    list_select_related = ("conta__cliente",)
+    show_full_result_count = False
+
+
+@admin.register(SaldoDiario)
+class SaldoDiarioAdmin(LeituraReplicaAdmin):
+    list_display = ("conta", "data", "saldo")
+    search_fields = ("conta__numero_conta",)
+    list_select_related = ("conta__cliente",)
+
+
+@admin.register(SegmentoArquivado)
+class SegmentoArquivadoAdmin(LeituraReplicaAdmin):
+    # Só consulta: o arquivo e o índice são gravados por arquivar_transacoes.
+    list_display = ("conta_inicial", "conta_final", "data_limite", "transacoes")
+    readonly_fields = [campo.name for campo in SegmentoArquivado._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
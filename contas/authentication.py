@@ -0,0 +1,243 @@
+import copy
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+from contas.metricas import EVENTOS_CACHE
+
+PREFIXO_CACHE = "token-auth:"
+EVENTOS = ("hits", "hits_compartilhado", "misses", "remocoes_lru", "invalidacoes")
+
+
+class CacheLRU:
+    """LRU em memória com expiração por entrada, seguro entre threads."""
+
+    def __init__(self, max_entradas, ttl):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def definir(self, chave, valor):
+        with self._lock:
+            self._dados[chave] = (valor, time.monotonic() + self.ttl)
+            self._dados.move_to_end(chave)
+            removidas = 0
+            while len(self._dados) > self.max_entradas:
+                self._dados.popitem(last=False)
+                removidas += 1
+            return removidas
+
+    def remover(self, chave):
+        with self._lock:
+            return self._dados.pop(chave, None) is not None
+
+    def __len__(self):
+        return len(self._dados)
+
+
+_cache_local = None
+_lock_cache = threading.Lock()
+_estatisticas = Counter()
+_lock_estatisticas = threading.Lock()
+
+
+def _contar(evento, quantidade=1):
+    with _lock_estatisticas:
+        _estatisticas[evento] += quantidade
+    EVENTOS_CACHE.labels("token", evento).inc(quantidade)
+
+
+def _obter_cache_local():
+    global _cache_local
+    with _lock_cache:
+        if _cache_local is None:
+            _cache_local = CacheLRU(
+                settings.TOKEN_AUTH_CACHE_MAX_ENTRADAS, settings.TOKEN_AUTH_CACHE_TTL
+            )
+        return _cache_local
+
+
+def _cache_compartilhado():
+    alias = settings.TOKEN_AUTH_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def _chave_geracao(key):
+    return f"{PREFIXO_CACHE}geracao:{key}"
+
+
+def _geracao(compartilhado, key):
+    return None if compartilhado is None else compartilhado.get(_chave_geracao(key))
+
+
+def invalidar_token(key):
+    removido = _obter_cache_local().remover(key)
+    compartilhado = _cache_compartilhado()
+    if compartilhado is not None:
+        # Os LRUs dos outros workers conferem a geração a cada acerto: trocá-la
+        # derruba a cópia deles já na próxima requisição. Ela dura mais que
+        # qualquer entrada gravada antes da troca.
+        compartilhado.set(
+            _chave_geracao(key), time.time_ns(), 2 * settings.TOKEN_AUTH_CACHE_TTL
+        )
+        compartilhado.delete(PREFIXO_CACHE + key)
+    if removido:
+        _contar("invalidacoes")
+
+
+def invalidar_clientes(cliente_ids):
+    """
+    Invalida os tokens dos clientes. Os sinais já cuidam de save/delete; use
+    depois de alterações em massa, como QuerySet.update(is_active=False).
+    """
+    chaves = Token.objects.filter(user_id__in=cliente_ids).values_list("key", flat=True)
+    for key in chaves:
+        invalidar_token(key)
+
+
+def limpar_cache_token():
+    global _cache_local
+    with _lock_cache:
+        _cache_local = None
+    with _lock_estatisticas:
+        _estatisticas.clear()
+
+
+def obter_estatisticas_cache_token():
+    with _lock_estatisticas:
+        estatisticas = {evento: _estatisticas[evento] for evento in EVENTOS}
+    estatisticas["entradas"] = len(_obter_cache_local())
+    return estatisticas
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication que guarda token → usuário em um LRU local com TTL,
+    apoiado no cache do Django (TOKEN_AUTH_CACHE_ALIAS) compartilhado entre
+    workers. Logout, rotação de token e alterações no cliente invalidam a
+    entrada via sinais (ver contas/signals.py) e trocam a geração do token no
+    cache compartilhado, conferida a cada acerto local: a revogação vale em
+    todos os workers na requisição seguinte. Sem cache compartilhado, o LRU só
+    é usado com DEBUG (ver TOKEN_AUTH_CACHE_TTL nas settings).
+    """
+
+    def authenticate_credentials(self, key):
+        encontrado = None
+        entrada = _obter_cache_local().obter(key)
+        if entrada is not None:
+            geracao = _geracao(_cache_compartilhado(), key)
+            encontrado = _acerto_local(entrada, geracao)
+        if encontrado is None:
+            encontrado = self.carregar_credenciais(key)
+        return _validar_credenciais(encontrado)
+
+    def carregar_credenciais(self, key):
+        if settings.TOKEN_AUTH_CACHE_TTL <= 0:
+            return super().authenticate_credentials(key)
+        # Falta no LRU local: tenta o cache compartilhado e, por fim, o banco.
+        # A geração é lida antes do banco: se uma invalidação acontecer no
+        # meio do caminho, a entrada gravada aqui já nasce vencida.
+        compartilhado = _cache_compartilhado()
+        geracao = entrada = None
+        if compartilhado is not None:
+            valores = compartilhado.get_many([_chave_geracao(key), PREFIXO_CACHE + key])
+            geracao = valores.get(_chave_geracao(key))
+            entrada = valores.get(PREFIXO_CACHE + key)
+        if entrada is not None and entrada[1] == geracao:
+            _contar("hits_compartilhado")
+            encontrado = entrada[0]
+        else:
+            _contar("misses")
+            encontrado = super().authenticate_credentials(key)
+            if compartilhado is not None:
+                compartilhado.set(
+                    PREFIXO_CACHE + key,
+                    (encontrado, geracao),
+                    settings.TOKEN_AUTH_CACHE_TTL,
+                )
+        removidas = _obter_cache_local().definir(key, (encontrado, geracao))
+        if removidas:
+            _contar("remocoes_lru", removidas)
+        return encontrado
+
+
+def _acerto_local(entrada, geracao_atual):
+    encontrado, geracao = entrada
+    if geracao != geracao_atual:
+        return None
+    _contar("hits")
+    return encontrado
+
+
+def _validar_credenciais(encontrado):
+    user, token = encontrado
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+    # Cada requisição recebe sua própria cópia, para que alterações feitas
+    # pela view não vazem para outras requisições via cache.
+    user = copy.copy(user)
+    token = copy.copy(token)
+    token.user = user
+    return user, token
+
+
+async def autenticar_token_async(request):
+    """
+    Equivalente assíncrono de CachedTokenAuthentication.authenticate para
+    views async do Django. Um acerto no LRU local só confere a geração no
+    cache compartilhado (aget); a falta vai para uma thread (cache
+    compartilhado e banco).
+    """
+    autenticador = CachedTokenAuthentication()
+    auth = get_authorization_header(request).split()
+    if not auth or auth[0].lower() != autenticador.keyword.lower().encode():
+        return None
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed(
+            _("Invalid token header. No credentials provided.")
+        )
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        raise exceptions.AuthenticationFailed(
+            _(
+                "Invalid token header. Token string should not contain invalid characters."
+            )
+        )
+
+    encontrado = None
+    entrada = _obter_cache_local().obter(key)
+    if entrada is not None:
+        compartilhado = _cache_compartilhado()
+        geracao = None
+        if compartilhado is not None:
+            geracao = await compartilhado.aget(_chave_geracao(key))
+        encontrado = _acerto_local(entrada, geracao)
+    if encontrado is None:
+        encontrado = await sync_to_async(autenticador.carregar_credenciais)(key)
+    return _validar_credenciais(encontrado)
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from contas.hashers import gerar_hash_senha, verificar_senha
+
+UserModel = get_user_model()
+
+
+class ClienteBackend(ModelBackend):
+    """
+    ModelBackend que verifica a senha no pool de hashing (contas.hashers) e
+    regrava o hash quando o hasher ou o custo configurado mudaram.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Mesmo custo de um usuário existente, contra enumeração por tempo.
+            gerar_hash_senha(password)
+            return None
+
+        correta, precisa_rehash = verificar_senha(password, user.password)
+        if not correta:
+            return None
+
+        if precisa_rehash:
+            # O hash é calculado no pool; o save fica na thread da requisição,
+            # que é dona da conexão com o banco.
+            user.password = gerar_hash_senha(password)
+            user.save(update_fields=["password"])
+
+        if self.user_can_authenticate(user):
+            return user
+        return None
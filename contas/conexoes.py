@@ -0,0 +1,50 @@
+import os
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+
+# Estatísticas de conexões com o banco deste processo (cada worker do gunicorn
+# tem as suas). "conexoes_obtidas" conta quantas vezes o Django pegou uma
+# conexão: no modo nova é uma conexão aberta por requisição, no persistente
+# só quando a anterior venceu, no pool cada retirada do pool. No modo pool vêm
+# também as métricas do psycopg_pool: conexões abertas de fato
+# (connections_num), livres (pool_available), requisições esperando
+# (requests_waiting) e o tempo total de espera por uma conexão (requests_wait_ms).
+
+_obtidas = Counter()
+_lock_obtidas = threading.Lock()
+
+
+def registrar_conexao_obtida(alias):
+    with _lock_obtidas:
+        _obtidas[alias] += 1
+
+
+def zerar_estatisticas_conexoes():
+    with _lock_obtidas:
+        _obtidas.clear()
+
+
+def _estatisticas_pool(alias):
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return None
+    return pool.get_stats()
+
+
+def obter_estatisticas_conexoes():
+    with _lock_obtidas:
+        obtidas = dict(_obtidas)
+    return {
+        "pid": os.getpid(),
+        "modo": settings.DB_CONEXOES,
+        "bancos": {
+            alias: {
+                "conexoes_obtidas": obtidas.get(alias, 0),
+                "pool": _estatisticas_pool(alias),
+            }
+            for alias in connections
+        },
+    }
@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+    make_password,
+    verify_password,
+)
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PBKDF2ConfiguravelPasswordHasher(PBKDF2PasswordHasher):
+    # Mesmo algoritmo (pbkdf2_sha256) do hasher padrão, então hashes existentes
+    # continuam válidos; mudar SENHA_PBKDF2_ITERACOES faz o Django regravar o
+    # hash no próximo login bem-sucedido.
+    @property
+    def iterations(self):
+        return settings.SENHA_PBKDF2_ITERACOES
+
+
+class ScryptConfiguravelPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.SENHA_SCRYPT_WORK_FACTOR
+
+
+class AutenticacaoSobrecarregada(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Serviço de autenticação sobrecarregado. Tente novamente."
+    default_code = "autenticacao_sobrecarregada"
+
+
+class PoolHashing:
+    """
+    Limita a concorrência do hashing de senhas: no máximo `workers` hashes são
+    calculados ao mesmo tempo (PBKDF2 e scrypt liberam o GIL dentro do
+    OpenSSL, então eles rodam em paralelo de fato) e no máximo `workers` +
+    `fila` requisições ficam admitidas. A thread da requisição continua
+    bloqueada até o resultado; o que o pool evita é que um pico de logins
+    dispute a CPU sem limite. Quem não consegue vaga em SENHA_POOL_TIMEOUT
+    segundos recebe 503 na hora, em vez de esperar na fila.
+    """
+
+    def __init__(self, workers, fila, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="hash-senha"
+        )
+        self._vagas = threading.BoundedSemaphore(workers + fila)
+
+    def executar(self, func, *args):
+        if not self._vagas.acquire(timeout=self.timeout):
+            raise AutenticacaoSobrecarregada()
+        try:
+            # Espera aqui, ocupando a vaga, até o hash terminar.
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._vagas.release()
+
+
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def _obter_pool():
+    global _pool
+    with _lock_pool:
+        if _pool is None and settings.SENHA_POOL_WORKERS > 0:
+            _pool = PoolHashing(
+                settings.SENHA_POOL_WORKERS,
+                settings.SENHA_POOL_FILA,
+                settings.SENHA_POOL_TIMEOUT,
+            )
+        return _pool
+
+
+def _executar(func, *args):
+    pool = _obter_pool()
+    if pool is None:
+        return func(*args)
+    return pool.executar(func, *args)
+
+
+def verificar_senha(senha, encoded):
+    """Retorna (senha_correta, precisa_rehash), calculado no pool."""
+    return _executar(verify_password, senha, encoded)
+
+
+def gerar_hash_senha(senha):
+    return _executar(make_password, senha)
+
+
+def encerrar_pool_hashing():
+    # O próximo uso recria o pool com os settings vigentes.
+    global _pool
+    with _lock_pool:
+        if _pool is not None:
+            _pool._executor.shutdown(wait=True)
+        _pool = None
@@ -0,0 +1,114 @@
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from contas.models import ChaveIdempotencia
+from contas.services.retentativa import com_retentativa
+
+HEADER_CHAVE = "Idempotency-Key"
+HEADER_REPETIDA = "Idempotent-Replayed"
+TAMANHO_MAXIMO_CHAVE = 255
+
+
+class ChaveIdempotenciaReutilizada(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "Idempotency-Key já usada em uma requisição diferente."
+    default_code = "chave_idempotencia_reutilizada"
+
+
+def _para_json(dados):
+    # Mesmo encoder do JSONRenderer: a repetição renderiza os mesmos bytes.
+    return json.dumps(dados, cls=JSONEncoder)
+
+
+def _hash_requisicao(request):
+    corpo = json.dumps(request.data, sort_keys=True, cls=JSONEncoder)
+    return hashlib.sha256(corpo.encode()).hexdigest()
+
+
+def _buscar(cliente, chave):
+    registro = ChaveIdempotencia.objects.filter(cliente=cliente, chave=chave).first()
+    if registro is not None and registro.expira_em <= timezone.now():
+        # Vencida: libera a chave para uma nova operação.
+        registro.delete()
+        return None
+    return registro
+
+
+def _repetir(registro, escopo, hash_requisicao):
+    if registro.escopo != escopo or registro.hash_requisicao != hash_requisicao:
+        raise ChaveIdempotenciaReutilizada()
+    return Response(
+        json.loads(registro.resposta),
+        status=registro.status_code,
+        headers={HEADER_REPETIDA: "true"},
+    )
+
+
+@com_retentativa("idempotencia", ChaveIdempotencia)
+def _executar_e_registrar(view, args, kwargs, registro):
+    # A chave é gravada na mesma transação da operação: ou as duas ficam, ou
+    # nenhuma. Respostas de erro não são guardadas, então podem ser repetidas.
+    with transaction.atomic():
+        response = view(*args, **kwargs)
+        if status.is_success(response.status_code):
+            registro.status_code = response.status_code
+            registro.resposta = _para_json(response.data)
+            registro.expira_em = timezone.now() + timedelta(
+                seconds=settings.IDEMPOTENCIA_TTL
+            )
+            registro.save(force_insert=True)
+    return response
+
+
+def idempotente(view):
+    """
+    Suporte ao header Idempotency-Key em endpoints que movimentam dinheiro.
+
+    A primeira requisição com uma chave executa a operação e guarda a resposta
+    por IDEMPOTENCIA_TTL segundos; as repetições (mesmo cliente, chave, rota e
+    corpo) devolvem a resposta guardada sem tocar nas contas. Duas requisições
+    simultâneas com a mesma chave esbarram na restrição única: a segunda é
+    desfeita por inteiro e devolve a resposta da primeira.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(arg for arg in args if isinstance(arg, Request))
+        chave = request.headers.get(HEADER_CHAVE)
+        if chave is None:
+            return view(*args, **kwargs)
+        if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+            raise ValidationError(
+                {HEADER_CHAVE: f"Deve ter de 1 a {TAMANHO_MAXIMO_CHAVE} caracteres."}
+            )
+
+        escopo = f"{request.method} {request.path}"
+        hash_requisicao = _hash_requisicao(request)
+        registro = _buscar(request.user, chave)
+        if registro is None:
+            novo = ChaveIdempotencia(
+                cliente=request.user,
+                chave=chave,
+                escopo=escopo,
+                hash_requisicao=hash_requisicao,
+            )
+            try:
+                return _executar_e_registrar(view, args, kwargs, novo)
+            except IntegrityError:
+                registro = _buscar(request.user, chave)
+                if registro is None:
+                    raise
+        return _repetir(registro, escopo, hash_requisicao)
+
+    return wrapper
@@ -0,0 +1,48 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from contas.particionamento import primeiro_dia, remover_particoes_vazias, somar_meses
+from contas.services.arquivamento_service import arquivar_transacoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Move as transações anteriores à data limite para o arquivo frio "
+        "(ARQUIVO_FRIO_DIR), um segmento comprimido por faixa de contas. O "
+        "extrato e a exportação continuam mostrando o histórico arquivado. "
+        "Pode rodar de novo com a mesma data: o que já saiu da tabela é ignorado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--antes-de",
+            type=date.fromisoformat,
+            help="Data limite, YYYY-MM-DD (padrão: dia 1º do mês de 12 meses atrás).",
+        )
+        parser.add_argument(
+            "--contas-por-segmento",
+            type=int,
+            default=1000,
+            help="Contas por arquivo de segmento.",
+        )
+
+    def handle(self, *args, **options):
+        hoje = date.today()
+        data_limite = options["antes_de"] or somar_meses(primeiro_dia(hoje), -12)
+        if data_limite > hoje or options["contas_por_segmento"] < 1:
+            raise CommandError(
+                "--antes-de não pode ser futura e --contas-por-segmento deve ser "
+                "maior que zero."
+            )
+        segmentos = arquivar_transacoes(data_limite, options["contas_por_segmento"])
+        # No PostgreSQL os meses inteiramente arquivados ficam vazios.
+        removidas = remover_particoes_vazias(data_limite)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{sum(segmento.transacoes for segmento in segmentos)} transações "
+                f"anteriores a {data_limite} arquivadas em {len(segmentos)} "
+                f"segmentos; {len(removidas)} partições vazias removidas."
+            )
+        )
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from contas.models import ContaBancaria
+from contas.services.saldo_diario_service import recalcular_saldos_diarios
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói os snapshots de SaldoDiario a partir do histórico de "
+        "transações. Serve como carga inicial e como rotina de fim de dia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--conta",
+            action="append",
+            dest="contas",
+            help="Número da conta a consolidar (pode ser repetido).",
+        )
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=500,
+            help="Quantidade de contas processadas por transação.",
+        )
+
+    def handle(self, *args, **options):
+        contas = ContaBancaria.objects.order_by("pk")
+        if options["contas"]:
+            contas = contas.filter(numero_conta__in=options["contas"])
+        conta_ids = list(contas.values_list("pk", flat=True))
+
+        total = 0
+        lote = options["lote"]
+        for inicio in range(0, len(conta_ids), lote):
+            total += recalcular_saldos_diarios(conta_ids[inicio : inicio + lote])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{total} saldos diários gravados para {len(conta_ids)} contas."
+            )
+        )
@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from contas.particionamento import (
+    criar_particoes_futuras,
+    meses_entre,
+    tabela_particionada,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria com antecedência as partições mensais de contas_transacao "
+        "(PostgreSQL). Pode rodar quantas vezes quiser: meses já criados são "
+        "mantidos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--meses",
+            type=int,
+            default=3,
+            help="Meses à frente do atual a garantir.",
+        )
+        parser.add_argument(
+            "--desde",
+            type=date.fromisoformat,
+            help="Cria também os meses passados a partir desta data (YYYY-MM-DD), "
+            "antes de importar histórico antigo.",
+        )
+
+    def handle(self, *args, **options):
+        if not tabela_particionada():
+            self.stdout.write("Tabela de transações não particionada; nada a fazer.")
+            return
+        hoje = date.today()
+        inicio = min(options["desde"] or hoje, hoje)
+        criadas = criar_particoes_futuras(
+            meses_entre(inicio, hoje) + options["meses"], a_partir=inicio
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(criadas)} partições criadas"
+                + (f": {', '.join(criadas)}." if criadas else ".")
+            )
+        )
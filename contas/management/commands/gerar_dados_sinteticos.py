@@ -0,0 +1,235 @@
+import itertools
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from contas.models import ContaBancaria, Transacao
+from contas.particionamento import criar_particoes_futuras, meses_entre
+from contas.services.cliente_services import criar_clientes_em_lote
+from contas.services.saldo_diario_service import recalcular_saldos_diarios
+
+# CPFs sintéticos: "9" seguido do índice do cliente.
+PREFIXO_CPF = "9"
+# Teto do saldo (max_digits=10) com folga; acima dele débitos viram saques.
+SALDO_MAXIMO_CENTAVOS = 9_000_000_000
+# Proporções de depósito, saque e transferência (esta gera duas linhas).
+TIPOS = ("D", "S", "T")
+PESOS_TIPOS = (0.4, 0.3, 0.3)
+
+
+def _centavos(valor):
+    return f"{valor // 100}.{valor % 100:02d}"
+
+
+def _valor(sorteio):
+    # Log-normal: a maioria das operações é pequena, poucas são grandes.
+    return max(1, min(int(sorteio.lognormvariate(8.5, 1.2)), 5_000_000))
+
+
+class Razao:
+    """
+    Gera o histórico em ordem cronológica mantendo o saldo de cada conta em
+    centavos, então saldo_apos e o saldo final fecham por construção. Um
+    débito maior que o saldo vira depósito; nenhuma conta fica negativa.
+    """
+
+    def __init__(self, sorteio, conta_ids, concentracao):
+        self.sorteio = sorteio
+        self.conta_ids = conta_ids
+        self.saldos = dict.fromkeys(conta_ids, 0)
+        # Distribuição de Zipf: a conta de posição k recebe peso 1/k^s; a
+        # ordem é embaralhada para as contas quentes não serem as primeiras pks.
+        pesos = [1 / (k**concentracao) for k in range(1, len(conta_ids) + 1)]
+        sorteio.shuffle(pesos)
+        self.pesos_acumulados = list(itertools.accumulate(pesos))
+
+    def _contas(self, quantidade):
+        return self.sorteio.choices(
+            self.conta_ids, cum_weights=self.pesos_acumulados, k=quantidade
+        )
+
+    def _lancar(self, conta_id, tipo, valor, data):
+        self.saldos[conta_id] += valor if tipo in Transacao.TIPOS_CREDITO else -valor
+        saldo = self.saldos[conta_id]
+        return conta_id, tipo, _centavos(valor), data, _centavos(saldo)
+
+    def _operacao(self, tipo, origem, destino, data):
+        valor = _valor(self.sorteio)
+        saldo = self.saldos[origem]
+        if tipo != "D" and (saldo < valor or destino == origem):
+            tipo = "D"
+        if tipo == "D" and saldo + valor > SALDO_MAXIMO_CENTAVOS:
+            tipo, valor = "S", min(valor, saldo)
+        if tipo != "T":
+            return [self._lancar(origem, tipo, valor, data)]
+        if self.saldos[destino] + valor > SALDO_MAXIMO_CENTAVOS:
+            return [self._lancar(origem, "S", valor, data)]
+        return [
+            self._lancar(origem, "TE", valor, data),
+            self._lancar(destino, "TR", valor, data),
+        ]
+
+    def dia(self, inicio, quantidade):
+        """Linhas de `quantidade` operações no dia que começa em `inicio`."""
+        segundos = sorted(self.sorteio.randrange(86400) for _ in range(quantidade))
+        origens = self._contas(quantidade)
+        destinos = self._contas(quantidade)
+        tipos = self.sorteio.choices(TIPOS, weights=PESOS_TIPOS, k=quantidade)
+        for segundo, tipo, origem, destino in zip(segundos, tipos, origens, destinos):
+            data = inicio + timedelta(seconds=segundo)
+            yield from self._operacao(tipo, origem, destino, data)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera clientes, contas e histórico de transações sintéticos, com "
+        "semente determinística e contas de movimento desigual, para testes "
+        "de desempenho com volume. Saldos e saldo_apos batem com o histórico."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clientes", type=int, default=1000)
+        parser.add_argument(
+            "--transacoes",
+            type=int,
+            default=100_000,
+            help="Operações geradas (cada transferência grava duas linhas).",
+        )
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--dias", type=int, default=365, help="Dias de histórico.")
+        parser.add_argument(
+            "--ate",
+            type=date.fromisoformat,
+            default=None,
+            help="Último dia do histórico, YYYY-MM-DD (padrão: ontem).",
+        )
+        parser.add_argument(
+            "--concentracao",
+            type=float,
+            default=1.1,
+            help="Expoente de Zipf: quanto maior, mais o movimento se concentra.",
+        )
+        parser.add_argument(
+            "--senha",
+            default="sintetico",
+            help="Senha de todos os clientes gerados (para testes de carga).",
+        )
+        parser.add_argument("--lote", type=int, default=10_000)
+        parser.add_argument(
+            "--saldos-diarios",
+            action="store_true",
+            help="Reconstrói também os snapshots de SaldoDiario das contas geradas.",
+        )
+
+    def handle(self, *args, **options):
+        if options["clientes"] < 1 or options["dias"] < 1:
+            raise CommandError("--clientes e --dias devem ser maiores que zero.")
+        sorteio = random.Random(options["seed"])
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            conta_ids = self._criar_contas(options)
+            razao = Razao(sorteio, conta_ids, options["concentracao"])
+            linhas = self._gravar_transacoes(razao, options)
+            ContaBancaria.objects.bulk_update(
+                [
+                    ContaBancaria(pk=conta_id, saldo=Decimal(_centavos(saldo)))
+                    for conta_id, saldo in razao.saldos.items()
+                ],
+                ["saldo"],
+                batch_size=1000,
+            )
+            if options["saldos_diarios"]:
+                for i in range(0, len(conta_ids), 500):
+                    recalcular_saldos_diarios(conta_ids[i : i + 500])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{len(conta_ids)} contas e {linhas} transações geradas em "
+                f"{time.perf_counter() - inicio:.1f}s."
+            )
+        )
+
+    def _criar_contas(self, options):
+        password = make_password(options["senha"])
+        quantidade = options["clientes"]
+        for i in range(0, quantidade, options["lote"]):
+            registros = [
+                {
+                    "cpf": f"{PREFIXO_CPF}{indice:010d}",
+                    "nome": f"Cliente Sintético {indice}",
+                    "email": f"sintetico{indice}@example.com",
+                    "data_nascimento": None,
+                    "password": password,
+                }
+                for indice in range(i, min(i + options["lote"], quantidade))
+            ]
+            _, ignorados = criar_clientes_em_lote(registros)
+            if ignorados:
+                raise CommandError(
+                    "Já existem clientes sintéticos (CPF iniciado por "
+                    f"{PREFIXO_CPF}); remova-os ou use outra base."
+                )
+        return list(
+            ContaBancaria.objects.filter(
+                cliente__cpf__gte=f"{PREFIXO_CPF}{0:010d}",
+                cliente__cpf__lt=f"{PREFIXO_CPF}{quantidade:010d}",
+            )
+            .order_by("pk")
+            .values_list("pk", flat=True)
+        )
+
+    def _dias(self, options):
+        # Até ontem, para nenhuma transação ficar com data no futuro.
+        ultimo = options["ate"] or timezone.localdate() - timedelta(days=1)
+        dias = options["dias"]
+        base, resto = divmod(options["transacoes"], dias)
+        for indice in range(dias):
+            dia = ultimo - timedelta(days=dias - 1 - indice)
+            inicio = timezone.make_aware(datetime.combine(dia, datetime.min.time()))
+            yield inicio, base + (1 if indice < resto else 0)
+
+    def _gravar_transacoes(self, razao, options):
+        # Partições dos meses gerados, para o histórico não cair todo na DEFAULT.
+        dias = list(self._dias(options))
+        primeiro, ultimo = dias[0][0].date(), dias[-1][0].date()
+        criar_particoes_futuras(meses_entre(primeiro, ultimo), a_partir=primeiro)
+        linhas = (
+            linha
+            for inicio, quantidade in dias
+            for linha in razao.dia(inicio, quantidade)
+        )
+        if connection.vendor == "postgresql":
+            return self._copiar(linhas)
+        total = 0
+        while lote := list(itertools.islice(linhas, options["lote"])):
+            Transacao.objects.bulk_create(
+                Transacao(
+                    conta_id=conta_id,
+                    tipo=tipo,
+                    valor=Decimal(valor),
+                    data=data,
+                    saldo_apos=Decimal(saldo_apos),
+                )
+                for conta_id, tipo, valor, data, saldo_apos in lote
+            )
+            total += len(lote)
+        return total
+
+    def _copiar(self, linhas):
+        # COPY é bem mais rápido que INSERT em massa (psycopg 3).
+        tabela = connection.ops.quote_name(Transacao._meta.db_table)
+        total = 0
+        with connection.cursor() as cursor:
+            with cursor.copy(
+                f"COPY {tabela} (conta_id, tipo, valor, data, saldo_apos) FROM STDIN"
+            ) as copia:
+                for linha in linhas:
+                    copia.write_row(linha)
+                    total += 1
+        return total
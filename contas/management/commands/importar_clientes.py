@@ -0,0 +1,181 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import django
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+
+from contas.models import Cliente, validar_cpf
+from contas.services.cliente_services import criar_clientes_em_lote
+
+COLUNAS_OBRIGATORIAS = {"cpf", "nome", "email"}
+
+
+def _ler_checkpoint(caminho):
+    try:
+        with open(caminho) as arquivo:
+            return json.load(arquivo)["linhas"]
+    except FileNotFoundError:
+        return 0
+
+
+def _gravar_checkpoint(caminho, linhas):
+    # Grava em arquivo temporário e renomeia: uma queda no meio da escrita
+    # nunca deixa um checkpoint truncado.
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w") as arquivo:
+        json.dump({"linhas": linhas}, arquivo)
+    os.replace(temporario, caminho)
+
+
+def _registro(linha):
+    """Valida uma linha do CSV e devolve (registro, senha a calcular)."""
+    cpf = (linha.get("cpf") or "").strip()
+    nome = (linha.get("nome") or "").strip()
+    email = Cliente.objects.normalize_email((linha.get("email") or "").strip())
+    validar_cpf(cpf)
+    validate_email(email)
+    if not nome:
+        raise ValidationError("nome é obrigatório.")
+    nascimento = (linha.get("data_nascimento") or "").strip()
+    registro = {
+        "cpf": cpf,
+        "nome": nome,
+        "email": email,
+        "data_nascimento": date.fromisoformat(nascimento) if nascimento else None,
+    }
+    # senha_hash: hash já no formato do Django (ex.: migrado de outro sistema),
+    # gravado como está; senha: texto puro, calculado no pool de processos.
+    senha_hash = (linha.get("senha_hash") or "").strip()
+    if senha_hash:
+        identify_hasher(senha_hash)
+        registro["password"] = senha_hash
+        return registro, None
+    senha = linha.get("senha") or ""
+    if not senha:
+        raise ValidationError("senha ou senha_hash é obrigatório.")
+    return registro, senha
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa clientes de um CSV (cpf, nome, email, senha ou senha_hash, "
+        "data_nascimento opcional), criando cliente, conta e token em lotes. "
+        "Pode ser interrompido e retomado: o progresso fica em um checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("arquivo", help="CSV com cabeçalho.")
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=1000,
+            help="Quantidade de clientes gravados por transação.",
+        )
+        parser.add_argument(
+            "--processos",
+            type=int,
+            default=os.cpu_count(),
+            help="Processos calculando hashes de senha (0 calcula no próprio processo).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Arquivo de progresso (padrão: <arquivo>.checkpoint).",
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"] or f"{options['arquivo']}.checkpoint"
+        self.pular = _ler_checkpoint(checkpoint)
+        if self.pular:
+            self.stdout.write(f"Retomando após a linha {self.pular}.")
+
+        pool = None
+        self.processos = options["processos"]
+        if self.processos > 0:
+            # django.setup no filho cobre também o método spawn/forkserver.
+            pool = ProcessPoolExecutor(self.processos, initializer=django.setup)
+        self.totais = {"criados": 0, "ignorados": 0, "invalidos": 0}
+        inicio = time.perf_counter()
+        try:
+            with open(options["arquivo"], newline="", encoding="utf-8") as arquivo:
+                leitor = csv.DictReader(arquivo)
+                faltantes = COLUNAS_OBRIGATORIAS - set(leitor.fieldnames or ())
+                if faltantes:
+                    raise CommandError(
+                        f"Colunas ausentes: {', '.join(sorted(faltantes))}"
+                    )
+                self._importar(leitor, options["lote"], pool, checkpoint)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{self.totais['criados']} clientes criados, "
+                f"{self.totais['ignorados']} já existentes, "
+                f"{self.totais['invalidos']} linhas inválidas em {segundos:.1f}s."
+            )
+        )
+
+    def _lotes(self, leitor, tamanho):
+        lote = []
+        for numero, linha in enumerate(leitor, start=1):
+            if numero <= self.pular:
+                continue
+            lote.append((numero, linha))
+            if len(lote) == tamanho:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def _preparar(self, lote, pool):
+        # Valida o lote e dispara os hashes; o resultado só é lido em _gravar,
+        # então o pool calcula o próximo lote enquanto o atual é gravado.
+        registros, senhas = [], []
+        for numero, linha in lote:
+            try:
+                registro, senha = _registro(linha)
+            except (ValidationError, ValueError) as exc:
+                self.totais["invalidos"] += 1
+                self.stderr.write(f"Linha {numero} ignorada: {exc}")
+                continue
+            registros.append(registro)
+            if senha is not None:
+                senhas.append((registro, senha))
+        if pool is None:
+            hashes = map(make_password, [senha for _, senha in senhas])
+        else:
+            hashes = pool.map(
+                make_password,
+                [senha for _, senha in senhas],
+                chunksize=max(1, len(senhas) // (4 * self.processos)),
+            )
+        return lote[-1][0], registros, senhas, hashes
+
+    def _gravar(self, preparado, checkpoint):
+        ultima_linha, registros, senhas, hashes = preparado
+        for (registro, _), encoded in zip(senhas, hashes):
+            registro["password"] = encoded
+        criados, ignorados = criar_clientes_em_lote(registros)
+        self.totais["criados"] += criados
+        self.totais["ignorados"] += ignorados
+        _gravar_checkpoint(checkpoint, ultima_linha)
+        self.stdout.write(f"Linha {ultima_linha}: {self.totais['criados']} criados")
+
+    def _importar(self, leitor, tamanho, pool, checkpoint):
+        anterior = None
+        for lote in self._lotes(leitor, tamanho):
+            atual = self._preparar(lote, pool)
+            if anterior is not None:
+                self._gravar(anterior, checkpoint)
+            anterior = atual
+        if anterior is not None:
+            self._gravar(anterior, checkpoint)
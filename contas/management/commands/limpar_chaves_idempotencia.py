@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from contas.models import ChaveIdempotencia
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove as chaves de idempotência vencidas. Pode rodar a qualquer "
+        "momento; as remoções são feitas em lotes curtos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=5000,
+            help="Quantidade de chaves removidas por comando DELETE.",
+        )
+
+    def handle(self, *args, **options):
+        agora = timezone.now()
+        vencidas = ChaveIdempotencia.objects.filter(expira_em__lte=agora)
+
+        total = 0
+        while True:
+            ids = list(vencidas.values_list("pk", flat=True)[: options["lote"]])
+            if not ids:
+                break
+            total += ChaveIdempotencia.objects.filter(pk__in=ids).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"{total} chaves vencidas removidas."))
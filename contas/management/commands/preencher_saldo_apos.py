@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from contas.models import Transacao
+from contas.services.saldo_service import preencher_saldo_apos
+
+
+class Command(BaseCommand):
+    help = (
+        "Preenche Transacao.saldo_apos para o histórico existente, em passadas "
+        "set-based por lote de contas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lote",
+            type=int,
+            default=200,
+            help="Quantidade de contas processadas por transação.",
+        )
+        parser.add_argument(
+            "--todas",
+            action="store_true",
+            help="Recalcula também as contas que já têm saldo_apos preenchido.",
+        )
+
+    def handle(self, *args, **options):
+        transacoes = Transacao.objects.all()
+        if not options["todas"]:
+            transacoes = transacoes.filter(saldo_apos__isnull=True)
+        conta_ids = list(
+            transacoes.order_by("conta_id")
+            .values_list("conta_id", flat=True)
+            .distinct()
+        )
+
+        total = 0
+        lote = options["lote"]
+        for inicio in range(0, len(conta_ids), lote):
+            total += preencher_saldo_apos(conta_ids[inicio : inicio + lote])
+            self.stdout.write(
+                f"{min(inicio + lote, len(conta_ids))}/{len(conta_ids)} contas"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"saldo_apos preenchido em {total} transações de {len(conta_ids)} contas."
+            )
+        )
@@ -0,0 +1,129 @@
+import os
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.conf import settings
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Métricas no formato do Prometheus, expostas em /metrics. Com vários workers
+# do gunicorn, PROMETHEUS_MULTIPROC_DIR (definido no entrypoint.sh antes de
+# qualquer import do prometheus_client) faz cada processo gravar seus valores
+# em arquivos nesse diretório, e /metrics soma os de todos os workers.
+
+METODOS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+LATENCIA = Histogram(
+    "banco_http_requisicao_segundos",
+    "Latência das requisições por endpoint.",
+    ["metodo", "rota", "status"],
+)
+CONSULTAS_DB = Histogram(
+    "banco_db_consultas_por_requisicao",
+    "Consultas ao banco por requisição.",
+    ["rota"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+TEMPO_DB = Histogram(
+    "banco_db_tempo_por_requisicao_segundos",
+    "Tempo gasto em consultas ao banco por requisição.",
+    ["rota"],
+)
+ESPERA_TRAVA = Histogram(
+    "banco_espera_trava_contas_segundos",
+    "Tempo para obter as travas (select_for_update) das contas.",
+    ["operacao"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+ERROS = Counter(
+    "banco_api_erros",
+    "Exceções tratadas pelo custom_api_exception_handler.",
+    ["excecao", "status"],
+)
+EVENTOS_TRANSACAO = Counter(
+    "banco_transacao_eventos",
+    "Tentativas, retentativas e esgotamentos por deadlock/serialização.",
+    ["operacao", "evento"],
+)
+EVENTOS_CACHE = Counter(
+    "banco_cache_eventos",
+    "Eventos dos caches de token e de saldo.",
+    ["cache", "evento"],
+)
+
+
+class MedidorConsultas:
+    """execute_wrapper que conta as consultas e soma o tempo delas."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.consultas += 1
+            self.segundos += time.perf_counter() - inicio
+
+
+@contextmanager
+def medir_consultas(medidor):
+    with ExitStack() as pilha:
+        for conexao in connections.all():
+            pilha.enter_context(conexao.execute_wrapper(medidor))
+        yield medidor
+
+
+@contextmanager
+def medir_espera_trava(operacao):
+    inicio = time.perf_counter()
+    yield
+    ESPERA_TRAVA.labels(operacao).observe(time.perf_counter() - inicio)
+
+
+def _rota(request):
+    # Nome da view, não o caminho: o pk na URL explodiria o número de séries.
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match is not None else "nao_resolvida"
+
+
+def registrar_requisicao(request, response, segundos, medidor):
+    rota = _rota(request)
+    metodo = request.method if request.method in METODOS else "OUTRO"
+    LATENCIA.labels(metodo, rota, response.status_code).observe(segundos)
+    CONSULTAS_DB.labels(rota).observe(medidor.consultas)
+    TEMPO_DB.labels(rota).observe(medidor.segundos)
+
+
+def registrar_erro(exc, status_code):
+    ERROS.labels(type(exc).__name__, status_code).inc()
+
+
+def _registry():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metricas(request):
+    token = settings.METRICAS_TOKEN
+    if not token:
+        # Sem token o endpoint só fica aberto em desenvolvimento.
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif request.headers.get("Authorization") != f"Bearer {token}":
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
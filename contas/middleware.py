@@ -0,0 +1,78 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from rest_framework.permissions import SAFE_METHODS
+
+from contas.metricas import MedidorConsultas, medir_consultas, registrar_requisicao
+from contas.replicas import registrar_escrita
+
+
+def _registrar_escrita_do_cliente(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        registrar_escrita(user.pk)
+
+
+class LeituraAposEscritaMiddleware:
+    """
+    Depois de uma requisição de escrita de um cliente autenticado, fixa as
+    leituras desse cliente no primário (contas.replicas). Fica depois do
+    AuthenticationMiddleware; nas views DRF o request.user já vem do token.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            _registrar_escrita_do_cliente(request)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if request.method not in SAFE_METHODS:
+            # request.user da sessão é carregado de forma síncrona.
+            await sync_to_async(_registrar_escrita_do_cliente)(request)
+        return response
+
+
+class MetricasMiddleware:
+    """
+    Latência, número de consultas e tempo de banco por endpoint (ver
+    contas/metricas.py). Fica no topo do MIDDLEWARE para medir a requisição
+    inteira; em respostas streaming, o que roda depois do retorno não entra.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        with medir_consultas(MedidorConsultas()) as medidor:
+            response = self.get_response(request)
+        registrar_requisicao(request, response, time.perf_counter() - inicio, medidor)
+        return response
+
+    async def __acall__(self, request):
+        # As conexões acompanham o contexto da requisição até as threads do
+        # sync_to_async, então o execute_wrapper vale para as consultas async.
+        inicio = time.perf_counter()
+        with medir_consultas(MedidorConsultas()) as medidor:
+            response = await self.get_response(request)
+        registrar_requisicao(request, response, time.perf_counter() - inicio, medidor)
+        return response
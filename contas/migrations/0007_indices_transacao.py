@@ -0,0 +1,70 @@
+# Generated by Django 5.2 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0006_alter_transacao_options_alter_contabancaria_cliente_and_more"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="transacao",
+            options={"ordering": ["-data", "-id"]},
+        ),
+        migrations.AddIndex(
+            model_name="transacao",
+            index=models.Index(
+                fields=["conta", "-data", "-id"], name="transacao_conta_data_idx"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="transacao",
+            name="conta",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="transacoes",
+                to="contas.contabancaria",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transacao",
+            index=models.Index(fields=["-data", "-id"], name="transacao_data_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="transacao",
+            index=models.Index(
+                condition=models.Q(("tipo", "D")),
+                fields=["-data", "-id"],
+                name="transacao_deposito_data_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transacao",
+            index=models.Index(
+                condition=models.Q(("tipo", "S")),
+                fields=["-data", "-id"],
+                name="transacao_saque_data_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transacao",
+            index=models.Index(
+                condition=models.Q(("tipo", "TE")),
+                fields=["-data", "-id"],
+                name="transacao_te_data_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transacao",
+            index=models.Index(
+                condition=models.Q(("tipo", "TR")),
+                fields=["-data", "-id"],
+                name="transacao_tr_data_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-18 19:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0007_indices_transacao"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SaldoDiario",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("data", models.DateField()),
+                ("saldo", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "conta",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="saldos_diarios",
+                        to="contas.contabancaria",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-data"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("conta", "data"), name="saldo_diario_conta_data_unico"
+                    )
+                ],
+            },
+        ),
+    ]
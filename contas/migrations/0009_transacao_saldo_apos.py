@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0008_saldodiario"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transacao",
+            name="saldo_apos",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, max_digits=10, null=True
+            ),
+        ),
+    ]
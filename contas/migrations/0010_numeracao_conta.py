@@ -0,0 +1,49 @@
+# Generated by Django 5.2 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+NOME_SEQUENCIA = "contas_numero_conta_seq"
+TAMANHO_BLOCO = 100
+
+
+def criar_sequencia(apps, schema_editor):
+    SequenciaNumeroConta = apps.get_model("contas", "SequenciaNumeroConta")
+    SequenciaNumeroConta.objects.using(schema_editor.connection.alias).create(
+        id=1, ultimo_valor=0
+    )
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE SEQUENCE IF NOT EXISTS {NOME_SEQUENCIA} "
+            f"INCREMENT BY {TAMANHO_BLOCO} START WITH 1"
+        )
+
+
+def remover_sequencia(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP SEQUENCE IF EXISTS {NOME_SEQUENCIA}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0009_transacao_saldo_apos"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SequenciaNumeroConta",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("ultimo_valor", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(criar_sequencia, remover_sequencia),
+    ]
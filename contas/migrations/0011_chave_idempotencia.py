@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-18 19:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0010_numeracao_conta"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChaveIdempotencia",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("chave", models.CharField(max_length=255)),
+                ("escopo", models.CharField(max_length=255)),
+                ("hash_requisicao", models.CharField(max_length=64)),
+                ("status_code", models.PositiveSmallIntegerField()),
+                ("resposta", models.TextField()),
+                ("criada_em", models.DateTimeField(default=django.utils.timezone.now)),
+                ("expira_em", models.DateTimeField()),
+                (
+                    "cliente",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chaves_idempotencia",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["expira_em"], name="chave_idempotencia_expira_idx"
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("cliente", "chave"), name="chave_idempotencia_unica"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0011_chave_idempotencia"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contabancaria",
+            name="versao",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,119 @@
+from datetime import date
+
+from django.db import migrations
+
+# Converte contas_transacao em tabela particionada por mês em `data`, só no
+# PostgreSQL. O estado do modelo não muda: o ORM continua vendo a mesma
+# tabela com a pk `id`. A chave primária física passa a ser (id, data), pois
+# no PostgreSQL toda restrição única de tabela particionada inclui a chave de
+# partição; o id continua único por vir sempre da mesma sequência.
+
+TABELA = "contas_transacao"
+SEQUENCIA = f"{TABELA}_id_seq"
+MESES_A_FRENTE = 3
+
+
+def _mes_seguinte(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _criar_particoes(schema_editor, primeiro, ultimo):
+    mes = primeiro
+    while mes <= ultimo:
+        seguinte = _mes_seguinte(mes)
+        schema_editor.execute(
+            f"CREATE TABLE {TABELA}_p{mes.year}_{mes.month:02d} PARTITION OF "
+            f"{TABELA} FOR VALUES FROM ('{mes}') TO ('{seguinte}')"
+        )
+        mes = seguinte
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Transacao = apps.get_model("contas", "Transacao")
+    executar = schema_editor.execute
+
+    executar(f"ALTER TABLE {TABELA} RENAME TO {TABELA}_antiga")
+    executar(
+        f"CREATE TABLE {TABELA} ("
+        "id bigint NOT NULL, "
+        "conta_id bigint NOT NULL, "
+        "tipo varchar(2) NOT NULL, "
+        "valor numeric(10, 2) NOT NULL, "
+        "data timestamp with time zone NOT NULL, "
+        "saldo_apos numeric(10, 2) NULL"
+        ") PARTITION BY RANGE (data)"
+    )
+    executar(f"CREATE TABLE {TABELA}_padrao PARTITION OF {TABELA} DEFAULT")
+
+    hoje = date.today().replace(day=1)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT min(data) FROM {TABELA}_antiga")
+        mais_antiga = cursor.fetchone()[0]
+    primeiro = mais_antiga.date().replace(day=1) if mais_antiga else hoje
+    ultimo = hoje
+    for _ in range(MESES_A_FRENTE):
+        ultimo = _mes_seguinte(ultimo)
+    _criar_particoes(schema_editor, min(primeiro, hoje), ultimo)
+
+    executar(
+        f"INSERT INTO {TABELA} (id, conta_id, tipo, valor, data, saldo_apos) "
+        f"SELECT id, conta_id, tipo, valor, data, saldo_apos FROM {TABELA}_antiga"
+    )
+    # Remove também a sequência de identidade, os índices e a pk antigos,
+    # liberando os nomes para a tabela nova.
+    executar(f"DROP TABLE {TABELA}_antiga")
+
+    executar(f"CREATE SEQUENCE {SEQUENCIA} OWNED BY {TABELA}.id")
+    executar(
+        f"SELECT setval('{SEQUENCIA}', COALESCE(max(id), 0) + 1, false) FROM {TABELA}"
+    )
+    executar(f"ALTER TABLE {TABELA} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCIA}')")
+    executar(
+        f"ALTER TABLE {TABELA} ADD CONSTRAINT {TABELA}_pkey PRIMARY KEY (id, data)"
+    )
+    executar(
+        f"ALTER TABLE {TABELA} ADD CONSTRAINT {TABELA}_conta_id_fk "
+        "FOREIGN KEY (conta_id) REFERENCES contas_contabancaria (id) "
+        "DEFERRABLE INITIALLY DEFERRED"
+    )
+    for index in Transacao._meta.indexes:
+        schema_editor.add_index(Transacao, index)
+
+
+def desparticionar(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Transacao = apps.get_model("contas", "Transacao")
+    executar = schema_editor.execute
+
+    for index in Transacao._meta.indexes:
+        schema_editor.remove_index(Transacao, index)
+    executar(f"ALTER TABLE {TABELA} ALTER COLUMN id DROP DEFAULT")
+    executar(f"DROP SEQUENCE {SEQUENCIA}")
+    executar(f"ALTER TABLE {TABELA} DROP CONSTRAINT {TABELA}_pkey")
+    executar(f"ALTER TABLE {TABELA} RENAME TO {TABELA}_particionada")
+
+    schema_editor.create_model(Transacao)
+    executar(
+        f"INSERT INTO {TABELA} (id, conta_id, tipo, valor, data, saldo_apos) "
+        f"SELECT id, conta_id, tipo, valor, data, saldo_apos "
+        f"FROM {TABELA}_particionada"
+    )
+    executar(f"DROP TABLE {TABELA}_particionada CASCADE")
+    executar(
+        f"SELECT setval(pg_get_serial_sequence('{TABELA}', 'id'), "
+        f"COALESCE(max(id), 0) + 1, false) FROM {TABELA}"
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0012_versao_saldo_conta"),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, desparticionar),
+    ]
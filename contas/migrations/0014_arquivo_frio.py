@@ -0,0 +1,50 @@
+# Generated by Django 5.2 on 2026-10-18 20:47
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contas", "0013_particionar_transacao"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="contabancaria",
+            name="arquivado_ate",
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="SegmentoArquivado",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("conta_inicial", models.BigIntegerField()),
+                ("conta_final", models.BigIntegerField()),
+                ("data_limite", models.DateField()),
+                ("data_inicial", models.DateTimeField()),
+                ("arquivo", models.CharField(max_length=255)),
+                ("transacoes", models.PositiveIntegerField()),
+                ("indice", models.JSONField()),
+                ("criado_em", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "ordering": ["conta_inicial", "data_limite"],
+                "indexes": [
+                    models.Index(
+                        fields=["conta_inicial", "conta_final"],
+                        name="segmento_contas_idx",
+                    )
+                ],
+            },
+        ),
+    ]
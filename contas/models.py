@@ -8,7 +8,8 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.db import models
 from decimal import Decimal
-import uuid
+
+from contas.numeracao import gerar_numero_conta
 
 
 class ClienteManager(BaseUserManager):
@@ -65,6 +66,26 @@ class Cliente(AbstractBaseUser, PermissionsMixin):
         return f"{self.nome} ({self.cpf})"
 
 
+class ContaBancariaQuerySet(models.QuerySet):
+    def com_cliente(self):
+        # Uma única consulta com o cliente já carregado e só as colunas que
+        # ContaBancariaSerializer (e o ClienteSerializer aninhado) e o extrato
+        # (arquivado_ate) usam.
+        return self.select_related("cliente").only(
+            "id",
+            "numero_conta",
+            "saldo",
+            "versao",
+            "arquivado_ate",
+            "cliente__id",
+            "cliente__cpf",
+            "cliente__nome",
+            "cliente__email",
+            "cliente__data_nascimento",
+            "cliente__date_joined",
+        )
+
+
 class ContaBancaria(models.Model):
     cliente = models.ForeignKey(
         Cliente, on_delete=models.CASCADE, related_name="contas_bancarias"
@@ -76,20 +97,30 @@ class ContaBancaria(models.Model):
         default=Decimal("0.00"),
         validators=[MinValueValidator(Decimal("0.00"))],
     )
+    # Incrementada a cada alteração de saldo pelos serviços; impede que uma
+    # leitura antiga sobrescreva um saldo mais novo no cache (ver
+    # contas/services/cache_saldo_service.py).
+    versao = models.PositiveBigIntegerField(default=0)
+    # Transações anteriores a este dia estão no arquivo frio (SegmentoArquivado);
+    # nulo se nada da conta foi arquivado.
+    arquivado_ate = models.DateField(null=True, blank=True)
+
+    objects = ContaBancariaQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         if not self.numero_conta:
-            while True:
-                novo_numero = str(uuid.uuid4().int)[:8]
-                if not ContaBancaria.objects.filter(numero_conta=novo_numero).exists():
-                    self.numero_conta = novo_numero
-                    break
+            self.numero_conta = gerar_numero_conta(using=kwargs.get("using"))
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Conta {self.numero_conta} - {self.cliente.nome}"
 
 
+class SequenciaNumeroConta(models.Model):
+    # Contador usado por contas.numeracao nos backends sem sequência nativa.
+    ultimo_valor = models.BigIntegerField(default=0)
+
+
 class Transacao(models.Model):
     TIPO_TRANSACAO = [
         ("D", "Depósito"),
@@ -97,18 +128,147 @@ class Transacao(models.Model):
         ("TE", "Transferência Enviada"),
         ("TR", "Transferência Recebida"),
     ]
+    TIPOS_CREDITO = ["D", "TR"]
+    TIPOS_DEBITO = ["S", "TE"]
 
+    # O índice composto (conta, -data, -id) em Meta.indexes já atende buscas
+    # pelo conta_id, então o índice simples da FK seria redundante.
     conta = models.ForeignKey(
-        ContaBancaria, on_delete=models.CASCADE, related_name="transacoes"
+        ContaBancaria,
+        on_delete=models.CASCADE,
+        related_name="transacoes",
+        db_index=False,
     )
     tipo = models.CharField(max_length=2, choices=TIPO_TRANSACAO)
     valor = models.DecimalField(
         max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal("0.01"))]
     )
     data = models.DateTimeField(default=timezone.now)
+    # Saldo da conta logo após esta transação. Nulo apenas para o histórico
+    # anterior à coluna, até rodar `manage.py preencher_saldo_apos`.
+    saldo_apos = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
 
     def __str__(self):
         return f"{self.get_tipo_display()} de R${self.valor} - Conta {self.conta.numero_conta}"  # type: ignore
 
+    class Meta:
+        ordering = ["-data", "-id"]
+        indexes = [
+            # Extrato por conta, paginado por (data, id)
+            models.Index(
+                fields=["conta", "-data", "-id"], name="transacao_conta_data_idx"
+            ),
+            # Listagem geral do admin
+            models.Index(fields=["-data", "-id"], name="transacao_data_idx"),
+            # Filtro por tipo no admin: um índice parcial por tipo
+            models.Index(
+                fields=["-data", "-id"],
+                condition=models.Q(tipo="D"),
+                name="transacao_deposito_data_idx",
+            ),
+            models.Index(
+                fields=["-data", "-id"],
+                condition=models.Q(tipo="S"),
+                name="transacao_saque_data_idx",
+            ),
+            models.Index(
+                fields=["-data", "-id"],
+                condition=models.Q(tipo="TE"),
+                name="transacao_te_data_idx",
+            ),
+            models.Index(
+                fields=["-data", "-id"],
+                condition=models.Q(tipo="TR"),
+                name="transacao_tr_data_idx",
+            ),
+        ]
+
+
+class SaldoDiario(models.Model):
+    # Saldo de fechamento da conta no dia `data`. A restrição única
+    # (conta, data) já indexa as buscas por conta.
+    conta = models.ForeignKey(
+        ContaBancaria,
+        on_delete=models.CASCADE,
+        related_name="saldos_diarios",
+        db_index=False,
+    )
+    data = models.DateField()
+    saldo = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"Saldo de R${self.saldo} em {self.data} - Conta {self.conta_id}"  # type: ignore
+
     class Meta:
         ordering = ["-data"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["conta", "data"], name="saldo_diario_conta_data_unico"
+            )
+        ]
+
+
+class SegmentoArquivado(models.Model):
+    # Transações das contas entre conta_inicial e conta_final anteriores a
+    # `data_limite`, movidas de contas_transacao para um arquivo NDJSON
+    # comprimido. Ver contas/services/arquivamento_service.py.
+    conta_inicial = models.BigIntegerField()
+    conta_final = models.BigIntegerField()
+    data_limite = models.DateField()
+    # Transação mais antiga do segmento, para pular segmentos fora do período.
+    data_inicial = models.DateTimeField()
+    arquivo = models.CharField(max_length=255)
+    transacoes = models.PositiveIntegerField()
+    # {conta_id: [posição no arquivo, quantidade]}: cada conta é um membro gzip
+    # próprio, lido sem descomprimir as demais.
+    indice = models.JSONField()
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return (
+            f"Contas {self.conta_inicial}-{self.conta_final} "
+            f"antes de {self.data_limite}"
+        )
+
+    class Meta:
+        ordering = ["conta_inicial", "data_limite"]
+        indexes = [
+            models.Index(
+                fields=["conta_inicial", "conta_final"], name="segmento_contas_idx"
+            )
+        ]
+
+
+class ChaveIdempotencia(models.Model):
+    # Resposta de uma operação com header Idempotency-Key, gravada na mesma
+    # transação da operação. Ver contas/idempotencia.py.
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.CASCADE,
+        related_name="chaves_idempotencia",
+        db_index=False,
+    )
+    chave = models.CharField(max_length=255)
+    escopo = models.CharField(max_length=255)
+    hash_requisicao = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    # JSON como texto: o jsonb do PostgreSQL reordena as chaves, e a repetição
+    # precisa devolver exatamente os mesmos bytes da resposta original.
+    resposta = models.TextField()
+    criada_em = models.DateTimeField(default=timezone.now)
+    expira_em = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.chave} ({self.escopo}) - Cliente {self.cliente_id}"  # type: ignore
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cliente", "chave"], name="chave_idempotencia_unica"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["expira_em"], name="chave_idempotencia_expira_idx")
+        ]
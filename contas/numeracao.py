@@ -0,0 +1,125 @@
+import os
+import threading
+
+from django.db import connections, router
+
+# Números novos têm 9 dígitos sequenciais + 1 dígito verificador (10 no total),
+# então nunca colidem com os números antigos de 8 dígitos gerados via uuid4.
+DIGITOS_SEQUENCIA = 9
+NOME_SEQUENCIA = "contas_numero_conta_seq"
+# Deve ser igual ao INCREMENT BY da sequência criada na migração 0010.
+TAMANHO_BLOCO = 100
+
+_lock = threading.Lock()
+_bloco = {"pid": None, "proximo": 0, "limite": 0}
+
+
+def digito_verificador(base):
+    # Módulo 11 com pesos 2..9 da direita para a esquerda; restos 10 e 11 viram 0.
+    soma = 0
+    for indice, digito in enumerate(reversed(base)):
+        soma += int(digito) * (2 + indice % 8)
+    resto = 11 - soma % 11
+    return "0" if resto >= 10 else str(resto)
+
+
+def formatar_numero_conta(valor):
+    base = str(valor).zfill(DIGITOS_SEQUENCIA)
+    return base + digito_verificador(base)
+
+
+def numero_conta_valido(numero):
+    if not numero.isdigit() or len(numero) != DIGITOS_SEQUENCIA + 1:
+        return False
+    return digito_verificador(numero[:-1]) == numero[-1]
+
+
+def _reservar_blocos_postgres(connection, quantidade):
+    # nextval não participa da transação: um bloco reservado nunca é devolvido,
+    # mesmo em rollback, então dois processos jamais recebem o mesmo bloco.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)",
+            [NOME_SEQUENCIA, quantidade],
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def _reservar_contador(using, quantidade):
+    # Backends sem sequência (SQLite em dev/testes): um contador incrementado
+    # por UPDATE ... RETURNING dentro da transação de quem cria a conta. Sem
+    # cache em memória, um rollback devolve a faixa junto com as contas.
+    from contas.models import SequenciaNumeroConta
+
+    connection = connections[using]
+    tabela = connection.ops.quote_name(SequenciaNumeroConta._meta.db_table)
+    coluna = connection.ops.quote_name("ultimo_valor")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {tabela} SET {coluna} = {coluna} + %s WHERE id = 1 "
+            f"RETURNING {coluna}",
+            [quantidade],
+        )
+        linha = cursor.fetchone()
+    if linha is None:
+        # Contador ausente (ex.: banco esvaziado com flush): recomeça após o
+        # maior número já emitido no formato novo.
+        ultimo = _maior_numero_emitido(using) + quantidade
+        SequenciaNumeroConta.objects.using(using).create(id=1, ultimo_valor=ultimo)
+    else:
+        ultimo = linha[0]
+    return range(ultimo - quantidade + 1, ultimo + 1)
+
+
+def _maior_numero_emitido(using):
+    from contas.models import ContaBancaria
+
+    maior = (
+        ContaBancaria.objects.using(using)
+        .filter(numero_conta__regex=rf"^[0-9]{{{DIGITOS_SEQUENCIA + 1}}}$")
+        .order_by("-numero_conta")
+        .values_list("numero_conta", flat=True)
+        .first()
+    )
+    return int(maior[:-1]) if maior else 0
+
+
+def _proximos_valores_postgres(connection, quantidade):
+    valores = []
+    with _lock:
+        if _bloco["pid"] != os.getpid():
+            # Processo filho (fork do gunicorn) não reaproveita o bloco do pai.
+            _bloco.update(pid=os.getpid(), proximo=0, limite=0)
+
+        disponiveis = _bloco["limite"] - _bloco["proximo"]
+        usados = min(disponiveis, quantidade)
+        valores.extend(range(_bloco["proximo"], _bloco["proximo"] + usados))
+        _bloco["proximo"] += usados
+
+        faltantes = quantidade - usados
+        if faltantes:
+            blocos = -(-faltantes // TAMANHO_BLOCO)
+            inicios = _reservar_blocos_postgres(connection, blocos)
+            for inicio in inicios:
+                valores.extend(range(inicio, inicio + TAMANHO_BLOCO))
+            excedente = len(valores) - quantidade
+            _bloco["proximo"] = inicios[-1] + TAMANHO_BLOCO - excedente
+            _bloco["limite"] = inicios[-1] + TAMANHO_BLOCO
+            del valores[quantidade:]
+    return valores
+
+
+def gerar_numeros_conta(quantidade, using=None):
+    from contas.models import ContaBancaria
+
+    using = using or router.db_for_write(ContaBancaria)
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        valores = _proximos_valores_postgres(connection, quantidade)
+    else:
+        valores = _reservar_contador(using, quantidade)
+    return [formatar_numero_conta(valor) for valor in valores]
+
+
+def gerar_numero_conta(using=None):
+    return gerar_numeros_conta(1, using=using)[0]
@@ -0,0 +1,131 @@
+import itertools
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ExtratoCursorPagination(BasePagination):
+    """
+    Paginação por keyset em (data, id), do mais recente para o mais antigo.
+
+    Cada página é um `WHERE (data, id) < (cursor) ORDER BY data DESC, id DESC
+    LIMIT n`, sem COUNT(*) nem OFFSET, então o custo da página N é o mesmo da
+    primeira.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 500
+    ordering = ("-data", "-id")
+    invalid_cursor_message = "Cursor inválido."
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def encode_cursor(self, transacao):
+        # `.id` em vez de `.pk`: a página pode ser de instâncias ou de linhas
+        # de values_list(named=True).
+        bruto = f"{transacao.data.isoformat()}|{transacao.id}"
+        return urlsafe_b64encode(bruto.encode()).decode()
+
+    def decode_cursor(self, request):
+        valor = request.query_params.get(self.cursor_query_param)
+        if not valor:
+            return None
+        try:
+            data, pk = urlsafe_b64decode(valor.encode()).decode().split("|")
+            return datetime.fromisoformat(data), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None, arquivadas=None):
+        resultados = list(self.consulta_pagina(queryset, request))
+        return self.montar_pagina(self.completar(resultados, arquivadas))
+
+    def consulta_pagina(self, queryset, request):
+        # QuerySet ainda não avaliado com as n + 1 linhas da página; separado de
+        # montar_pagina para que views async possam iterá-lo com `async for`.
+        self.request = request
+        self.page_size_atual = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            data, pk = cursor
+            # O `data__lte` isolado delimita a faixa no índice (conta, -data, -id);
+            # o OR só desempata linhas com o mesmo instante.
+            queryset = queryset.filter(data__lte=data).filter(
+                Q(data__lt=data) | Q(id__lt=pk)
+            )
+
+        return queryset[: self.page_size_atual + 1]
+
+    def completar(self, resultados, arquivadas):
+        """
+        Completa com linhas do arquivo frio a página que o banco não encheu.
+        `arquivadas(antes_de=cursor)` devolve, em ordem decrescente, as linhas
+        arquivadas anteriores ao cursor. Tudo que está arquivado é mais antigo
+        que o que está na tabela, então o arquivo só é lido no fim do extrato.
+        """
+        faltam = self.page_size_atual + 1 - len(resultados)
+        if arquivadas is None or faltam <= 0:
+            return resultados
+        linhas = arquivadas(antes_de=self.decode_cursor(self.request))
+        return resultados + list(itertools.islice(linhas, faltam))
+
+    def montar_pagina(self, resultados):
+        self.has_next = len(resultados) > self.page_size_atual
+        self.page = resultados[: self.page_size_atual]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+        return url
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Cursor da próxima página, retornado em `next`.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": f"Itens por página (máximo {self.max_page_size}).",
+                "schema": {"type": "integer"},
+            },
+        ]
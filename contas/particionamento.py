@@ -0,0 +1,139 @@
+from datetime import date
+
+from django.db import connections, router, transaction
+
+# No PostgreSQL, contas_transacao é particionada por mês em `data` (migração
+# 0013): cada mês é uma tabela própria, com seus índices, e consultas com
+# faixa de datas só leem as partições do período. A partição DEFAULT recebe
+# o que cair fora dos meses criados; criar_particoes_futuras deve rodar antes
+# de cada mês começar (o entrypoint.sh roda a cada início). O SQLite continua
+# com a tabela simples.
+
+TABELA = "contas_transacao"
+PARTICAO_PADRAO = f"{TABELA}_padrao"
+
+
+def _conexao(using):
+    from contas.models import Transacao
+
+    return connections[using or router.db_for_write(Transacao)]
+
+
+def primeiro_dia(dia):
+    return dia.replace(day=1)
+
+
+def somar_meses(mes, quantidade):
+    indice = mes.year * 12 + mes.month - 1 + quantidade
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def meses_entre(inicio, fim):
+    return (fim.year - inicio.year) * 12 + fim.month - inicio.month
+
+
+def nome_particao(mes):
+    return f"{TABELA}_p{mes.year}_{mes.month:02d}"
+
+
+def tabela_particionada(using=None):
+    connection = _conexao(using)
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [TABELA],
+        )
+        return cursor.fetchone() is not None
+
+
+def listar_particoes(using=None):
+    with _conexao(using).cursor() as cursor:
+        cursor.execute(
+            "SELECT inhrelid::regclass::text FROM pg_inherits "
+            "WHERE inhparent = %s::regclass ORDER BY 1",
+            [TABELA],
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def criar_particao_mensal(mes, using=None):
+    """
+    Cria a partição do mês, se ainda não existir. Linhas desse mês que já
+    estejam na partição DEFAULT são movidas para ela antes do ATTACH, que
+    falharia se a DEFAULT ainda as contivesse.
+
+    Retorna True se a partição foi criada.
+    """
+    connection = _conexao(using)
+    mes = primeiro_dia(mes)
+    nome = nome_particao(mes)
+    quote = connection.ops.quote_name
+    limites = [mes.isoformat(), somar_meses(mes, 1).isoformat()]
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [nome])
+        if cursor.fetchone()[0] is not None:
+            return False
+        cursor.execute(
+            f"CREATE TABLE {quote(nome)} "
+            f"(LIKE {quote(TABELA)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"WITH movidas AS (DELETE FROM {quote(PARTICAO_PADRAO)} "
+            f"WHERE data >= %s::timestamptz AND data < %s::timestamptz "
+            f"RETURNING *) INSERT INTO {quote(nome)} SELECT * FROM movidas",
+            limites,
+        )
+        # Os índices e a FK da tabela-mãe são criados na partição pelo ATTACH.
+        cursor.execute(
+            f"ALTER TABLE {quote(TABELA)} ATTACH PARTITION {quote(nome)} "
+            f"FOR VALUES FROM (%s::timestamptz) TO (%s::timestamptz)",
+            limites,
+        )
+    return True
+
+
+def criar_particoes_futuras(meses, a_partir=None, using=None):
+    """
+    Garante as partições do mês de `a_partir` (padrão: hoje) e dos `meses`
+    seguintes. Retorna os nomes das partições criadas.
+    """
+    if not tabela_particionada(using):
+        return []
+    inicio = primeiro_dia(a_partir or date.today())
+    criadas = []
+    for deslocamento in range(meses + 1):
+        mes = somar_meses(inicio, deslocamento)
+        if criar_particao_mensal(mes, using=using):
+            criadas.append(nome_particao(mes))
+    return criadas
+
+
+def remover_particoes_vazias(antes_de, using=None):
+    """
+    Remove as partições mensais vazias que terminam até `antes_de`, como as
+    esvaziadas pelo arquivamento: DROP devolve o espaço na hora, sem esperar
+    o VACUUM. Retorna os nomes das partições removidas.
+    """
+    if not tabela_particionada(using):
+        return []
+    connection = _conexao(using)
+    quote = connection.ops.quote_name
+    prefixo = f"{TABELA}_p"
+    removidas = []
+    for nome in listar_particoes(using):
+        if nome == PARTICAO_PADRAO or not nome.startswith(prefixo):
+            continue
+        ano, mes = nome[len(prefixo) :].split("_")
+        if somar_meses(date(int(ano), int(mes), 1), 1) > antes_de:
+            continue
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            # Trava antes de conferir: nenhuma linha entra entre a checagem e o DROP.
+            cursor.execute(f"LOCK TABLE {quote(nome)} IN ACCESS EXCLUSIVE MODE")
+            cursor.execute(f"SELECT 1 FROM {quote(nome)} LIMIT 1")
+            if cursor.fetchone() is not None:
+                continue
+            cursor.execute(f"DROP TABLE {quote(nome)}")
+        removidas.append(nome)
+    return removidas
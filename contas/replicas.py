@@ -0,0 +1,95 @@
+import functools
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.http import HttpRequest
+from rest_framework.request import Request
+
+# Réplicas de leitura. Só vão para uma réplica as leituras feitas dentro de
+# leitura_replica() (saldo, extrato e listagens do admin); todo o resto, em
+# especial escritas e select_for_update, fica no primário. Um cliente que
+# acabou de escrever lê do primário por REPLICA_JANELA_PRIMARIO segundos, para
+# não ver o próprio saldo "voltar no tempo" por causa do atraso de replicação.
+
+_ler_da_replica = ContextVar("ler_da_replica", default=False)
+
+
+class RoteadorReplicas:
+    def db_for_read(self, model, **hints):
+        if not _ler_da_replica.get() or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # Dentro de uma transação no primário, ler de outra base quebraria
+            # a consistência com o que a própria transação escreveu.
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+
+def _cache():
+    return caches[settings.REPLICA_CACHE_ALIAS]
+
+
+def _chave_primario(cliente_id):
+    return f"replicas:primario:{cliente_id}"
+
+
+def registrar_escrita(cliente_id):
+    """Fixa as leituras do cliente no primário pela janela configurada."""
+    if settings.DATABASE_REPLICAS and cliente_id is not None:
+        _cache().set(
+            _chave_primario(cliente_id), True, settings.REPLICA_JANELA_PRIMARIO
+        )
+
+
+def fixado_no_primario(cliente_id):
+    return (
+        cliente_id is not None and _cache().get(_chave_primario(cliente_id)) is not None
+    )
+
+
+@contextmanager
+def leitura_replica(cliente_id=None):
+    if not settings.DATABASE_REPLICAS or fixado_no_primario(cliente_id):
+        yield
+        return
+    token = _ler_da_replica.set(True)
+    try:
+        yield
+    finally:
+        _ler_da_replica.reset(token)
+
+
+def _cliente_id(args):
+    request = next(arg for arg in args if isinstance(arg, (Request, HttpRequest)))
+    return getattr(request.user, "pk", None)
+
+
+def ler_da_replica(view):
+    """
+    Executa a view (síncrona ou async) com as leituras em uma réplica. Deve
+    ficar depois da autenticação, que é quem identifica o cliente.
+    """
+    if iscoroutinefunction(view):
+
+        @functools.wraps(view)
+        async def wrapper_async(*args, **kwargs):
+            # O ContextVar acompanha as consultas feitas via sync_to_async.
+            with leitura_replica(_cliente_id(args)):
+                return await view(*args, **kwargs)
+
+        return wrapper_async
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with leitura_replica(_cliente_id(args)):
+            return view(*args, **kwargs)
+
+    return wrapper
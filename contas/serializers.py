@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.utils import timezone
 from decimal import Decimal
 
 from .models import Cliente, ContaBancaria, Transacao
@@ -79,10 +80,49 @@ class TransacaoSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Transacao
-        fields = ["id", "conta", "tipo", "tipo_descricao", "valor", "data"]
+        fields = [
+            "id",
+            "conta",
+            "tipo",
+            "tipo_descricao",
+            "valor",
+            "saldo_apos",
+            "data",
+        ]
         read_only_fields = fields
 
 
+# Caminho rápido para listas grandes: monta a mesma saída de
+# TransacaoSerializer(many=True).data direto das tuplas de
+# values_list(*CAMPOS_TRANSACAO_VALORES), sem instanciar modelos nem campos.
+CAMPOS_TRANSACAO_VALORES = ("id", "conta_id", "tipo", "valor", "saldo_apos", "data")
+DESCRICAO_TIPOS = dict(Transacao.TIPO_TRANSACAO)
+
+
+def iterar_transacoes_serializadas(linhas):
+    # valor e saldo_apos são numeric(10, 2): o banco já devolve os Decimals
+    # com duas casas, então str() equivale ao quantize + "{:f}" do DRF.
+    fuso = timezone.get_current_timezone()
+    descricoes = DESCRICAO_TIPOS
+    for pk, conta_id, tipo, valor, saldo_apos, data in linhas:
+        data = data.astimezone(fuso).isoformat()
+        if data.endswith("+00:00"):
+            data = data[:-6] + "Z"
+        yield {
+            "id": pk,
+            "conta": conta_id,
+            "tipo": tipo,
+            "tipo_descricao": descricoes.get(tipo, tipo),
+            "valor": str(valor),
+            "saldo_apos": None if saldo_apos is None else str(saldo_apos),
+            "data": data,
+        }
+
+
+def serializar_transacoes(linhas):
+    return list(iterar_transacoes_serializadas(linhas))
+
+
 class DepositoSaqueSerializer(serializers.Serializer):
     numero_conta = serializers.CharField(max_length=12, required=True)
     valor = serializers.DecimalField(max_digits=10, decimal_places=2)
@@ -133,3 +173,55 @@ class TransferenciaInternaSerializer(serializers.Serializer):
         if not ContaBancaria.objects.filter(numero_conta=value).exists():
             raise serializers.ValidationError("A conta de destino não existe.")
         return value
+
+
+class TransferenciaLoteItemSerializer(serializers.Serializer):
+    conta_destino = serializers.CharField(max_length=12)
+    valor = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0.01")
+    )
+
+
+class TransferenciaLoteSerializer(serializers.Serializer):
+    MODOS = [
+        ("tudo_ou_nada", "Tudo ou nada"),
+        ("relatorio", "Relatório por item"),
+    ]
+
+    modo = serializers.ChoiceField(choices=MODOS, default="tudo_ou_nada")
+    transferencias = TransferenciaLoteItemSerializer(
+        many=True, allow_empty=False, max_length=1000
+    )
+
+
+class ResultadoTransferenciaLoteSerializer(serializers.Serializer):
+    indice = serializers.IntegerField()
+    conta_destino = serializers.CharField()
+    valor = serializers.DecimalField(max_digits=10, decimal_places=2)
+    status = serializers.SerializerMethodField()
+    erro = serializers.CharField(allow_null=True)
+
+    def get_status(self, obj):
+        return "rejeitada" if obj["erro"] else "efetuada"
+
+
+class PeriodoExtratoSerializer(serializers.Serializer):
+    data_inicio = serializers.DateField(required=False, input_formats=["%Y-%m-%d"])
+    data_fim = serializers.DateField(required=False, input_formats=["%Y-%m-%d"])
+
+    def validate(self, data):
+        data_inicio = data.get("data_inicio")
+        data_fim = data.get("data_fim")
+        if data_inicio and data_fim and data_inicio > data_fim:
+            raise serializers.ValidationError(
+                "A data inicial não pode ser posterior à data final."
+            )
+        return data
+
+
+class ExportacaoExtratoSerializer(PeriodoExtratoSerializer):
+    formato = serializers.ChoiceField(choices=["csv", "ndjson"], default="csv")
+
+
+class SaldoEmDataSerializer(serializers.Serializer):
+    data = serializers.DateField(input_formats=["%Y-%m-%d"])
@@ -0,0 +1,276 @@
+import bisect
+import gzip
+import heapq
+import itertools
+import json
+import os
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+from operator import attrgetter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from contas.models import ContaBancaria, SegmentoArquivado, Transacao
+from contas.serializers import CAMPOS_TRANSACAO_VALORES
+from contas.services.saldo_diario_service import (
+    inicio_do_dia,
+    recalcular_saldos_diarios,
+)
+
+# Arquivo frio: transações anteriores a uma data limite saem de
+# contas_transacao para arquivos NDJSON com gzip, um por faixa de contas, e
+# cada arquivo ganha uma linha em SegmentoArquivado. Os saldos diários dos
+# dias arquivados ficam no banco, então saldo_em não precisa ler o arquivo; o
+# extrato e a exportação só o abrem quando o período pedido chega até ele.
+
+# Mesmos campos, na mesma ordem, das linhas de values_list do extrato.
+LinhaArquivada = namedtuple("LinhaArquivada", CAMPOS_TRANSACAO_VALORES)
+TAMANHO_LOTE_ARQUIVAMENTO = 2000
+# Linhas por membro gzip: a leitura descomprime um bloco de cada vez.
+LINHAS_POR_BLOCO = 500
+
+
+def _caminho(nome):
+    return Path(settings.ARQUIVO_FRIO_DIR) / nome
+
+
+def _codificar(pk, conta_id, tipo, valor, saldo_apos, data):
+    return json.dumps(
+        {
+            "id": pk,
+            "conta_id": conta_id,
+            "tipo": tipo,
+            "valor": str(valor),
+            "saldo_apos": None if saldo_apos is None else str(saldo_apos),
+            "data": data.isoformat(),
+        }
+    ).encode()
+
+
+def _decodificar(linha):
+    registro = json.loads(linha)
+    saldo_apos = registro["saldo_apos"]
+    return LinhaArquivada(
+        registro["id"],
+        registro["conta_id"],
+        registro["tipo"],
+        Decimal(registro["valor"]),
+        None if saldo_apos is None else Decimal(saldo_apos),
+        datetime.fromisoformat(registro["data"]),
+    )
+
+
+def _gravar_segmento(caminho, linhas):
+    """
+    Grava as linhas, ordenadas por conta, em membros gzip de até
+    LINHAS_POR_BLOCO linhas de uma mesma conta. O índice guarda, por conta, a
+    lista de blocos [posição, quantidade, data, id da primeira linha].
+    Retorna (indice, total, data_inicial); sem linhas, nada é gravado.
+    """
+    indice, total, primeiras = {}, 0, []
+    temporario = caminho.with_name(f"{caminho.name}.tmp")
+    try:
+        with open(temporario, "wb") as arquivo:
+            for conta_id, grupo in itertools.groupby(
+                linhas, key=lambda linha: linha[1]
+            ):
+                blocos = indice[str(conta_id)] = []
+                while bloco := list(itertools.islice(grupo, LINHAS_POR_BLOCO)):
+                    posicao = arquivo.tell()
+                    with gzip.GzipFile(fileobj=arquivo, mode="wb", mtime=0) as membro:
+                        membro.writelines(_codificar(*linha) + b"\n" for linha in bloco)
+                    pk, data = bloco[0][0], bloco[0][5]
+                    if not blocos:
+                        primeiras.append(data)
+                    blocos.append([posicao, len(bloco), data.isoformat(), pk])
+                    total += len(bloco)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+    except BaseException:
+        temporario.unlink(missing_ok=True)
+        raise
+    try:
+        if total:
+            # Publica só depois de completo, e o link falha (FileExistsError)
+            # em vez de sobrescrever um segmento já gravado.
+            os.link(temporario, caminho)
+    finally:
+        temporario.unlink()
+    return indice, total, min(primeiras, default=None)
+
+
+def arquivar_faixa(conta_inicial, conta_final, data_limite):
+    """
+    Arquiva as transações das contas da faixa anteriores a `data_limite`.
+    Retorna o SegmentoArquivado criado, ou None se não havia o que arquivar.
+    """
+    antigas = Transacao.objects.filter(
+        conta_id__gte=conta_inicial,
+        conta_id__lte=conta_final,
+        data__lt=inicio_do_dia(data_limite),
+    )
+    conta_ids = list(
+        antigas.order_by("conta_id").values_list("conta_id", flat=True).distinct()
+    )
+    if not conta_ids:
+        return None
+    # Garante os snapshots dos dias que vão sair da tabela, inclusive o saldo
+    # de abertura; depois disso recalcular_saldos_diarios deixa esses dias de fora.
+    recalcular_saldos_diarios(conta_ids, com_abertura=True)
+
+    # Rodar de novo com a mesma data (transações retroativas) gera outro
+    # segmento da mesma faixa: o nome não pode depender só dela.
+    nome = (
+        f"transacoes_{conta_inicial}_{conta_final}_{data_limite:%Y%m%d}_"
+        f"{uuid.uuid4().hex[:12]}.ndjson.gz"
+    )
+    caminho = _caminho(nome)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with transaction.atomic():
+        linhas = (
+            antigas.order_by("conta_id", "data", "id")
+            .values_list(*CAMPOS_TRANSACAO_VALORES)
+            .iterator(chunk_size=TAMANHO_LOTE_ARQUIVAMENTO)
+        )
+        indice, total, data_inicial = _gravar_segmento(caminho, linhas)
+        try:
+            segmento = SegmentoArquivado.objects.create(
+                conta_inicial=conta_inicial,
+                conta_final=conta_final,
+                data_limite=data_limite,
+                data_inicial=data_inicial,
+                arquivo=nome,
+                transacoes=total,
+                indice=indice,
+            )
+            apagadas, _ = antigas.delete()
+            if apagadas != total:
+                # Alguma transação retroativa entrou depois da leitura.
+                raise RuntimeError(
+                    f"Contas {conta_inicial}-{conta_final}: {total} transações "
+                    f"arquivadas, mas {apagadas} removidas; nada foi alterado."
+                )
+            # Por último, para travar as contas só até o commit.
+            ContaBancaria.objects.filter(
+                Q(arquivado_ate__isnull=True) | Q(arquivado_ate__lt=data_limite),
+                pk__in=conta_ids,
+            ).update(arquivado_ate=data_limite)
+        except Exception:
+            caminho.unlink(missing_ok=True)
+            raise
+    return segmento
+
+
+def arquivar_transacoes(data_limite, contas_por_segmento=1000):
+    """Arquiva, faixa a faixa de contas, as transações anteriores a `data_limite`."""
+    conta_ids = list(ContaBancaria.objects.order_by("pk").values_list("pk", flat=True))
+    segmentos = []
+    for inicio in range(0, len(conta_ids), contas_por_segmento):
+        faixa = conta_ids[inicio : inicio + contas_por_segmento]
+        segmento = arquivar_faixa(faixa[0], faixa[-1], data_limite)
+        if segmento is not None:
+            segmentos.append(segmento)
+    return segmentos
+
+
+def _linhas_da_conta(segmento, conta_id, menor, maior, decrescente):
+    """
+    Gera as linhas da conta no segmento entre `menor` (inclusive) e `maior`
+    (exclusive), descomprimindo um bloco por vez e só os blocos que cruzam o
+    intervalo. Nada é aberto antes da primeira iteração.
+    """
+    blocos = segmento.indice.get(str(conta_id), [])
+    inicios = [(datetime.fromisoformat(data), pk) for _, _, data, pk in blocos]
+    # Cada bloco vai do seu início até o início do seguinte.
+    primeiro = max(bisect.bisect_right(inicios, menor) - 1, 0) if menor else 0
+    ultimo = bisect.bisect_left(inicios, maior) if maior else len(blocos)
+    escolhidos = blocos[primeiro:ultimo]
+    if not escolhidos:
+        return
+    with open(_caminho(segmento.arquivo), "rb") as arquivo:
+        for posicao, quantidade, _, _ in (
+            reversed(escolhidos) if decrescente else escolhidos
+        ):
+            arquivo.seek(posicao)
+            with gzip.GzipFile(fileobj=arquivo) as membro:
+                linhas = list(itertools.islice(membro, quantidade))
+            yield from _trecho(linhas, menor, maior, decrescente)
+
+
+def _chave(linha):
+    registro = json.loads(linha)
+    return datetime.fromisoformat(registro["data"]), registro["id"]
+
+
+def transacoes_arquivadas(
+    conta, data_inicio=None, data_fim=None, decrescente=False, antes_de=None
+):
+    """
+    Gerador das transações arquivadas da conta no período (datas inclusivas),
+    em (data, id) crescente ou decrescente; `antes_de`, um par (data, id) como
+    o cursor do extrato, deixa de fora essa linha e as mais novas. Nada é
+    consultado nem lido antes da primeira iteração, e só os segmentos que
+    cruzam o período são abertos; sem nada arquivado no período, não há
+    consulta alguma.
+    """
+    if conta.arquivado_ate is None or (
+        data_inicio and data_inicio >= conta.arquivado_ate
+    ):
+        return
+    segmentos = SegmentoArquivado.objects.filter(
+        conta_inicial__lte=conta.pk, conta_final__gte=conta.pk
+    )
+    # Limites em (data, id): ids são positivos, então (instante, 0) fica antes
+    # de qualquer linha daquele instante.
+    menor = maior = None
+    if data_inicio:
+        menor = (inicio_do_dia(data_inicio), 0)
+        segmentos = segmentos.filter(data_limite__gt=data_inicio)
+    if data_fim:
+        maior = (inicio_do_dia(data_fim + timedelta(1)), 0)
+    if antes_de:
+        maior = min(maior or antes_de, antes_de)
+    if maior:
+        segmentos = segmentos.filter(data_inicial__lte=maior[0])
+
+    grupos = _grupos_sobrepostos(segmentos.order_by("data_inicial", "pk"))
+    if decrescente:
+        grupos.reverse()
+    for grupo in grupos:
+        trechos = [
+            _linhas_da_conta(segmento, conta.pk, menor, maior, decrescente)
+            for segmento in grupo
+        ]
+        yield from heapq.merge(
+            *trechos, key=attrgetter("data", "id"), reverse=decrescente
+        )
+
+
+def _grupos_sobrepostos(segmentos):
+    # Segmentos de datas limite diferentes não se sobrepõem no tempo e são
+    # lidos um de cada vez, só quando a leitura chega a eles. Um segmento de
+    # transações retroativas (arquivamento repetido com a mesma data) pode
+    # cruzar os anteriores: esses são lidos juntos e intercalados.
+    grupos, fim = [], None
+    for segmento in segmentos:
+        if not grupos or segmento.data_inicial >= fim:
+            grupos.append([])
+            fim = segmento.data_inicial
+        grupos[-1].append(segmento)
+        fim = max(fim, inicio_do_dia(segmento.data_limite))
+    return grupos
+
+
+def _trecho(linhas, menor, maior, decrescente):
+    # As linhas do bloco estão em (data, id) crescente: a busca binária
+    # decodifica só log n linhas para achar o trecho pedido.
+    primeira = bisect.bisect_left(linhas, menor, key=_chave) if menor else 0
+    ultima = bisect.bisect_left(linhas, maior, key=_chave) if maior else len(linhas)
+    indices = range(primeira, ultima)
+    for indice in reversed(indices) if decrescente else indices:
+        yield _decodificar(linhas[indice])
@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+import uuid
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from contas.metricas import EVENTOS_CACHE
+from contas.models import ContaBancaria
+
+logger = logging.getLogger(__name__)
+
+# Cache de saldo por conta (SALDO_CACHE_ALIAS), para as consultas de saldo que
+# os apps fazem a todo momento. Depósito, saque e transferências gravam o saldo
+# novo depois do commit (write-through); as leituras que não o encontram
+# preenchem com o que leram do banco. Cada entrada leva a versão da conta
+# (ContaBancaria.versao) e só é substituída por uma versão maior, então nem
+# um commit atrasado nem uma leitura antiga (de uma réplica, por exemplo)
+# fazem o saldo voltar no tempo.
+
+PREFIXO = "saldo:"
+EVENTOS = ("hits", "misses", "gravacoes", "descartadas", "invalidacoes")
+# Tempo de vida da trava que torna "compara e grava" atômico entre processos.
+TRAVA_TTL = 1
+TRAVA_ESPERA = 0.001
+
+_estatisticas = Counter()
+_lock_estatisticas = threading.Lock()
+
+
+def _contar(evento):
+    with _lock_estatisticas:
+        _estatisticas[evento] += 1
+    EVENTOS_CACHE.labels("saldo", evento).inc()
+
+
+def obter_estatisticas_cache_saldo():
+    with _lock_estatisticas:
+        return {evento: _estatisticas[evento] for evento in EVENTOS}
+
+
+def zerar_estatisticas_cache_saldo():
+    with _lock_estatisticas:
+        _estatisticas.clear()
+
+
+def _cache():
+    return caches[settings.SALDO_CACHE_ALIAS]
+
+
+def _chave(conta_id):
+    return f"{PREFIXO}{conta_id}"
+
+
+def _chave_cliente(cliente_id):
+    return f"{PREFIXO}cliente:{cliente_id}"
+
+
+def _entrada(conta):
+    return {
+        "versao": conta.versao,
+        "conta_id": conta.pk,
+        "cliente_id": conta.cliente_id,
+        "numero_conta": conta.numero_conta,
+        "saldo": str(conta.saldo),
+    }
+
+
+def _gravar_se_mais_nova(entrada, esperar):
+    # O Django não tem compare-and-set; cache.add é atômico em todos os
+    # backends (inclusive o locmem dos testes) e serve de trava por conta. A
+    # trava guarda um token de quem a pegou: quem passou de TRAVA_TTL (e pode
+    # já ter sido ultrapassado por outro processo) não grava nem solta a
+    # trava alheia.
+    cache = _cache()
+    chave = _chave(entrada["conta_id"])
+    trava = f"{chave}:trava"
+    token = uuid.uuid4().hex
+    limite = time.monotonic() + (2 * TRAVA_TTL if esperar else 0)
+    while not cache.add(trava, token, TRAVA_TTL):
+        if time.monotonic() >= limite:
+            return False
+        time.sleep(TRAVA_ESPERA)
+    try:
+        valores = cache.get_many([chave, trava])
+        if valores.get(trava) != token:
+            return False
+        atual = valores.get(chave)
+        if atual is not None and atual["versao"] >= entrada["versao"]:
+            _contar("descartadas")
+            return True
+        cache.set(chave, entrada, settings.SALDO_CACHE_TTL)
+        _contar("gravacoes")
+        return True
+    finally:
+        if cache.get(trava) == token:
+            cache.delete(trava)
+
+
+def _publicar(entradas):
+    for entrada in entradas:
+        if not _gravar_se_mais_nova(entrada, esperar=True):
+            # Sem a trava não dá para comparar versões: remover é o mais seguro.
+            logger.warning("Cache de saldo da conta %s removido", entrada["conta_id"])
+            invalidar_saldo(entrada["conta_id"])
+
+
+def publicar_saldos(contas):
+    """
+    Agenda a gravação do saldo (e da versão) das contas no cache para depois
+    do commit. Chamada dentro da transação que alterou os saldos; se ela for
+    desfeita, nada é gravado.
+    """
+    if settings.SALDO_CACHE_TTL <= 0:
+        return
+    entradas = [_entrada(conta) for conta in contas]
+    # robust: uma falha do cache não pode virar erro depois do dinheiro movido.
+    transaction.on_commit(lambda: _publicar(entradas), robust=True)
+
+
+def guardar_saldo(conta):
+    """Preenche o cache com uma conta lida do banco, sem esperar pela trava."""
+    if settings.SALDO_CACHE_TTL > 0:
+        _gravar_se_mais_nova(_entrada(conta), esperar=False)
+
+
+def obter_saldo(conta_id):
+    if settings.SALDO_CACHE_TTL <= 0:
+        return None
+    entrada = _cache().get(_chave(conta_id))
+    _contar("misses" if entrada is None else "hits")
+    return entrada
+
+
+async def obter_saldo_async(conta_id):
+    if settings.SALDO_CACHE_TTL <= 0:
+        return None
+    entrada = await _cache().aget(_chave(conta_id))
+    _contar("misses" if entrada is None else "hits")
+    return entrada
+
+
+def montar_conta(entrada, cliente):
+    """ContaBancaria (não salva) para serializar uma entrada do cache."""
+    return ContaBancaria(
+        id=entrada["conta_id"],
+        numero_conta=entrada["numero_conta"],
+        saldo=Decimal(entrada["saldo"]),
+        versao=entrada["versao"],
+        cliente=cliente,
+    )
+
+
+def invalidar_saldo(conta_id):
+    _cache().delete(_chave(conta_id))
+    _contar("invalidacoes")
+
+
+def obter_conta_do_cliente(cliente_id):
+    # consultar_saldo busca a conta pelo cliente: o id da conta única do
+    # cliente também fica em cache (não muda; é removido se ele abrir outra).
+    return _cache().get(_chave_cliente(cliente_id))
+
+
+def guardar_conta_do_cliente(cliente_id, conta_id):
+    if settings.SALDO_CACHE_TTL > 0:
+        _cache().set(_chave_cliente(cliente_id), conta_id, settings.SALDO_CACHE_TTL)
+
+
+def invalidar_conta_do_cliente(cliente_id):
+    _cache().delete(_chave_cliente(cliente_id))
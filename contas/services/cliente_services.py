@@ -1,5 +1,11 @@
 from contas.models import Cliente, ContaBancaria, Transacao
+from contas.numeracao import gerar_numeros_conta
+from contas.services.cache_saldo_service import publicar_saldos
+from contas.services.saldo_diario_service import registrar_saldos_diarios
+from contas.services.saldo_service import aplicar_variacao_saldo
 from rest_framework.authtoken.models import Token
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
 from decimal import Decimal
 
 
@@ -19,32 +25,116 @@ def criar_cliente_e_conta(
     return cliente, conta, token
 
 
-def depositar_valor(numero_conta, valor):
-    conta = ContaBancaria.objects.get(numero_conta=numero_conta)
+def criar_clientes_em_lote(registros):
+    """
+    Cria clientes, contas e tokens de uma vez (três bulk_create e uma reserva
+    de números de conta) em uma transação. Cada registro traz cpf, nome,
+    email, data_nascimento e password já em formato de hash. CPFs e emails
+    já cadastrados são ignorados, então reprocessar um lote não duplica nada.
+
+    Retorna (criados, ignorados).
+    """
+    registros = list(registros)
+    with transaction.atomic():
+        cpfs = {r["cpf"] for r in registros}
+        emails = {r["email"] for r in registros}
+        existentes = set(
+            Cliente.objects.filter(cpf__in=cpfs).values_list("cpf", flat=True)
+        ) | set(
+            Cliente.objects.filter(email__in=emails).values_list("email", flat=True)
+        )
+
+        novos = []
+        for registro in registros:
+            if registro["cpf"] in existentes or registro["email"] in existentes:
+                continue
+            existentes.update((registro["cpf"], registro["email"]))
+            novos.append(Cliente(**registro))
+
+        clientes = Cliente.objects.bulk_create(novos)
+        numeros = gerar_numeros_conta(len(clientes))
+        ContaBancaria.objects.bulk_create(
+            ContaBancaria(cliente=cliente, numero_conta=numero)
+            for cliente, numero in zip(clientes, numeros)
+        )
+        # bulk_create não passa pelo Token.save(), que é quem gera a chave.
+        Token.objects.bulk_create(
+            Token(user=cliente, key=Token.generate_key()) for cliente in clientes
+        )
+    return len(clientes), len(registros) - len(clientes)
+
+
+def _filtros_conta(numero_conta, conta_id):
+    if conta_id is not None:
+        return {"pk": conta_id}
+    return {"numero_conta": numero_conta}
+
+
+def _diagnosticar_falha(filtros, cliente):
+    # Só roda quando o UPDATE não afetou nenhuma linha, para dizer o motivo.
+    dono = (
+        ContaBancaria.objects.filter(**filtros)
+        .values_list("cliente_id", flat=True)
+        .first()
+    )
+    if dono is None:
+        identificacao = filtros.get("numero_conta", "")
+        raise ContaBancaria.DoesNotExist(f"Conta {identificacao} não encontrada.")
+    if cliente is not None and dono != cliente.pk:
+        raise PermissionDenied("A conta informada pertence a outro cliente.")
+    raise ValueError("Saldo insuficiente")
+
+
+def _movimentar(tipo, filtros, valor_decimal, cliente):
+    """
+    Depósito/saque em uma ida ao banco: o UPDATE ... RETURNING confere a
+    titularidade (cliente_id) e o saldo e devolve a conta já atualizada.
+    """
+    if cliente is not None:
+        filtros = {**filtros, "cliente_id": cliente.pk}
+    if tipo == "D":
+        variacao, saldo_minimo = valor_decimal, None
+    else:
+        variacao, saldo_minimo = -valor_decimal, valor_decimal
+
+    with transaction.atomic():
+        conta = aplicar_variacao_saldo(filtros, variacao, saldo_minimo=saldo_minimo)
+        if conta is None:
+            filtros.pop("cliente_id", None)
+            _diagnosticar_falha(filtros, cliente)
+        Transacao.objects.create(
+            conta=conta, tipo=tipo, valor=valor_decimal, saldo_apos=conta.saldo
+        )
+        registrar_saldos_diarios([conta])
+        publicar_saldos([conta])
+
+    if cliente is not None:
+        # A titularidade foi conferida no UPDATE; o serializer não precisa
+        # buscar o cliente de novo.
+        conta.cliente = cliente
+    return conta
+
+
+def depositar_valor(numero_conta=None, valor=None, cliente=None, conta_id=None):
     valor_decimal = Decimal(str(valor))
 
     if valor_decimal <= 0:
         raise ValueError("O valor do depósito deve ser maior que zero.")
 
-    conta.saldo += valor_decimal
-    conta.save()
-    Transacao.objects.create(conta=conta, tipo="D", valor=valor_decimal)
-    return conta
+    return _movimentar(
+        "D", _filtros_conta(numero_conta, conta_id), valor_decimal, cliente
+    )
 
 
-def sacar_valor(numero_conta, valor):
-    conta = ContaBancaria.objects.get(numero_conta=numero_conta)
+def sacar_valor(numero_conta=None, valor=None, cliente=None, conta_id=None):
     valor_decimal = Decimal(str(valor))
 
     if valor_decimal <= 0:
         raise ValueError("O valor do saque deve ser maior que zero.")
-    if conta.saldo < valor_decimal:
-        raise ValueError("Saldo insuficiente")
 
-    conta.saldo -= valor_decimal
-    conta.save()
-    Transacao.objects.create(conta=conta, tipo="S", valor=valor_decimal)
-    return conta
+    return _movimentar(
+        "S", _filtros_conta(numero_conta, conta_id), valor_decimal, cliente
+    )
 
 
 def transferir_valor(conta_origem_numero, conta_destino_numero, valor):
@@ -0,0 +1,72 @@
+import csv
+import itertools
+import json
+from datetime import timedelta
+
+from contas.models import Transacao
+from contas.serializers import (
+    CAMPOS_TRANSACAO_VALORES,
+    iterar_transacoes_serializadas,
+)
+from contas.services.arquivamento_service import transacoes_arquivadas
+from contas.services.saldo_diario_service import inicio_do_dia
+
+CAMPOS_EXPORTACAO = [
+    "id",
+    "conta",
+    "tipo",
+    "tipo_descricao",
+    "valor",
+    "saldo_apos",
+    "data",
+]
+TAMANHO_LOTE_EXPORTACAO = 2000
+
+
+class _Eco:
+    # Buffer falso para o csv.writer: devolve a linha em vez de acumulá-la.
+    def write(self, valor):
+        return valor
+
+
+def filtrar_periodo(queryset, data_inicio=None, data_fim=None):
+    # Datas inclusivas. Com a tabela particionada por mês (PostgreSQL), a
+    # faixa em `data` faz o banco ler só as partições do período.
+    if data_inicio:
+        queryset = queryset.filter(data__gte=inicio_do_dia(data_inicio))
+    if data_fim:
+        queryset = queryset.filter(data__lt=inicio_do_dia(data_fim + timedelta(1)))
+    return queryset
+
+
+def linhas_extrato(conta, data_inicio=None, data_fim=None):
+    queryset = filtrar_periodo(
+        Transacao.objects.filter(conta=conta), data_inicio, data_fim
+    )
+
+    linhas = queryset.order_by("data", "id").values_list(*CAMPOS_TRANSACAO_VALORES)
+    # O arquivo frio só tem transações mais antigas que as da tabela, então
+    # vem antes; seus segmentos só são abertos se o período chega até eles.
+    arquivadas = transacoes_arquivadas(conta, data_inicio, data_fim)
+    # Mesmo formato do extrato JSON (TransacaoSerializer).
+    return iterar_transacoes_serializadas(
+        itertools.chain(arquivadas, linhas.iterator(chunk_size=TAMANHO_LOTE_EXPORTACAO))
+    )
+
+
+def gerar_csv(linhas):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(CAMPOS_EXPORTACAO)
+    for linha in linhas:
+        yield writer.writerow([linha[campo] for campo in CAMPOS_EXPORTACAO])
+
+
+def gerar_ndjson(linhas):
+    for linha in linhas:
+        yield json.dumps(linha, ensure_ascii=False) + "\n"
+
+
+FORMATOS_EXPORTACAO = {
+    "csv": (gerar_csv, "text/csv; charset=utf-8"),
+    "ndjson": (gerar_ndjson, "application/x-ndjson; charset=utf-8"),
+}
@@ -0,0 +1,93 @@
+import functools
+import logging
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import OperationalError, connections, router
+
+from contas.metricas import EVENTOS_TRANSACAO
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE de serialization_failure e deadlock_detected no PostgreSQL.
+CODIGOS_RETENTAVEIS = {"40001", "40P01"}
+
+_contadores = Counter()
+_lock_contadores = threading.Lock()
+
+
+def _erro_retentavel(exc):
+    causa = exc.__cause__
+    codigo = getattr(causa, "pgcode", None) or getattr(causa, "sqlstate", None)
+    return codigo in CODIGOS_RETENTAVEIS
+
+
+def _incrementar(operacao, evento):
+    with _lock_contadores:
+        _contadores[(operacao, evento)] += 1
+    EVENTOS_TRANSACAO.labels(operacao, evento).inc()
+
+
+def obter_contadores_retentativa():
+    with _lock_contadores:
+        resultado = {}
+        for (operacao, evento), total in _contadores.items():
+            resultado.setdefault(operacao, {})[evento] = total
+        return resultado
+
+
+def zerar_contadores_retentativa():
+    with _lock_contadores:
+        _contadores.clear()
+
+
+def com_retentativa(operacao, model):
+    """
+    Reexecuta a função decorada quando o banco aborta a transação por deadlock
+    ou falha de serialização, com backoff exponencial e jitter. Só retenta
+    quando a chamada abre a transação mais externa; dentro de um atomic() já
+    aberto o erro é repassado para quem controla a transação.
+    """
+
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            connection = connections[router.db_for_write(model)]
+            if connection.in_atomic_block:
+                return func(*args, **kwargs)
+
+            max_tentativas = settings.TRANSACAO_MAX_TENTATIVAS
+            espera_base = settings.TRANSACAO_RETENTATIVA_ESPERA_BASE
+            tentativa = 1
+            while True:
+                _incrementar(operacao, "tentativas")
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as exc:
+                    if not _erro_retentavel(exc):
+                        raise
+                    if tentativa >= max_tentativas:
+                        _incrementar(operacao, "esgotadas")
+                        logger.error(
+                            "%s: conflito de concorrência após %d tentativas",
+                            operacao,
+                            tentativa,
+                        )
+                        raise
+                    _incrementar(operacao, "retentativas")
+                    espera = random.uniform(0, espera_base * 2 ** (tentativa - 1))
+                    logger.warning(
+                        "%s: conflito de concorrência (%s), nova tentativa em %.3fs",
+                        operacao,
+                        exc,
+                        espera,
+                    )
+                    time.sleep(espera)
+                    tentativa += 1
+
+        return wrapper
+
+    return decorador
@@ -0,0 +1,133 @@
+import itertools
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from contas.models import ContaBancaria, SaldoDiario, Transacao
+from contas.services.saldo_service import valor_com_sinal
+
+
+def inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _soma_transacoes(conta_id, **filtros):
+    total = Transacao.objects.filter(conta_id=conta_id, **filtros).aggregate(
+        total=Sum(valor_com_sinal())
+    )["total"]
+    return total or Decimal("0.00")
+
+
+def registrar_saldos_diarios(contas, data=None):
+    """
+    Grava o saldo atual de cada conta como saldo de fechamento do dia, em um
+    único upsert. Deve rodar na mesma transação que alterou os saldos.
+    """
+    data = data or timezone.localdate()
+    SaldoDiario.objects.bulk_create(
+        [
+            SaldoDiario(conta_id=conta.pk, data=data, saldo=conta.saldo)
+            for conta in contas
+        ],
+        update_conflicts=True,
+        unique_fields=["conta", "data"],
+        update_fields=["saldo"],
+    )
+
+
+def saldo_em(conta_id, data):
+    """
+    Saldo de fechamento da conta no dia `data`, partindo do snapshot mais
+    próximo e somando apenas as transações entre ele e a data pedida.
+    """
+    fim_do_dia = inicio_do_dia(data + timedelta(days=1))
+    snapshots = SaldoDiario.objects.filter(conta_id=conta_id).values_list(
+        "data", "saldo"
+    )
+
+    anterior = snapshots.filter(data__lte=data).order_by("-data").first()
+    if anterior is not None:
+        data_snapshot, saldo = anterior
+        return saldo + _soma_transacoes(
+            conta_id,
+            data__gte=inicio_do_dia(data_snapshot + timedelta(days=1)),
+            data__lt=fim_do_dia,
+        )
+
+    posterior = snapshots.filter(data__gt=data).order_by("data").first()
+    if posterior is not None:
+        data_snapshot, saldo = posterior
+        return saldo - _soma_transacoes(
+            conta_id,
+            data__gte=fim_do_dia,
+            data__lt=inicio_do_dia(data_snapshot + timedelta(days=1)),
+        )
+
+    # Conta sem nenhum snapshot: desfaz, a partir do saldo atual, o que
+    # aconteceu depois da data.
+    saldo = ContaBancaria.objects.values_list("saldo", flat=True).get(pk=conta_id)
+    return saldo - _soma_transacoes(conta_id, data__gte=fim_do_dia)
+
+
+def recalcular_saldos_diarios(conta_ids, com_abertura=False):
+    """
+    Reconstrói os snapshots das contas informadas a partir do histórico:
+    agrega a variação diária no banco e percorre os dias do mais recente
+    para o mais antigo a partir do saldo atual. Os dias anteriores a
+    `arquivado_ate` não estão mais na tabela: seus snapshots são mantidos.
+
+    Com `com_abertura`, as contas ainda não arquivadas ganham também o
+    snapshot da véspera da primeira transação (o saldo de abertura), para
+    que saldo_em continue exato antes dela quando o histórico for arquivado.
+    """
+    with transaction.atomic():
+        contas = (
+            ContaBancaria.objects.select_for_update()
+            .filter(pk__in=conta_ids)
+            .values_list("pk", "saldo", "arquivado_ate")
+        )
+        saldos_atuais, por_arquivamento = {}, {}
+        for pk, saldo, arquivado_ate in contas:
+            saldos_atuais[pk] = saldo
+            por_arquivamento.setdefault(arquivado_ate, []).append(pk)
+        nao_arquivadas = por_arquivamento.pop(None, [])
+        transacoes = Q(conta_id__in=nao_arquivadas)
+        recalculaveis = Q(conta_id__in=nao_arquivadas)
+        for arquivado_ate, ids in por_arquivamento.items():
+            transacoes |= Q(conta_id__in=ids, data__gte=inicio_do_dia(arquivado_ate))
+            recalculaveis |= Q(conta_id__in=ids, data__gte=arquivado_ate)
+
+        variacoes = (
+            Transacao.objects.filter(transacoes)
+            .annotate(dia=TruncDate("data"))
+            .values("conta_id", "dia")
+            .annotate(variacao=Sum(valor_com_sinal()))
+            .order_by("conta_id", "-dia")
+        )
+        abrir = set(nao_arquivadas) if com_abertura else set()
+        snapshots = []
+        for conta_id, dias in itertools.groupby(
+            variacoes, key=lambda linha: linha["conta_id"]
+        ):
+            saldo = saldos_atuais[conta_id]
+            for linha in dias:
+                snapshots.append(
+                    SaldoDiario(conta_id=conta_id, data=linha["dia"], saldo=saldo)
+                )
+                saldo -= linha["variacao"]
+            if conta_id in abrir:
+                snapshots.append(
+                    SaldoDiario(
+                        conta_id=conta_id,
+                        data=linha["dia"] - timedelta(days=1),
+                        saldo=saldo,
+                    )
+                )
+
+        SaldoDiario.objects.filter(recalculaveis).delete()
+        SaldoDiario.objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
@@ -0,0 +1,119 @@
+from decimal import Decimal
+
+from django.db import connections, router, transaction
+from django.db.models import Case, DecimalField, F, Sum, When, Window
+from django.db.models.sql import UpdateQuery
+
+from contas.models import ContaBancaria, Transacao
+
+CAMPOS_RETORNADOS = ["id", "cliente_id", "numero_conta", "saldo", "versao"]
+
+
+def _suporta_update_returning(connection):
+    # O Django não tem uma feature para UPDATE ... RETURNING (as de "returning"
+    # falam de INSERT), então a checagem é por banco: o PostgreSQL sempre
+    # aceita, o SQLite a partir da 3.35. MySQL/MariaDB e os demais usam o
+    # UPDATE seguido de SELECT.
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor == "sqlite":
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _sql_update(queryset, valores, using):
+    # Única dependência de API interna do Django (django.db.models.sql): o SQL
+    # do UPDATE é gerado como em QuerySet.update(), que não devolve colunas.
+    # Os testes de aplicar_variacao_saldo cobrem o SQL gerado em SQLite e
+    # PostgreSQL; se a API mudar, troque por select_for_update + update com F().
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(valores)
+    return query.get_compiler(using).as_sql()
+
+
+def _montar_conta(using, valores):
+    conta = ContaBancaria.from_db(using, CAMPOS_RETORNADOS, valores)
+    conta.saldo = Decimal(str(conta.saldo)).quantize(Decimal("0.01"))
+    return conta
+
+
+def aplicar_variacao_saldo(filtros, variacao, saldo_minimo=None):
+    """
+    Aplica `variacao` ao saldo (e incrementa a versão) em um único UPDATE
+    condicional e devolve a conta com o saldo novo, ou None se nenhuma linha
+    satisfez os filtros (conta inexistente ou, quando `saldo_minimo` é
+    informado, saldo insuficiente).
+
+    Deve ser chamada dentro de `transaction.atomic()`.
+    """
+    using = router.db_for_write(ContaBancaria)
+    connection = connections[using]
+    queryset = ContaBancaria.objects.using(using).filter(**filtros)
+    if saldo_minimo is not None:
+        queryset = queryset.filter(saldo__gte=saldo_minimo)
+
+    if not _suporta_update_returning(connection):
+        if not queryset.update(saldo=F("saldo") + variacao, versao=F("versao") + 1):
+            return None
+        return ContaBancaria.objects.using(using).get(**filtros)
+
+    sql, params = _sql_update(
+        queryset, {"saldo": F("saldo") + variacao, "versao": F("versao") + 1}, using
+    )
+    colunas = ", ".join(connection.ops.quote_name(c) for c in CAMPOS_RETORNADOS)
+    with connection.cursor() as cursor:
+        cursor.execute(f"{sql} RETURNING {colunas}", params)
+        linha = cursor.fetchone()
+    if linha is None:
+        return None
+    return _montar_conta(using, linha)
+
+
+def valor_com_sinal():
+    return Case(
+        When(tipo__in=Transacao.TIPOS_CREDITO, then=F("valor")),
+        default=-F("valor"),
+        output_field=DecimalField(max_digits=12, decimal_places=2),
+    )
+
+
+def preencher_saldo_apos(conta_ids):
+    """
+    Calcula `Transacao.saldo_apos` de todo o histórico das contas informadas em
+    um único UPDATE ... FROM com funções de janela: o saldo após cada linha é o
+    saldo atual menos tudo o que entrou/saiu depois dela, na ordem (data, id).
+    """
+    acumulado = Window(
+        Sum(valor_com_sinal()),
+        partition_by=[F("conta_id")],
+        order_by=[F("data").asc(), F("id").asc()],
+    )
+    total = Window(Sum(valor_com_sinal()), partition_by=[F("conta_id")])
+    janela = (
+        Transacao.objects.filter(conta_id__in=conta_ids)
+        .annotate(acumulado=acumulado, total=total, saldo_atual=F("conta__saldo"))
+        .values("id", "acumulado", "total", "saldo_atual")
+        .order_by()
+    )
+
+    using = router.db_for_write(Transacao)
+    connection = connections[using]
+    sql, params = janela.query.get_compiler(using).as_sql()
+    tabela = connection.ops.quote_name(Transacao._meta.db_table)
+    coluna = connection.ops.quote_name("saldo_apos")
+    with transaction.atomic(using=using):
+        # Trava as contas para que nenhuma operação mude o saldo no meio do cálculo.
+        list(
+            ContaBancaria.objects.using(using)
+            .select_for_update()
+            .filter(pk__in=conta_ids)
+            .values_list("pk")
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {tabela} SET {coluna} = "
+                f"ROUND(janela.saldo_atual - janela.total + janela.acumulado, 2) "
+                f"FROM ({sql}) AS janela WHERE {tabela}.id = janela.id",
+                params,
+            )
+            return cursor.rowcount
@@ -1,10 +1,60 @@
+from contas.metricas import medir_espera_trava
 from contas.models import ContaBancaria, Transacao
+from contas.services.cache_saldo_service import publicar_saldos
+from contas.services.retentativa import com_retentativa
+from contas.services.saldo_diario_service import registrar_saldos_diarios
+from django.core.exceptions import PermissionDenied
 from django.db import transaction
+from django.db.models import Q
 from decimal import Decimal
-from django.utils import timezone
 
 
-def transferir_valor(conta_origem_numero, conta_destino_numero, valor_transferencia):
+def _travar_contas_transferencia(
+    conta_origem_numero, conta_origem_id, conta_destino_numero, cliente
+):
+    if conta_origem_id is not None:
+        filtro_origem = Q(pk=conta_origem_id)
+    else:
+        filtro_origem = Q(numero_conta=conta_origem_numero)
+
+    # As duas linhas são travadas em uma única consulta, sempre na ordem da
+    # pk, para que transferências cruzadas (A→B e B→A) não entrem em deadlock.
+    conta_origem = conta_destino = None
+    with medir_espera_trava("transferencia"):
+        contas = list(
+            ContaBancaria.objects.select_for_update()
+            .filter(filtro_origem | Q(numero_conta=conta_destino_numero))
+            .order_by("pk")
+        )
+    for conta in contas:
+        if conta.pk == conta_origem_id or conta.numero_conta == conta_origem_numero:
+            conta_origem = conta
+        if conta.numero_conta == conta_destino_numero:
+            conta_destino = conta
+
+    if cliente is not None and (
+        conta_origem is None or conta_origem.cliente_id != cliente.pk
+    ):
+        # Com cliente informado, conta inexistente e conta de terceiro
+        # respondem igual, sem revelar quais contas existem.
+        raise PermissionDenied("Você só pode transferir a partir da sua própria conta.")
+    if conta_origem is None:
+        raise ValueError(f"Conta de origem {conta_origem_numero} não encontrada.")
+    if conta_destino is None:
+        raise ValueError(f"Conta de destino {conta_destino_numero} não encontrada.")
+    if conta_origem is conta_destino:
+        raise ValueError("Conta de origem e destino não podem ser iguais.")
+    return conta_origem, conta_destino
+
+
+@com_retentativa("transferencia", ContaBancaria)
+def transferir_valor(
+    conta_origem_numero=None,
+    conta_destino_numero=None,
+    valor_transferencia=None,
+    cliente=None,
+    conta_origem_id=None,
+):
     try:
         valor_decimal = Decimal(str(valor_transferencia))
     except Exception:
@@ -17,36 +67,164 @@ def transferir_valor(conta_origem_numero, conta_destino_numero, valor_transferen
         raise ValueError("Conta de origem e destino não podem ser iguais.")
 
     with transaction.atomic():
-        try:
-            conta_origem = ContaBancaria.objects.select_for_update().get(
-                numero_conta=conta_origem_numero
-            )
-        except ContaBancaria.DoesNotExist:
-            raise ValueError(f"Conta de origem {conta_origem_numero} não encontrada.")
-
-        try:
-            conta_destino = ContaBancaria.objects.get(numero_conta=conta_destino_numero)
-        except ContaBancaria.DoesNotExist:
-            raise ValueError(f"Conta de destino {conta_destino_numero} não encontrada.")
+        conta_origem, conta_destino = _travar_contas_transferencia(
+            conta_origem_numero, conta_origem_id, conta_destino_numero, cliente
+        )
 
-        if conta_origem.saldo < valor_transferencia:
+        if conta_origem.saldo < valor_decimal:
             raise ValueError("Saldo insuficiente para transferência")
 
-        conta_origem.saldo -= valor_transferencia
-        conta_destino.saldo += valor_transferencia
+        conta_origem.saldo -= valor_decimal
+        conta_destino.saldo += valor_decimal
+        conta_origem.versao += 1
+        conta_destino.versao += 1
+
+        conta_origem.save(update_fields=["saldo", "versao"])
+        conta_destino.save(update_fields=["saldo", "versao"])
+
+        Transacao.objects.bulk_create(
+            [
+                Transacao(
+                    conta=conta_origem,
+                    tipo="TE",
+                    valor=valor_decimal,
+                    saldo_apos=conta_origem.saldo,
+                ),
+                Transacao(
+                    conta=conta_destino,
+                    tipo="TR",
+                    valor=valor_decimal,
+                    saldo_apos=conta_destino.saldo,
+                ),
+            ]
+        )
+        registrar_saldos_diarios([conta_origem, conta_destino])
+        publicar_saldos([conta_origem, conta_destino])
+
+    if cliente is not None:
+        conta_origem.cliente = cliente
+    return conta_origem, conta_destino
+
+
+MODO_TUDO_OU_NADA = "tudo_ou_nada"
+MODO_RELATORIO = "relatorio"
+
+
+class LoteRejeitadoError(ValueError):
+    def __init__(self, mensagem, resultados):
+        super().__init__(mensagem)
+        self.resultados = resultados
 
-        conta_origem.save()
-        conta_destino.save()
 
-        Transacao.objects.create(
-            conta=conta_origem,
-            tipo="TE",
-            valor=valor_decimal,
+def _validar_itens_lote(conta_origem, itens, contas):
+    resultados = []
+    for indice, item in enumerate(itens):
+        numero_destino = item["conta_destino"]
+        valor_decimal = Decimal(str(item["valor"]))
+        erro = None
+        if valor_decimal <= Decimal("0.00"):
+            erro = "O valor da transferência deve ser positivo."
+        elif numero_destino == conta_origem.numero_conta:
+            erro = "Conta de origem e destino não podem ser iguais."
+        elif numero_destino not in contas:
+            erro = f"Conta de destino {numero_destino} não encontrada."
+        resultados.append(
+            {
+                "indice": indice,
+                "conta_destino": numero_destino,
+                "valor": valor_decimal,
+                "erro": erro,
+            }
         )
-        Transacao.objects.create(
-            conta=conta_destino,
-            tipo="TR",
-            valor=valor_decimal,
+    return resultados
+
+
+def _rejeitar_lote(resultados, motivo):
+    # Nada foi aplicado: itens sem erro próprio também saem como rejeitados.
+    for resultado in resultados:
+        resultado["erro"] = resultado["erro"] or motivo
+    raise LoteRejeitadoError(motivo, resultados)
+
+
+def _aplicar_lote(conta_origem, resultados, contas):
+    saldo_disponivel = conta_origem.saldo
+    creditos = {}
+    transacoes = []
+    for resultado in resultados:
+        if resultado["erro"]:
+            continue
+        valor_decimal = resultado["valor"]
+        if valor_decimal > saldo_disponivel:
+            resultado["erro"] = "Saldo insuficiente para transferência"
+            continue
+        saldo_disponivel -= valor_decimal
+        conta_destino = contas[resultado["conta_destino"]]
+        conta_destino.saldo += valor_decimal
+        if conta_destino.pk not in creditos:
+            conta_destino.versao += 1
+        creditos[conta_destino.pk] = conta_destino
+        transacoes.append(
+            Transacao(
+                conta=conta_origem,
+                tipo="TE",
+                valor=valor_decimal,
+                saldo_apos=saldo_disponivel,
+            )
         )
+        transacoes.append(
+            Transacao(
+                conta=conta_destino,
+                tipo="TR",
+                valor=valor_decimal,
+                saldo_apos=conta_destino.saldo,
+            )
+        )
+
+    if transacoes:
+        conta_origem.saldo = saldo_disponivel
+        conta_origem.versao += 1
+        conta_origem.save(update_fields=["saldo", "versao"])
+        ContaBancaria.objects.bulk_update(creditos.values(), ["saldo", "versao"])
+        Transacao.objects.bulk_create(transacoes)
+        registrar_saldos_diarios([conta_origem, *creditos.values()])
+        publicar_saldos([conta_origem, *creditos.values()])
+
+
+@com_retentativa("transferencia_lote", ContaBancaria)
+def transferir_em_lote(conta_origem_numero, itens, modo=MODO_TUDO_OU_NADA):
+    if modo not in (MODO_TUDO_OU_NADA, MODO_RELATORIO):
+        raise ValueError(f"Modo de lote inválido: {modo}.")
+    if not itens:
+        raise ValueError("O lote deve conter ao menos uma transferência.")
+
+    numeros_destino = {item["conta_destino"] for item in itens}
+
+    with transaction.atomic():
+        # Origem e destinos são validados e travados em uma única consulta,
+        # na mesma ordem por pk usada em transferir_valor.
+        with medir_espera_trava("transferencia_lote"):
+            contas = {
+                conta.numero_conta: conta
+                for conta in ContaBancaria.objects.select_for_update()
+                .filter(numero_conta__in=numeros_destino | {conta_origem_numero})
+                .order_by("pk")
+            }
+
+        conta_origem = contas.get(conta_origem_numero)
+        if conta_origem is None:
+            raise ValueError(f"Conta de origem {conta_origem_numero} não encontrada.")
+
+        resultados = _validar_itens_lote(conta_origem, itens, contas)
+
+        if modo == MODO_TUDO_OU_NADA:
+            if any(r["erro"] for r in resultados):
+                _rejeitar_lote(
+                    resultados, "Lote rejeitado: há transferências inválidas."
+                )
+            total = sum((r["valor"] for r in resultados), Decimal("0.00"))
+            if total > conta_origem.saldo:
+                _rejeitar_lote(resultados, "Saldo insuficiente para o lote.")
+
+        _aplicar_lote(conta_origem, resultados, contas)
 
-        return conta_origem, conta_destino
+        return conta_origem, resultados
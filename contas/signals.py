@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from contas.authentication import invalidar_clientes, invalidar_token
+from contas.conexoes import registrar_conexao_obtida
+from contas.models import Cliente, ContaBancaria
+from contas.services.cache_saldo_service import (
+    invalidar_conta_do_cliente,
+    invalidar_saldo,
+)
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidar_token_alterado(sender, instance, **kwargs):
+    # Logout e rotação apagam/recriam o Token.
+    invalidar_token(instance.key)
+
+
+@receiver(post_save, sender=Cliente)
+def invalidar_tokens_do_cliente(sender, instance, created=False, **kwargs):
+    # Desativação ou qualquer alteração do cliente não pode continuar servida
+    # por uma cópia antiga em cache.
+    if created:
+        return
+    invalidar_clientes([instance.pk])
+
+
+@receiver(connection_created)
+def contar_conexao_obtida(sender, connection, **kwargs):
+    registrar_conexao_obtida(connection.alias)
+
+
+@receiver(post_save, sender=ContaBancaria)
+def invalidar_cache_saldo_alterado(sender, instance, created=False, **kwargs):
+    # Os serviços de saldo gravam o cache por conta própria (update_fields com
+    # "versao"); saves de fora deles, como o admin, só invalidam.
+    if created:
+        cliente_id = instance.cliente_id
+        transaction.on_commit(lambda: invalidar_conta_do_cliente(cliente_id))
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields is None or "versao" not in update_fields:
+        conta_id = instance.pk
+        transaction.on_commit(lambda: invalidar_saldo(conta_id))
+
+
+@receiver(post_delete, sender=ContaBancaria)
+def invalidar_cache_saldo_removido(sender, instance, **kwargs):
+    conta_id, cliente_id = instance.pk, instance.cliente_id
+    transaction.on_commit(lambda: invalidar_saldo(conta_id))
+    transaction.on_commit(lambda: invalidar_conta_do_cliente(cliente_id))
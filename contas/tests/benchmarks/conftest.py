@@ -0,0 +1,32 @@
+import os
+import time
+from contextlib import contextmanager
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def tamanho(nome, padrao):
+    # Volumes configuráveis por variável de ambiente, ex.: BENCH_CONTAS=20000
+    return int(os.environ.get(nome, padrao))
+
+
+@pytest.fixture
+def relatorio(capsys):
+    linhas = []
+    yield linhas.append
+    with capsys.disabled():
+        print()
+        for linha in linhas:
+            print(linha)
+
+
+@contextmanager
+def medir():
+    resultado = {}
+    with CaptureQueriesContext(connection) as queries:
+        inicio = time.perf_counter()
+        yield resultado
+        resultado["segundos"] = time.perf_counter() - inicio
+    resultado["queries"] = len(queries.captured_queries)
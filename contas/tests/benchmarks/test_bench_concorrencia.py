@@ -0,0 +1,200 @@
+import multiprocessing
+import random
+import statistics
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from django.db import connection, connections
+from django.db.models import Sum
+from django.utils import timezone
+
+from contas.models import ContaBancaria, SaldoDiario, Transacao
+from contas.services.cliente_services import (
+    criar_cliente_e_conta,
+    depositar_valor,
+    sacar_valor,
+)
+from contas.services.retentativa import (
+    obter_contadores_retentativa,
+    zerar_contadores_retentativa,
+)
+from contas.services.saldo_service import valor_com_sinal
+from contas.services.transferencia_service import transferir_valor
+
+from .conftest import tamanho
+
+# Depósitos, saques e transferências cruzadas disputando poucas contas, com
+# threads (como as do gunicorn) e com processos (como os workers). No fim,
+# confere que nenhum centavo apareceu ou sumiu.
+#
+#   DATABASE_URL=postgres://... pytest -m benchmark -s contas/tests/benchmarks/test_bench_concorrencia.py
+#   SQLITE_ARQUIVO_TESTES=/tmp/teste.sqlite3 pytest -m benchmark -s ...
+N_CONTAS = tamanho("BENCH_CONCORRENCIA_CONTAS", 8)
+OPERACOES = tamanho("BENCH_CONCORRENCIA_OPERACOES", 2000)
+THREADS = tamanho("BENCH_CONCORRENCIA_THREADS", 8)
+PROCESSOS = tamanho("BENCH_CONCORRENCIA_PROCESSOS", 4)
+SALDO_INICIAL = Decimal("1000.00")
+# Saques e transferências maiores que os depósitos para que saldo
+# insuficiente também aconteça.
+VALORES = {"deposito": (1, 50), "saque": (1, 120), "transferencia": (1, 200)}
+
+
+def _operar(sorteio, contas):
+    tipo = sorteio.choice(list(VALORES))
+    valor = Decimal(sorteio.randint(*VALORES[tipo]))
+    conta_id, numero = sorteio.choice(contas)
+    inicio = time.perf_counter()
+    try:
+        if tipo == "deposito":
+            depositar_valor(conta_id=conta_id, valor=valor)
+        elif tipo == "saque":
+            sacar_valor(conta_id=conta_id, valor=valor)
+        else:
+            _, destino = sorteio.choice([c for c in contas if c[0] != conta_id])
+            transferir_valor(
+                conta_origem_id=conta_id,
+                conta_destino_numero=destino,
+                valor_transferencia=valor,
+            )
+        resultado = "ok"
+    except ValueError as exc:
+        # Saldo insuficiente é recusa esperada; qualquer outro erro derruba o teste.
+        if "insuficiente" not in str(exc):
+            raise
+        resultado = "recusada"
+    return tipo, resultado, valor, time.perf_counter() - inicio
+
+
+def _trabalhador(semente, contas, operacoes):
+    sorteio = random.Random(semente)
+    zerar_contadores_retentativa()
+    try:
+        medicoes = [_operar(sorteio, contas) for _ in range(operacoes)]
+    finally:
+        connections.close_all()
+    return medicoes, obter_contadores_retentativa()
+
+
+def _rodar(modo, contas):
+    concorrencia = THREADS if modo == "threads" else PROCESSOS
+    if modo == "threads":
+        executor = ThreadPoolExecutor(max_workers=concorrencia)
+    else:
+        # fork herda o Django já configurado e apontando para a base de teste;
+        # nenhuma conexão (nem pool) pode atravessar o fork.
+        connections.close_all()
+        if hasattr(connection, "close_pool"):
+            connection.close_pool()
+        executor = ProcessPoolExecutor(
+            max_workers=concorrencia, mp_context=multiprocessing.get_context("fork")
+        )
+    por_trabalhador = OPERACOES // concorrencia
+    with executor:
+        inicio = time.perf_counter()
+        futuros = [
+            executor.submit(_trabalhador, semente, contas, por_trabalhador)
+            for semente in range(concorrencia)
+        ]
+        resultados = [futuro.result() for futuro in futuros]
+        total = time.perf_counter() - inicio
+    medicoes = [medicao for lista, _ in resultados for medicao in lista]
+    retentativas = sum(
+        eventos.get("retentativas", 0)
+        for _, contadores in resultados
+        for eventos in contadores.values()
+    )
+    return medicoes, total, retentativas
+
+
+def _percentil(latencias, fracao):
+    return latencias[min(len(latencias) - 1, int(len(latencias) * fracao))] * 1000
+
+
+def _relatar(relatorio, modo, medicoes, total, retentativas):
+    relatorio(
+        f"  {modo}: {len(medicoes) / total:8.1f} op/s, "
+        f"{retentativas} retentativas por deadlock/serialização"
+    )
+    por_tipo = defaultdict(list)
+    for tipo, resultado, _, segundos in medicoes:
+        por_tipo[tipo].append((resultado, segundos))
+    for tipo, lista in sorted(por_tipo.items()):
+        latencias = sorted(segundos for _, segundos in lista)
+        recusadas = sum(1 for resultado, _ in lista if resultado == "recusada")
+        relatorio(
+            f"    {tipo:<14} {len(lista):6d} ops ({recusadas:5d} recusadas) "
+            f"p50 {statistics.median(latencias) * 1000:7.2f}ms "
+            f"p95 {_percentil(latencias, 0.95):7.2f}ms "
+            f"p99 {_percentil(latencias, 0.99):7.2f}ms"
+        )
+
+
+def _conferir(contas, medicoes, total_antes):
+    # Só depósitos e saques mudam o total; transferências apenas o movem.
+    variacao = Decimal("0.00")
+    esperadas = 0
+    for tipo, resultado, valor, _ in medicoes:
+        if resultado != "ok":
+            continue
+        variacao += {"deposito": valor, "saque": -valor}.get(tipo, 0)
+        esperadas += 2 if tipo == "transferencia" else 1
+
+    ids = [conta_id for conta_id, _ in contas]
+    saldos = dict(ContaBancaria.objects.filter(pk__in=ids).values_list("pk", "saldo"))
+    assert sum(saldos.values()) == total_antes + variacao
+    assert min(saldos.values()) >= 0
+    assert Transacao.objects.filter(conta_id__in=ids).count() == esperadas
+
+    # Cada conta: saldo = inicial + histórico, e o saldo_apos da última
+    # transação e o snapshot do dia batem com o saldo final.
+    historico = dict(
+        Transacao.objects.filter(conta_id__in=ids)
+        .values("conta_id")
+        .annotate(total=Sum(valor_com_sinal()))
+        .values_list("conta_id", "total")
+    )
+    snapshots = dict(
+        SaldoDiario.objects.filter(
+            conta_id__in=ids, data=timezone.localdate()
+        ).values_list("conta_id", "saldo")
+    )
+    for conta_id, saldo in saldos.items():
+        assert saldo == SALDO_INICIAL + historico.get(conta_id, 0)
+        ultima = Transacao.objects.filter(conta_id=conta_id).order_by("-id").first()
+        if ultima is not None:
+            assert ultima.saldo_apos == saldo
+            assert snapshots[conta_id] == saldo
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize("modo", ["threads", "processos"])
+def test_bench_concorrencia_operacoes(modo, relatorio):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip(
+            "a base SQLite em memória não aceita escritas concorrentes: "
+            "use PostgreSQL ou SQLITE_ARQUIVO_TESTES"
+        )
+    contas = []
+    for indice in range(N_CONTAS):
+        _, conta, _ = criar_cliente_e_conta(
+            cpf=f"{77700000000 + indice}",
+            nome=f"Concorrência {indice}",
+            email=f"concorrencia{indice}@example.com",
+            senha="x",
+        )
+        contas.append((conta.pk, conta.numero_conta))
+    ContaBancaria.objects.update(saldo=SALDO_INICIAL)
+    total_antes = SALDO_INICIAL * N_CONTAS
+
+    medicoes, total, retentativas = _rodar(modo, contas)
+
+    relatorio(
+        f"Concorrência ({connection.vendor}): {len(medicoes)} operações "
+        f"em {N_CONTAS} contas"
+    )
+    _relatar(relatorio, modo, medicoes, total, retentativas)
+    _conferir(contas, medicoes, total_antes)
@@ -0,0 +1,118 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from contas.conexoes import obter_estatisticas_conexoes, zerar_estatisticas_conexoes
+from contas.services.cliente_services import criar_cliente_e_conta
+
+from .conftest import tamanho
+
+# Só faz sentido no PostgreSQL (DATABASE_URL=postgres://...): é lá que abrir
+# uma conexão custa autenticação e um processo novo no servidor.
+N_REQUISICOES = tamanho("BENCH_REQUISICOES", 2000)
+# Threads atendendo requisições ao mesmo tempo, como as do gunicorn.
+THREADS = tamanho("BENCH_THREADS", 4)
+
+MODOS = {
+    "nova": {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False, "pool": None},
+    "persistente": {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True, "pool": None},
+    "pool": {
+        "CONN_MAX_AGE": 0,
+        "CONN_HEALTH_CHECKS": True,
+        "pool": {"min_size": THREADS, "max_size": THREADS},
+    },
+}
+
+
+def _aplicar_modo(modo):
+    # Todas as threads criam o DatabaseWrapper a partir deste mesmo dict.
+    banco = connections.settings["default"]
+    banco["CONN_MAX_AGE"] = MODOS[modo]["CONN_MAX_AGE"]
+    banco["CONN_HEALTH_CHECKS"] = MODOS[modo]["CONN_HEALTH_CHECKS"]
+    banco["OPTIONS"].pop("pool", None)
+    if MODOS[modo]["pool"]:
+        banco["OPTIONS"]["pool"] = MODOS[modo]["pool"]
+
+
+def _rodar(caminho, token):
+    app = get_wsgi_application()
+
+    def requisitar():
+        environ = {
+            "PATH_INFO": caminho,
+            "REQUEST_METHOD": "GET",
+            "HTTP_AUTHORIZATION": f"Token {token}",
+        }
+        setup_testing_defaults(environ)
+        environ["SERVER_NAME"] = environ["HTTP_HOST"] = "testserver"
+        status = []
+        inicio = time.perf_counter()
+        corpo = b"".join(app(environ, lambda s, h, *a: status.append(s)))
+        assert status[0].startswith("200"), corpo
+        return time.perf_counter() - inicio
+
+    def thread(_):
+        try:
+            return [requisitar() for _ in range(N_REQUISICOES // THREADS)]
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=THREADS) as threads:
+        inicio = time.perf_counter()
+        latencias = [
+            lat for lats in threads.map(thread, range(THREADS)) for lat in lats
+        ]
+        total = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "req_s": len(latencias) / total,
+        "p50": statistics.median(latencias) * 1000,
+        "p99": latencias[int(len(latencias) * 0.99)] * 1000,
+    }
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_bench_modos_de_conexao(relatorio):
+    if connection.vendor != "postgresql":
+        pytest.skip("benchmark de conexões requer PostgreSQL")
+    modos = list(MODOS)
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        modos.remove("pool")
+
+    cliente, conta, _ = criar_cliente_e_conta(
+        cpf="88800011122", nome="Bench", email="bench@example.com", senha="x"
+    )
+    token = Token.objects.get(user=cliente).key
+    caminho = reverse("conta-detail", kwargs={"pk": conta.pk})
+    original = {**connections.settings["default"]}
+    original["OPTIONS"] = {**original["OPTIONS"]}
+
+    relatorio(f"Conexões: {N_REQUISICOES} GETs de saldo, {THREADS} threads")
+    try:
+        for modo in modos:
+            _aplicar_modo(modo)
+            zerar_estatisticas_conexoes()
+            medicao = _rodar(caminho, token)
+            estatisticas = obter_estatisticas_conexoes()["bancos"]["default"]
+            pool = estatisticas["pool"] or {}
+            relatorio(
+                f"  {modo:<12} {medicao['req_s']:8.1f} req/s "
+                f"p50 {medicao['p50']:6.2f}ms p99 {medicao['p99']:6.2f}ms "
+                f"conexões obtidas {estatisticas['conexoes_obtidas']:5d} "
+                f"abertas {pool.get('connections_num', estatisticas['conexoes_obtidas']):5d} "
+                f"espera no pool {pool.get('requests_wait_ms', 0):5d}ms"
+            )
+            connections["default"].close_pool()
+    finally:
+        connections.settings["default"].update(original)
@@ -0,0 +1,72 @@
+import uuid
+
+import pytest
+
+from contas.models import Cliente, ContaBancaria
+from contas.numeracao import gerar_numeros_conta
+
+from .conftest import medir, tamanho
+
+N_CONTAS = tamanho("BENCH_CONTAS", 2000)
+
+
+def _criar_clientes(prefixo, quantidade):
+    return Cliente.objects.bulk_create(
+        [
+            Cliente(
+                cpf=f"{prefixo}{i:010d}",
+                email=f"bench{prefixo}{i}@example.com",
+                nome=f"Bench {i}",
+                password="!",
+            )
+            for i in range(quantidade)
+        ]
+    )
+
+
+def _numero_legado():
+    # Algoritmo anterior: uuid4 truncado + consulta de existência por tentativa.
+    while True:
+        numero = str(uuid.uuid4().int)[:8]
+        if not ContaBancaria.objects.filter(numero_conta=numero).exists():
+            return numero
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_bench_criacao_de_contas(relatorio):
+    clientes_legado = _criar_clientes("1", N_CONTAS)
+    clientes_save = _criar_clientes("2", N_CONTAS)
+    clientes_bulk = _criar_clientes("3", N_CONTAS)
+
+    with medir() as legado:
+        for cliente in clientes_legado:
+            ContaBancaria.objects.create(cliente=cliente, numero_conta=_numero_legado())
+
+    with medir() as por_save:
+        for cliente in clientes_save:
+            ContaBancaria.objects.create(cliente=cliente)
+
+    with medir() as em_lote:
+        numeros = gerar_numeros_conta(N_CONTAS)
+        ContaBancaria.objects.bulk_create(
+            [
+                ContaBancaria(cliente=cliente, numero_conta=numero)
+                for cliente, numero in zip(clientes_bulk, numeros)
+            ],
+            batch_size=1000,
+        )
+
+    relatorio(f"Criação de {N_CONTAS} contas")
+    for nome, medicao in [
+        ("uuid4 + exists() (anterior)", legado),
+        ("sequência, save() por conta", por_save),
+        ("sequência, bulk_create", em_lote),
+    ]:
+        relatorio(
+            f"  {nome:<30} {medicao['segundos']:8.3f}s "
+            f"{N_CONTAS / medicao['segundos']:10.0f} contas/s "
+            f"{medicao['queries']:7d} queries"
+        )
+
+    assert ContaBancaria.objects.count() == 3 * N_CONTAS
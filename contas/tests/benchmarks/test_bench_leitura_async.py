@@ -0,0 +1,183 @@
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db.backends import utils as db_utils
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from contas.models import Transacao
+from contas.services.cliente_services import criar_cliente_e_conta
+
+from .conftest import tamanho
+
+N_REQUISICOES = tamanho("BENCH_REQUISICOES", 400)
+# Clientes simultâneos, cada um fazendo suas requisições em sequência.
+CLIENTES = tamanho("BENCH_CLIENTES", 32)
+# Gunicorn do entrypoint.sh: 2 workers x 2 threads síncronas atendem no máximo
+# 4 requisições ao mesmo tempo; as demais esperam na fila.
+THREADS_WSGI = tamanho("BENCH_THREADS_WSGI", 4)
+# Latência de rede simulada por consulta; o SQLite em memória responde em
+# microssegundos, o que esconderia justamente o tempo de espera de I/O.
+LATENCIA_DB_MS = tamanho("BENCH_LATENCIA_DB_MS", 5)
+
+
+@pytest.fixture
+def banco_com_latencia(monkeypatch):
+    original = db_utils.CursorWrapper._execute
+
+    def _execute(self, *args, **kwargs):
+        time.sleep(LATENCIA_DB_MS / 1000)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(db_utils.CursorWrapper, "_execute", _execute)
+
+
+@pytest.fixture
+def cliente_com_extrato():
+    cliente, conta, token = criar_cliente_e_conta(
+        cpf="77700011122", nome="Bench", email="bench@example.com", senha="x"
+    )
+    Transacao.objects.bulk_create(
+        [Transacao(conta=conta, tipo="D", valor=Decimal("1.00")) for _ in range(200)]
+    )
+    return conta, Token.objects.get(user=cliente).key
+
+
+def _resumo(latencias, total):
+    latencias.sort()
+    return {
+        "req_s": len(latencias) / total,
+        "p50": statistics.median(latencias) * 1000,
+        "p99": latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000,
+    }
+
+
+def _rodar_wsgi(caminho, token):
+    app = get_wsgi_application()
+    vagas = threading.Semaphore(THREADS_WSGI)
+
+    def requisitar():
+        environ = {
+            "PATH_INFO": caminho,
+            "REQUEST_METHOD": "GET",
+            "HTTP_AUTHORIZATION": f"Token {token}",
+        }
+        setup_testing_defaults(environ)
+        environ["SERVER_NAME"] = environ["HTTP_HOST"] = "testserver"
+        status = []
+        # A latência conta desde o envio, incluindo a espera por uma thread livre.
+        inicio = time.perf_counter()
+        with vagas:
+            corpo = b"".join(app(environ, lambda s, h, *a: status.append(s)))
+        assert status[0].startswith("200"), corpo
+        return time.perf_counter() - inicio
+
+    def cliente(_):
+        return [requisitar() for _ in range(N_REQUISICOES // CLIENTES)]
+
+    with ThreadPoolExecutor(max_workers=CLIENTES) as clientes:
+        inicio = time.perf_counter()
+        latencias = [
+            lat for lats in clientes.map(cliente, range(CLIENTES)) for lat in lats
+        ]
+        return _resumo(latencias, time.perf_counter() - inicio)
+
+
+def _rodar_asgi(caminho, token):
+    app = get_asgi_application()
+
+    async def requisitar():
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": caminho,
+            "raw_path": caminho.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Token {token}".encode()),
+            ],
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 50000),
+        }
+        mensagens = []
+        corpo_lido = asyncio.Event()
+
+        async def receive():
+            # Como um servidor real: entrega o corpo uma vez e depois só
+            # retornaria quando o cliente desconectasse.
+            if not corpo_lido.is_set():
+                corpo_lido.set()
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await asyncio.Future()
+
+        async def send(mensagem):
+            mensagens.append(mensagem)
+
+        inicio = time.perf_counter()
+        await app(scope, receive, send)
+        latencia = time.perf_counter() - inicio
+        assert mensagens[0]["status"] == 200, mensagens
+        return latencia
+
+    async def cliente():
+        return [await requisitar() for _ in range(N_REQUISICOES // CLIENTES)]
+
+    async def principal():
+        inicio = time.perf_counter()
+        por_cliente = await asyncio.gather(*(cliente() for _ in range(CLIENTES)))
+        latencias = [lat for lats in por_cliente for lat in lats]
+        return _resumo(latencias, time.perf_counter() - inicio)
+
+    return asyncio.run(principal())
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db(transaction=True)
+def test_bench_leitura_wsgi_vs_asgi(relatorio, cliente_com_extrato, banco_com_latencia):
+    conta, token = cliente_com_extrato
+    cenarios = [
+        (
+            "saldo: DRF síncrono, WSGI",
+            _rodar_wsgi,
+            reverse("conta-detail", kwargs={"pk": conta.pk}),
+        ),
+        (
+            "saldo: async, ASGI",
+            _rodar_asgi,
+            reverse("saldo_async", kwargs={"pk": conta.pk}),
+        ),
+        (
+            "extrato: DRF síncrono, WSGI",
+            _rodar_wsgi,
+            reverse("conta-extrato", kwargs={"pk": conta.pk}),
+        ),
+        (
+            "extrato: async, ASGI",
+            _rodar_asgi,
+            reverse("extrato_async", kwargs={"pk": conta.pk}),
+        ),
+    ]
+
+    relatorio(
+        f"Leituras: {N_REQUISICOES} requisições de {CLIENTES} clientes simultâneos, "
+        f"{THREADS_WSGI} threads WSGI, {LATENCIA_DB_MS}ms por consulta"
+    )
+    for nome, rodar, caminho in cenarios:
+        medicao = rodar(caminho, token)
+        relatorio(
+            f"  {nome:<30} {medicao['req_s']:8.1f} req/s "
+            f"p50 {medicao['p50']:8.1f}ms p99 {medicao['p99']:8.1f}ms"
+        )
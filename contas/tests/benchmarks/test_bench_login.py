@@ -0,0 +1,69 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.contrib.auth.hashers import make_password
+
+from contas.hashers import encerrar_pool_hashing, verificar_senha
+
+from .conftest import tamanho
+
+N_LOGINS = tamanho("BENCH_LOGINS", 64)
+CHAMADORES = tamanho("BENCH_LOGIN_CHAMADORES", 8)
+SENHA = "senha-de-benchmark-123"
+
+CONFIGURACOES = [
+    ("pbkdf2 1.000.000 iterações", "pbkdf2", {"SENHA_PBKDF2_ITERACOES": 1_000_000}),
+    ("pbkdf2 600.000 iterações", "pbkdf2", {"SENHA_PBKDF2_ITERACOES": 600_000}),
+    ("pbkdf2 260.000 iterações", "pbkdf2", {"SENHA_PBKDF2_ITERACOES": 260_000}),
+    ("scrypt n=2**14", "scrypt", {"SENHA_SCRYPT_WORK_FACTOR": 2**14}),
+]
+HASHERS = {
+    "pbkdf2": "contas.hashers.PBKDF2ConfiguravelPasswordHasher",
+    "scrypt": "contas.hashers.ScryptConfiguravelPasswordHasher",
+}
+
+
+def _login_cronometrado(encoded):
+    inicio = time.perf_counter()
+    correta, _ = verificar_senha(SENHA, encoded)
+    assert correta
+    return time.perf_counter() - inicio
+
+
+def _rodar(encoded):
+    # CHAMADORES threads simulam as threads do servidor atendendo logins.
+    with ThreadPoolExecutor(max_workers=CHAMADORES) as chamadores:
+        inicio = time.perf_counter()
+        latencias = list(
+            chamadores.map(lambda _: _login_cronometrado(encoded), range(N_LOGINS))
+        )
+        total = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "logins_s": N_LOGINS / total,
+        "p50": statistics.median(latencias) * 1000,
+        "p99": latencias[min(len(latencias) - 1, int(len(latencias) * 0.99))] * 1000,
+    }
+
+
+@pytest.mark.benchmark
+def test_bench_login(settings, relatorio):
+    relatorio(f"Verificação de senha: {N_LOGINS} logins, {CHAMADORES} chamadores")
+    for nome, hasher, custo in CONFIGURACOES:
+        settings.PASSWORD_HASHERS = [HASHERS[hasher]]
+        for chave, valor in custo.items():
+            setattr(settings, chave, valor)
+        encoded = make_password(SENHA)
+
+        for modo, workers in [("inline", 0), ("pool 4", 4)]:
+            settings.SENHA_POOL_WORKERS = workers
+            settings.SENHA_POOL_FILA = N_LOGINS
+            encerrar_pool_hashing()
+            medicao = _rodar(encoded)
+            relatorio(
+                f"  {nome:<28} {modo:<7} {medicao['logins_s']:8.1f} logins/s "
+                f"p50 {medicao['p50']:8.1f}ms p99 {medicao['p99']:8.1f}ms"
+            )
+    encerrar_pool_hashing()
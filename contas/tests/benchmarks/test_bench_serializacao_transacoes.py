@@ -0,0 +1,91 @@
+import os
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from contas.models import Cliente, ContaBancaria, Transacao
+from contas.serializers import (
+    CAMPOS_TRANSACAO_VALORES,
+    TransacaoSerializer,
+    serializar_transacoes,
+)
+
+from .conftest import medir
+
+# Ex.: BENCH_TRANSACOES=10000,100000,1000000
+TAMANHOS = [
+    int(n) for n in os.environ.get("BENCH_TRANSACOES", "10000,100000").split(",")
+]
+
+
+def _popular(conta, quantidade):
+    agora = timezone.now()
+    tipos = ["D", "S", "TE", "TR"]
+    Transacao.objects.bulk_create(
+        (
+            Transacao(
+                conta=conta,
+                tipo=tipos[i % 4],
+                valor=Decimal(i % 1000) + Decimal("0.25"),
+                saldo_apos=Decimal(i) + Decimal("0.50"),
+                data=agora - timedelta(seconds=i),
+            )
+            for i in range(quantidade)
+        ),
+        batch_size=5000,
+    )
+
+
+def _cronometrar(func):
+    inicio = time.perf_counter()
+    resultado = func()
+    return resultado, time.perf_counter() - inicio
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+@pytest.mark.parametrize("quantidade", TAMANHOS)
+def test_bench_serializacao_transacoes(relatorio, quantidade):
+    cliente = Cliente.objects.create_user(
+        cpf="55500011122", email="bench@example.com", nome="Bench", password="x"
+    )
+    conta = ContaBancaria.objects.create(cliente=cliente)
+    _popular(conta, quantidade)
+    transacoes = conta.transacoes.all()
+
+    # Com a consulta: o que um extrato desse tamanho custa de ponta a ponta.
+    with medir() as serializer_total:
+        esperado = TransacaoSerializer(transacoes, many=True).data
+    with medir() as rapido_total:
+        rapido = serializar_transacoes(
+            transacoes.values_list(*CAMPOS_TRANSACAO_VALORES)
+        )
+
+    # Só a serialização, com as linhas já carregadas.
+    instancias = list(transacoes)
+    tuplas = list(transacoes.values_list(*CAMPOS_TRANSACAO_VALORES))
+    _, so_serializer = _cronometrar(
+        lambda: TransacaoSerializer(instancias, many=True).data
+    )
+    _, so_rapido = _cronometrar(lambda: serializar_transacoes(tuplas))
+
+    relatorio(f"Serialização de {quantidade} transações")
+    for nome, segundos in [
+        ("TransacaoSerializer + consulta", serializer_total["segundos"]),
+        ("values_list rápido + consulta", rapido_total["segundos"]),
+        ("TransacaoSerializer (só CPU)", so_serializer),
+        ("values_list rápido (só CPU)", so_rapido),
+    ]:
+        relatorio(
+            f"  {nome:<32} {segundos:8.3f}s {quantidade / segundos:12.0f} linhas/s"
+        )
+    relatorio(
+        f"  ganho: {serializer_total['segundos'] / rapido_total['segundos']:.1f}x "
+        f"com consulta, {so_serializer / so_rapido:.1f}x só serialização"
+    )
+
+    assert JSONRenderer().render(rapido) == JSONRenderer().render(esperado)
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+from django.conf import settings as django_settings
+from django.core.cache import caches
+from django.db import connections
+
+from contas.authentication import limpar_cache_token
+from contas.hashers import encerrar_pool_hashing
+from contas.services.cache_saldo_service import zerar_estatisticas_cache_saldo
+
+
+@pytest.fixture(autouse=True)
+def cache_token_limpo(settings):
+    # Como no cache de saldo: o padrão sem Redis é desligado, os testes ligam.
+    settings.TOKEN_AUTH_CACHE_TTL = 30
+    # O cache de autenticação é global ao processo; cada teste começa vazio.
+    limpar_cache_token()
+    yield
+    limpar_cache_token()
+
+
+@pytest.fixture(autouse=True)
+def cache_saldo_limpo(settings):
+    # Num só processo o LocMem se comporta como um cache compartilhado, então
+    # os testes ligam o cache de saldo que o padrão deixa desligado sem Redis.
+    settings.SALDO_CACHE_TTL = 60
+    # Saldos em cache de um teste não podem vazar para o próximo (as contas
+    # recebem as mesmas pks depois do rollback).
+    caches[django_settings.SALDO_CACHE_ALIAS].clear()
+    zerar_estatisticas_cache_saldo()
+    yield
+    caches[django_settings.SALDO_CACHE_ALIAS].clear()
+
+
+@pytest.fixture
+def pool_hashing(settings):
+    # Recria o pool de hashing com os settings alterados pelo teste.
+    encerrar_pool_hashing()
+    yield settings
+    encerrar_pool_hashing()
+
+
+@pytest.fixture
+def arquivo_frio(settings, tmp_path):
+    # Segmentos arquivados pelos testes ficam fora do diretório do projeto.
+    settings.ARQUIVO_FRIO_DIR = str(tmp_path / "arquivo_frio")
+    return tmp_path / "arquivo_frio"
+
+
+ALIAS_REPLICA_TESTE = "replica_teste"
+
+
+class ErroBancoFalso(Exception):
+    # Causa de um OperationalError, com o SQLSTATE que a retentativa examina.
+    def __init__(self, pgcode):
+        super().__init__(pgcode)
+        self.pgcode = pgcode
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    # Base extra para os testes de réplica. É criada separada da default (e não
+    # como TEST MIRROR) para que cada teste veja de qual base veio a leitura;
+    # só é criada quando algum teste pede o alias.
+    default = django_settings.DATABASES["default"]
+    if "sqlite" in default["ENGINE"] and os.environ.get("SQLITE_ARQUIVO_TESTES"):
+        # A base em memória dos testes não aceita escritas de várias threads
+        # nem de outros processos; o benchmark de concorrência precisa de arquivo.
+        default["TEST"] = {"NAME": os.environ["SQLITE_ARQUIVO_TESTES"]}
+    replica = {**default, "TEST": {}}
+    if "sqlite" not in replica["ENGINE"]:
+        replica["TEST"] = {"NAME": f"test_{replica['NAME']}_replica"}
+    django_settings.DATABASES[ALIAS_REPLICA_TESTE] = replica
+    connections.__dict__.pop("settings", None)
@@ -0,0 +1,207 @@
+import re
+from io import StringIO
+
+import pytest
+from decimal import Decimal
+from datetime import date, datetime, timedelta
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import RequestFactory
+from django.utils import timezone
+
+from contas.models import Cliente, ContaBancaria, Transacao
+from contas.particionamento import (
+    criar_particao_mensal,
+    listar_particoes,
+    nome_particao,
+    remover_particoes_vazias,
+    somar_meses,
+    tabela_particionada,
+)
+from contas.services.exportacao_service import filtrar_periodo
+
+# Marcadores de varredura sequencial e de ordenação explícita no plano de cada
+# backend. "SCAN tabela USING INDEX" no SQLite é percurso ordenado pelo índice.
+MARCADORES = {
+    "sqlite": [
+        (re.compile(r"\bSCAN \w+\s*$", re.MULTILINE), "varredura sequencial"),
+        (re.compile(r"USE TEMP B-TREE"), "ordenação"),
+    ],
+    "postgresql": [
+        (re.compile(r"\bSeq Scan\b"), "varredura sequencial"),
+        (re.compile(r"\bSort\s+\("), "ordenação"),
+    ],
+}
+
+
+def assert_plano_sem_scan_nem_sort(queryset):
+    if connection.vendor == "postgresql":
+        # Com poucas linhas o planner do Postgres prefere Seq Scan mesmo havendo
+        # índice; desligando as alternativas, só sobra Seq Scan/Sort se não
+        # existir índice capaz de atender a consulta.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute("SET LOCAL enable_sort = off")
+    plano = queryset.explain()
+    for padrao, descricao in MARCADORES.get(connection.vendor, []):
+        assert not padrao.search(plano), f"Plano com {descricao}:\n{plano}"
+
+
+@pytest.fixture
+def base_populada(db):
+    superusuario = Cliente.objects.create_superuser(
+        cpf="55500011122",
+        email="admin.planos@example.com",
+        nome="Admin Planos",
+    )
+    contas = [
+        ContaBancaria.objects.create(
+            cliente=Cliente.objects.create_user(
+                cpf=f"5550000000{i}",
+                email=f"planos{i}@example.com",
+                nome=f"Cliente Planos {i}",
+            )
+        )
+        for i in range(5)
+    ]
+    agora = timezone.now()
+    tipos = ["D", "S", "TE", "TR"]
+    Transacao.objects.bulk_create(
+        [
+            Transacao(
+                conta=contas[i % len(contas)],
+                tipo=tipos[i % len(tipos)],
+                valor=Decimal("10.00"),
+                data=agora - timedelta(minutes=i),
+            )
+            for i in range(400)
+        ]
+    )
+    return superusuario, contas
+
+
+def _queryset_admin(usuario, **filtros):
+    request = RequestFactory().get("/admin/contas/transacao/", filtros)
+    request.user = usuario
+    changelist = site._registry[Transacao].get_changelist_instance(request)
+    return changelist.queryset
+
+
+@pytest.mark.django_db
+class TestPlanosDeConsulta:
+    def test_extrato_primeira_pagina(self, base_populada):
+        _, contas = base_populada
+        assert_plano_sem_scan_nem_sort(contas[0].transacoes.all()[:51])
+
+    def test_extrato_pagina_com_cursor(self, base_populada):
+        _, contas = base_populada
+        cursor = contas[0].transacoes.all()[10]
+        queryset = (
+            contas[0]
+            .transacoes.filter(data__lte=cursor.data)
+            .filter(Q(data__lt=cursor.data) | Q(id__lt=cursor.id))
+        )
+        assert_plano_sem_scan_nem_sort(queryset[:51])
+
+    def test_saldo_por_cliente(self, base_populada):
+        _, contas = base_populada
+        assert_plano_sem_scan_nem_sort(
+            ContaBancaria.objects.filter(cliente=contas[0].cliente_id)
+        )
+
+    def test_saldo_por_numero_conta(self, base_populada):
+        _, contas = base_populada
+        assert_plano_sem_scan_nem_sort(
+            ContaBancaria.objects.filter(numero_conta=contas[0].numero_conta)
+        )
+
+    def test_admin_listagem(self, base_populada):
+        superusuario, _ = base_populada
+        assert_plano_sem_scan_nem_sort(_queryset_admin(superusuario)[:100])
+
+    @pytest.mark.parametrize("tipo", ["D", "S", "TE", "TR"])
+    def test_admin_filtro_por_tipo(self, base_populada, tipo):
+        superusuario, _ = base_populada
+        queryset = _queryset_admin(superusuario, tipo__exact=tipo)
+        assert_plano_sem_scan_nem_sort(queryset[:100])
+
+
+@pytest.fixture
+def particionada(db):
+    if not tabela_particionada():
+        pytest.skip("contas_transacao só é particionada no PostgreSQL")
+
+
+def _transacao_em(conta, *data):
+    return Transacao.objects.create(
+        conta=conta,
+        tipo="D",
+        valor=Decimal("10.00"),
+        data=timezone.make_aware(datetime(*data)),
+    )
+
+
+class TestParticionamento:
+    def test_extrato_com_periodo_le_so_a_particao_do_mes(
+        self, particionada, base_populada
+    ):
+        _, contas = base_populada
+        criar_particao_mensal(date(2025, 3, 1))
+        _transacao_em(contas[0], 2025, 3, 10, 12)
+        _transacao_em(contas[0], 2025, 4, 10, 12)
+
+        queryset = filtrar_periodo(
+            contas[0].transacoes.all(), date(2025, 3, 1), date(2025, 3, 31)
+        )
+        plano = queryset[:50].explain()
+
+        assert "contas_transacao_p2025_03" in plano
+        assert "contas_transacao_padrao" not in plano
+        assert queryset.count() == 1
+
+    def test_nova_particao_recebe_linhas_da_padrao(self, particionada, base_populada):
+        _, contas = base_populada
+        transacao = _transacao_em(contas[0], 2025, 5, 20, 8)
+
+        assert criar_particao_mensal(date(2025, 5, 1)) is True
+        assert criar_particao_mensal(date(2025, 5, 1)) is False
+
+        assert "contas_transacao_p2025_05" in listar_particoes()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT id FROM contas_transacao_p2025_05")
+            assert cursor.fetchall() == [(transacao.pk,)]
+        assert Transacao.objects.get(pk=transacao.pk).data == transacao.data
+
+    def test_remove_so_particoes_vazias_anteriores_ao_limite(
+        self, particionada, base_populada
+    ):
+        _, contas = base_populada
+        for mes in (2, 3, 4):
+            criar_particao_mensal(date(2024, mes, 1))
+        _transacao_em(contas[0], 2024, 3, 5, 12)
+
+        removidas = remover_particoes_vazias(date(2024, 4, 1))
+
+        assert "contas_transacao_p2024_02" in removidas
+        particoes = listar_particoes()
+        assert "contas_transacao_p2024_02" not in particoes
+        assert {
+            "contas_transacao_p2024_03",
+            "contas_transacao_p2024_04",
+            "contas_transacao_padrao",
+        } <= set(particoes)
+
+
+@pytest.mark.django_db
+def test_comando_criar_particoes_transacao():
+    saida = StringIO()
+
+    call_command("criar_particoes_transacao", "--meses", "6", stdout=saida)
+
+    if connection.vendor == "postgresql":
+        assert "partições criadas" in saida.getvalue()
+        assert nome_particao(somar_meses(date.today(), 6)) in listar_particoes()
+    else:
+        assert "nada a fazer" in saida.getvalue()
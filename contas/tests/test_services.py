@@ -1,16 +1,69 @@
 # Esse programa segue o padrão de testes Arrange-Act-Assert (AAA)
 
+import itertools
+import json
+from pathlib import Path
+
 import pytest
 from decimal import Decimal
-from django.core.exceptions import ValidationError
-
-from contas.models import Cliente, ContaBancaria, Transacao
+from datetime import date, datetime, timedelta
+from io import StringIO
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.management import call_command
+from django.utils import timezone
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+
+from contas import numeracao
+from contas.models import (
+    ChaveIdempotencia,
+    Cliente,
+    ContaBancaria,
+    SaldoDiario,
+    SegmentoArquivado,
+    SequenciaNumeroConta,
+    Transacao,
+)
+from contas.numeracao import formatar_numero_conta, numero_conta_valido
+from contas.services import arquivamento_service
+from contas.services.arquivamento_service import (
+    arquivar_transacoes,
+    transacoes_arquivadas,
+)
+from rest_framework.authtoken.models import Token
+from contas.services.cache_saldo_service import (
+    guardar_saldo,
+    obter_estatisticas_cache_saldo,
+    obter_saldo,
+    publicar_saldos,
+)
 from contas.services.cliente_services import (
     depositar_valor,
     criar_cliente_e_conta,
+    criar_clientes_em_lote,
     sacar_valor,
 )
-from contas.services.transferencia_service import transferir_valor
+from contas.services.retentativa import (
+    com_retentativa,
+    obter_contadores_retentativa,
+    zerar_contadores_retentativa,
+)
+from contas.services.saldo_diario_service import (
+    inicio_do_dia,
+    recalcular_saldos_diarios,
+    saldo_em,
+)
+from contas.services import saldo_service
+from contas.services.saldo_service import aplicar_variacao_saldo, valor_com_sinal
+from contas.services.transferencia_service import (
+    transferir_em_lote,
+    transferir_valor,
+)
+
+from .conftest import ErroBancoFalso
 
 
 @pytest.fixture
@@ -168,6 +221,24 @@ def test_sacar_valor_sucesso(conta_generica):
     assert transacao_saque.valor == valor_a_sacar
 
 
+@pytest.mark.django_db
+def test_operacoes_conferem_titularidade(conta_generica, cliente_origem):
+    conta_generica.saldo = Decimal("50.00")
+    conta_generica.save()
+
+    with pytest.raises(PermissionDenied):
+        depositar_valor(conta_id=conta_generica.pk, valor="10", cliente=cliente_origem)
+    with pytest.raises(PermissionDenied):
+        sacar_valor(conta_generica.numero_conta, "10", cliente=cliente_origem)
+
+    conta = sacar_valor(
+        conta_id=conta_generica.pk, valor="10", cliente=conta_generica.cliente
+    )
+    assert conta.saldo == Decimal("40.00")
+    assert conta.cliente == conta_generica.cliente
+    assert Transacao.objects.filter(conta=conta_generica).count() == 1
+
+
 @pytest.mark.django_db
 def test_sacar_valor_insuficiente(conta_generica):
     conta_mock = conta_generica
@@ -247,6 +318,33 @@ def test_transferir_valor_saldo_insuficiente_origem(
     assert conta_destino_com_saldo.saldo == saldo_destino_antes
 
 
+@pytest.mark.django_db
+def test_transferir_valor_confere_titularidade_na_trava(
+    conta_origem_com_saldo, conta_destino_com_saldo
+):
+    dono = conta_origem_com_saldo.cliente
+    intruso = conta_destino_com_saldo.cliente
+
+    for conta_origem_id in [conta_origem_com_saldo.pk, 999999]:
+        with pytest.raises(PermissionDenied):
+            transferir_valor(
+                conta_origem_id=conta_origem_id,
+                conta_destino_numero=conta_destino_com_saldo.numero_conta,
+                valor_transferencia=Decimal("10.00"),
+                cliente=intruso,
+            )
+    assert not Transacao.objects.filter(tipo="TE").exists()
+
+    origem, destino = transferir_valor(
+        conta_origem_id=conta_origem_com_saldo.pk,
+        conta_destino_numero=conta_destino_com_saldo.numero_conta,
+        valor_transferencia=Decimal("10.00"),
+        cliente=dono,
+    )
+    assert origem.saldo == conta_origem_com_saldo.saldo - Decimal("10.00")
+    assert destino.saldo == conta_destino_com_saldo.saldo + Decimal("10.00")
+
+
 @pytest.mark.django_db
 def test_transferir_para_mesma_conta(conta_origem_com_saldo):
     with pytest.raises(
@@ -287,3 +385,770 @@ def test_transferir_conta_origem_nao_encontrada(conta_destino_com_saldo):
             conta_destino_numero=conta_destino_com_saldo.numero_conta,
             valor_transferencia=Decimal("50.00"),
         )
+
+
+@pytest.mark.django_db
+def test_depositar_valor_conta_inexistente(db):
+    with pytest.raises(ContaBancaria.DoesNotExist):
+        depositar_valor(numero_conta="00000000", valor=Decimal("10.00"))
+
+    assert Transacao.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_sacar_valor_conta_inexistente(db):
+    with pytest.raises(ContaBancaria.DoesNotExist):
+        sacar_valor(numero_conta="00000000", valor=Decimal("10.00"))
+
+
+@pytest.mark.django_db
+def test_sacar_valor_total_zera_saldo(conta_generica):
+    conta_generica.saldo = Decimal("80.00")
+    conta_generica.save()
+
+    conta_atualizada = sacar_valor(
+        numero_conta=conta_generica.numero_conta, valor=Decimal("80.00")
+    )
+
+    assert conta_atualizada.saldo == Decimal("0.00")
+    conta_generica.refresh_from_db()
+    assert conta_generica.saldo == Decimal("0.00")
+
+
+@pytest.mark.django_db
+def test_deposito_e_saque_em_um_unico_update(conta_generica, django_assert_num_queries):
+    # SAVEPOINT + UPDATE ... RETURNING + INSERT + upsert do SaldoDiario
+    # + RELEASE SAVEPOINT
+    with django_assert_num_queries(5):
+        conta = depositar_valor(
+            numero_conta=conta_generica.numero_conta, valor=Decimal("40.00")
+        )
+    assert conta.saldo == Decimal("40.00")
+
+    with django_assert_num_queries(5):
+        conta = sacar_valor(
+            numero_conta=conta_generica.numero_conta, valor=Decimal("15.00")
+        )
+    assert conta.saldo == Decimal("25.00")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("returning", [True, False])
+def test_aplicar_variacao_saldo(conta_generica, monkeypatch, returning):
+    # Os dois caminhos: UPDATE ... RETURNING e UPDATE seguido de SELECT.
+    if not returning:
+        monkeypatch.setattr(saldo_service, "_suporta_update_returning", lambda c: False)
+    filtros = {"numero_conta": conta_generica.numero_conta}
+
+    conta = aplicar_variacao_saldo(filtros, Decimal("30.00"))
+    recusada = aplicar_variacao_saldo(
+        filtros, Decimal("-40.00"), saldo_minimo=Decimal("40.00")
+    )
+
+    assert recusada is None
+    assert conta.pk == conta_generica.pk
+    assert conta.cliente_id == conta_generica.cliente_id
+    assert (conta.saldo, conta.versao) == (Decimal("30.00"), conta_generica.versao + 1)
+    conta_generica.refresh_from_db()
+    assert (conta_generica.saldo, conta_generica.versao) == (conta.saldo, conta.versao)
+
+
+@pytest.mark.django_db
+def test_transferencias_cruzadas_preservam_saldos(
+    conta_origem_com_saldo, conta_destino_com_saldo
+):
+    transferir_valor(
+        conta_origem_numero=conta_origem_com_saldo.numero_conta,
+        conta_destino_numero=conta_destino_com_saldo.numero_conta,
+        valor_transferencia=Decimal("30.00"),
+    )
+    transferir_valor(
+        conta_origem_numero=conta_destino_com_saldo.numero_conta,
+        conta_destino_numero=conta_origem_com_saldo.numero_conta,
+        valor_transferencia=Decimal("10.00"),
+    )
+
+    conta_origem_com_saldo.refresh_from_db()
+    conta_destino_com_saldo.refresh_from_db()
+    assert conta_origem_com_saldo.saldo == Decimal("480.00")
+    assert conta_destino_com_saldo.saldo == Decimal("120.00")
+
+
+@pytest.mark.django_db
+def test_transferir_conta_destino_nao_encontrada(conta_origem_com_saldo):
+    with pytest.raises(
+        ValueError, match="Conta de destino NUMERO_FALSO não encontrada."
+    ):
+        transferir_valor(
+            conta_origem_numero=conta_origem_com_saldo.numero_conta,
+            conta_destino_numero="NUMERO_FALSO",
+            valor_transferencia=Decimal("50.00"),
+        )
+
+    conta_origem_com_saldo.refresh_from_db()
+    assert conta_origem_com_saldo.saldo == Decimal("500.00")
+
+
+def _operacao_com_falhas(falhas, pgcode="40P01"):
+    chamadas = []
+
+    @com_retentativa("teste", ContaBancaria)
+    def operacao():
+        chamadas.append(1)
+        if len(chamadas) <= falhas:
+            raise OperationalError("deadlock detected") from ErroBancoFalso(pgcode)
+        return "ok"
+
+    return operacao, chamadas
+
+
+@pytest.mark.django_db(transaction=True)
+def test_retentativa_em_deadlock(settings):
+    settings.TRANSACAO_RETENTATIVA_ESPERA_BASE = 0
+    zerar_contadores_retentativa()
+    operacao, chamadas = _operacao_com_falhas(falhas=2)
+
+    assert operacao() == "ok"
+    assert len(chamadas) == 3
+    assert obter_contadores_retentativa()["teste"] == {
+        "tentativas": 3,
+        "retentativas": 2,
+    }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_retentativa_limitada(settings):
+    settings.TRANSACAO_MAX_TENTATIVAS = 2
+    settings.TRANSACAO_RETENTATIVA_ESPERA_BASE = 0
+    zerar_contadores_retentativa()
+    operacao, chamadas = _operacao_com_falhas(falhas=5, pgcode="40001")
+
+    with pytest.raises(OperationalError):
+        operacao()
+
+    assert len(chamadas) == 2
+    assert obter_contadores_retentativa()["teste"]["esgotadas"] == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_erro_nao_retentavel_propaga_imediatamente():
+    operacao, chamadas = _operacao_com_falhas(falhas=1, pgcode="23505")
+
+    with pytest.raises(OperationalError):
+        operacao()
+
+    assert len(chamadas) == 1
+
+
+@pytest.mark.django_db
+def test_operacoes_atualizam_saldo_diario(
+    conta_origem_com_saldo, conta_destino_com_saldo
+):
+    hoje = timezone.localdate()
+
+    depositar_valor(conta_origem_com_saldo.numero_conta, Decimal("50.00"))
+    sacar_valor(conta_origem_com_saldo.numero_conta, Decimal("20.00"))
+    transferir_valor(
+        conta_origem_numero=conta_origem_com_saldo.numero_conta,
+        conta_destino_numero=conta_destino_com_saldo.numero_conta,
+        valor_transferencia=Decimal("30.00"),
+    )
+
+    assert SaldoDiario.objects.get(
+        conta=conta_origem_com_saldo, data=hoje
+    ).saldo == Decimal("500.00")
+    assert SaldoDiario.objects.get(
+        conta=conta_destino_com_saldo, data=hoje
+    ).saldo == Decimal("130.00")
+
+
+@pytest.fixture
+def conta_com_historico(conta_generica):
+    movimentos = [
+        (date(2025, 1, 1), "D", Decimal("100.00")),
+        (date(2025, 1, 1), "S", Decimal("10.00")),
+        (date(2025, 1, 3), "TR", Decimal("40.00")),
+        (date(2025, 1, 7), "TE", Decimal("25.00")),
+        (date(2025, 1, 9), "D", Decimal("5.00")),
+    ]
+    Transacao.objects.bulk_create(
+        [
+            Transacao(
+                conta=conta_generica,
+                tipo=tipo,
+                valor=valor,
+                data=inicio_do_dia(dia) + timedelta(hours=12),
+            )
+            for dia, tipo, valor in movimentos
+        ]
+    )
+    conta_generica.saldo = Decimal("110.00")
+    conta_generica.save()
+    return conta_generica
+
+
+def _saldo_por_soma(conta, dia):
+    saldo = Decimal("0.00")
+    for transacao in conta.transacoes.filter(data__date__lte=dia):
+        if transacao.tipo in Transacao.TIPOS_CREDITO:
+            saldo += transacao.valor
+        else:
+            saldo -= transacao.valor
+    return saldo
+
+
+@pytest.mark.django_db
+def test_saldo_em_usa_snapshots_recalculados(conta_com_historico):
+    assert recalcular_saldos_diarios([conta_com_historico.pk]) == 4
+
+    for dia in range(1, 12):
+        data = date(2025, 1, dia)
+        assert saldo_em(conta_com_historico.pk, data) == _saldo_por_soma(
+            conta_com_historico, data
+        )
+    assert saldo_em(conta_com_historico.pk, date(2024, 12, 31)) == Decimal("0.00")
+
+
+@pytest.mark.django_db
+def test_saldo_em_sem_snapshots(conta_com_historico):
+    assert not SaldoDiario.objects.filter(conta=conta_com_historico).exists()
+
+    assert saldo_em(conta_com_historico.pk, date(2025, 1, 4)) == Decimal("130.00")
+    assert saldo_em(conta_com_historico.pk, date(2025, 1, 7)) == Decimal("105.00")
+
+
+@pytest.mark.django_db
+def test_saldo_em_soma_apenas_o_intervalo_apos_o_snapshot(
+    conta_com_historico, django_assert_num_queries
+):
+    SaldoDiario.objects.create(
+        conta=conta_com_historico, data=date(2025, 1, 3), saldo=Decimal("130.00")
+    )
+
+    # snapshot anterior + soma das transações entre o snapshot e a data
+    with django_assert_num_queries(2):
+        saldo = saldo_em(conta_com_historico.pk, date(2025, 1, 8))
+
+    assert saldo == Decimal("105.00")
+
+
+@pytest.mark.django_db
+def test_comando_consolidar_saldos_diarios(conta_com_historico):
+    saida = StringIO()
+
+    call_command("consolidar_saldos_diarios", stdout=saida)
+
+    assert "4 saldos diários gravados" in saida.getvalue()
+    assert SaldoDiario.objects.get(
+        conta=conta_com_historico, data=date(2025, 1, 9)
+    ).saldo == Decimal("110.00")
+
+
+@pytest.mark.django_db
+def test_operacoes_gravam_saldo_apos(conta_origem_com_saldo, conta_destino_com_saldo):
+    depositar_valor(conta_origem_com_saldo.numero_conta, Decimal("50.00"))
+    sacar_valor(conta_origem_com_saldo.numero_conta, Decimal("20.00"))
+    transferir_valor(
+        conta_origem_numero=conta_origem_com_saldo.numero_conta,
+        conta_destino_numero=conta_destino_com_saldo.numero_conta,
+        valor_transferencia=Decimal("30.00"),
+    )
+
+    assert list(
+        conta_origem_com_saldo.transacoes.order_by("id").values_list(
+            "tipo", "saldo_apos"
+        )
+    ) == [
+        ("D", Decimal("550.00")),
+        ("S", Decimal("530.00")),
+        ("TE", Decimal("500.00")),
+    ]
+    assert conta_destino_com_saldo.transacoes.get().saldo_apos == Decimal("130.00")
+
+
+@pytest.mark.django_db
+def test_lote_grava_saldo_apos_acumulado(
+    conta_origem_com_saldo, conta_destino_com_saldo
+):
+    transferir_em_lote(
+        conta_origem_com_saldo.numero_conta,
+        [
+            {"conta_destino": conta_destino_com_saldo.numero_conta, "valor": "100"},
+            {"conta_destino": conta_destino_com_saldo.numero_conta, "valor": "50"},
+        ],
+    )
+
+    assert list(Transacao.objects.order_by("id").values_list("tipo", "saldo_apos")) == [
+        ("TE", Decimal("400.00")),
+        ("TR", Decimal("200.00")),
+        ("TE", Decimal("350.00")),
+        ("TR", Decimal("250.00")),
+    ]
+
+
+@pytest.mark.django_db
+def test_comando_preencher_saldo_apos(conta_com_historico):
+    saida = StringIO()
+
+    call_command("preencher_saldo_apos", stdout=saida)
+
+    assert "saldo_apos preenchido em 5 transações de 1 contas" in saida.getvalue()
+    assert list(
+        conta_com_historico.transacoes.order_by("data", "id").values_list(
+            "saldo_apos", flat=True
+        )
+    ) == [
+        Decimal("100.00"),
+        Decimal("90.00"),
+        Decimal("130.00"),
+        Decimal("105.00"),
+        Decimal("110.00"),
+    ]
+
+
+@pytest.mark.django_db
+def test_numeros_conta_sequenciais_com_digito_verificador(cliente_generico):
+    with CaptureQueriesContext(connection) as queries:
+        contas = [
+            ContaBancaria.objects.create(cliente=cliente_generico) for _ in range(5)
+        ]
+
+    numeros = [conta.numero_conta for conta in contas]
+    assert len(set(numeros)) == 5
+    assert all(numero_conta_valido(numero) for numero in numeros)
+    assert [int(numero[:-1]) for numero in numeros] == list(
+        range(int(numeros[0][:-1]), int(numeros[0][:-1]) + 5)
+    )
+    # Nenhuma consulta de "número já existe?" antes do INSERT
+    assert not any(
+        q["sql"].startswith("SELECT") and "contas_contabancaria" in q["sql"]
+        for q in queries.captured_queries
+    )
+
+
+def test_digito_verificador_detecta_erro_de_digitacao():
+    numero = formatar_numero_conta(123457)
+
+    assert numero == "0001234579"
+    assert numero_conta_valido(numero)
+    assert not numero_conta_valido("0001234589")  # dígito trocado
+    assert not numero_conta_valido("0001234759")  # dígitos invertidos
+
+
+@pytest.mark.django_db
+def test_contador_recriado_apos_flush(cliente_generico):
+    ultimo = ContaBancaria.objects.get(cliente=cliente_generico).numero_conta
+    SequenciaNumeroConta.objects.all().delete()
+
+    novo = ContaBancaria.objects.create(cliente=cliente_generico).numero_conta
+
+    assert int(novo[:-1]) == int(ultimo[:-1]) + 1
+
+
+def test_blocos_da_sequencia_postgres(monkeypatch):
+    reservas = []
+    proximo_inicio = iter(range(1, 10_000, numeracao.TAMANHO_BLOCO))
+
+    def reservar(connection, quantidade):
+        reservas.append(quantidade)
+        return [next(proximo_inicio) for _ in range(quantidade)]
+
+    monkeypatch.setattr(numeracao, "_reservar_blocos_postgres", reservar)
+    monkeypatch.setattr(numeracao, "_bloco", {"pid": None, "proximo": 0, "limite": 0})
+
+    valores = numeracao._proximos_valores_postgres(None, 30)
+    valores += numeracao._proximos_valores_postgres(None, 250)
+    valores += numeracao._proximos_valores_postgres(None, 20)
+
+    assert valores == list(range(1, 301))
+    assert reservas == [1, 2]
+
+
+@pytest.mark.django_db
+def test_limpar_chaves_idempotencia(cliente_generico):
+    agora = timezone.now()
+    ChaveIdempotencia.objects.bulk_create(
+        [
+            ChaveIdempotencia(
+                cliente=cliente_generico,
+                chave=f"chave-{i}",
+                escopo="POST /api/contas/1/deposito/",
+                hash_requisicao="0" * 64,
+                status_code=200,
+                resposta="{}",
+                expira_em=agora + timedelta(hours=1 if i % 2 else -1),
+            )
+            for i in range(5)
+        ]
+    )
+
+    saida = StringIO()
+    call_command("limpar_chaves_idempotencia", "--lote", "2", stdout=saida)
+
+    assert "3 chaves vencidas removidas" in saida.getvalue()
+    assert sorted(ChaveIdempotencia.objects.values_list("chave", flat=True)) == [
+        "chave-1",
+        "chave-3",
+    ]
+
+
+@pytest.mark.django_db
+def test_operacoes_publicam_saldo_no_cache_apos_commit(
+    conta_origem_com_saldo, conta_destino_com_saldo, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True):
+        depositar_valor(conta_id=conta_origem_com_saldo.pk, valor=Decimal("10.00"))
+    assert obter_saldo(conta_origem_com_saldo.pk)["saldo"] == "510.00"
+
+    with django_capture_on_commit_callbacks(execute=True):
+        transferir_valor(
+            conta_origem_numero=conta_origem_com_saldo.numero_conta,
+            conta_destino_numero=conta_destino_com_saldo.numero_conta,
+            valor_transferencia=Decimal("60.00"),
+        )
+    with django_capture_on_commit_callbacks(execute=True):
+        transferir_em_lote(
+            conta_origem_com_saldo.numero_conta,
+            [{"conta_destino": conta_destino_com_saldo.numero_conta, "valor": "5.00"}],
+        )
+
+    origem = obter_saldo(conta_origem_com_saldo.pk)
+    destino = obter_saldo(conta_destino_com_saldo.pk)
+    assert (origem["saldo"], origem["versao"]) == ("445.00", 3)
+    assert (destino["saldo"], destino["versao"]) == ("165.00", 2)
+    conta_origem_com_saldo.refresh_from_db()
+    assert conta_origem_com_saldo.versao == 3
+
+
+@pytest.mark.django_db
+def test_operacao_desfeita_nao_publica_saldo(
+    conta_generica, django_capture_on_commit_callbacks
+):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with pytest.raises(ValueError, match="Saldo insuficiente"):
+            sacar_valor(conta_id=conta_generica.pk, valor=Decimal("1.00"))
+
+    assert callbacks == []
+    assert obter_saldo(conta_generica.pk) is None
+
+
+@pytest.mark.django_db
+def test_versao_antiga_nao_sobrescreve_cache(
+    conta_generica, django_capture_on_commit_callbacks
+):
+    antiga = ContaBancaria.objects.get(pk=conta_generica.pk)
+    with django_capture_on_commit_callbacks(execute=True):
+        depositar_valor(conta_id=conta_generica.pk, valor=Decimal("30.00"))
+
+    # Leitura feita antes do depósito (ex.: réplica atrasada) chega depois.
+    guardar_saldo(antiga)
+    with django_capture_on_commit_callbacks(execute=True):
+        publicar_saldos([antiga])
+
+    assert obter_saldo(conta_generica.pk)["saldo"] == "30.00"
+    assert obter_estatisticas_cache_saldo()["descartadas"] == 2
+
+
+@pytest.mark.django_db
+def test_trava_vencida_nao_grava_nem_solta_a_trava_alheia(
+    conta_generica, monkeypatch, settings
+):
+    cache = caches[settings.SALDO_CACHE_ALIAS]
+    trava = f"saldo:{conta_generica.pk}:trava"
+    adicionar = cache.add
+
+    def pegar_e_perder(chave, valor, timeout):
+        # A trava vence logo depois de obtida e outro processo a pega.
+        obtida = adicionar(chave, valor, timeout)
+        cache.set(trava, "outro-processo")
+        return obtida
+
+    monkeypatch.setattr(cache, "add", pegar_e_perder)
+
+    guardar_saldo(conta_generica)
+
+    assert obter_saldo(conta_generica.pk) is None
+    assert cache.get(trava) == "outro-processo"
+
+
+@pytest.mark.django_db
+def test_save_fora_dos_servicos_invalida_cache(
+    conta_generica, django_capture_on_commit_callbacks
+):
+    guardar_saldo(conta_generica)
+    conta_generica.saldo = Decimal("999.00")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        conta_generica.save()
+
+    assert obter_saldo(conta_generica.pk) is None
+
+
+CSV_CLIENTES = """cpf,nome,email,senha,senha_hash,data_nascimento
+11122233344,Ana,ana@example.com,senha-ana,,1990-05-01
+11122233355,Bruno,bruno@example.com,,{hash_bruno},
+123,Inválido,invalido@example.com,x,,
+00000000000,Repetido,repetido@example.com,x,,
+11122233366,Carla,carla@example.com,senha-carla,,
+"""
+
+
+@pytest.fixture
+def csv_clientes(tmp_path, settings):
+    settings.SENHA_PBKDF2_ITERACOES = 1000
+    arquivo = tmp_path / "clientes.csv"
+    arquivo.write_text(
+        CSV_CLIENTES.format(hash_bruno=make_password("senha-bruno")), encoding="utf-8"
+    )
+    return arquivo
+
+
+@pytest.mark.django_db
+def test_comando_importar_clientes(csv_clientes, cliente_generico):
+    saida, erros = StringIO(), StringIO()
+
+    call_command(
+        "importar_clientes",
+        str(csv_clientes),
+        "--lote",
+        "2",
+        "--processos",
+        "0",
+        stdout=saida,
+        stderr=erros,
+    )
+
+    assert "3 clientes criados, 1 já existentes, 1 linhas inválidas" in (
+        saida.getvalue()
+    )
+    assert "Linha 3 ignorada" in erros.getvalue()
+    ana = Cliente.objects.get(cpf="11122233344")
+    assert ana.check_password("senha-ana")
+    assert ana.data_nascimento == date(1990, 5, 1)
+    assert Cliente.objects.get(cpf="11122233355").check_password("senha-bruno")
+    for cliente in Cliente.objects.filter(cpf__startswith="111222333"):
+        assert numero_conta_valido(cliente.contas_bancarias.get().numero_conta)
+        assert len(Token.objects.get(user=cliente).key) == 40
+    assert json.loads(Path(f"{csv_clientes}.checkpoint").read_text()) == {"linhas": 5}
+
+
+@pytest.mark.django_db
+def test_comando_importar_clientes_retoma_do_checkpoint(csv_clientes):
+    Path(f"{csv_clientes}.checkpoint").write_text('{"linhas": 4}')
+    saida = StringIO()
+
+    call_command(
+        "importar_clientes", str(csv_clientes), "--processos", "0", stdout=saida
+    )
+
+    assert "Retomando após a linha 4" in saida.getvalue()
+    assert list(Cliente.objects.values_list("nome", flat=True)) == ["Carla"]
+
+
+@pytest.mark.django_db
+def test_criar_clientes_em_lote_nao_duplica(cliente_generico):
+    registro = {
+        "cpf": "11122233344",
+        "nome": "Ana",
+        "email": "ana@example.com",
+        "data_nascimento": None,
+        "password": "!",
+    }
+    repetido = {**registro, "cpf": "11122233355"}
+
+    assert criar_clientes_em_lote([registro, repetido]) == (1, 1)
+    assert criar_clientes_em_lote([registro]) == (0, 1)
+    assert ContaBancaria.objects.filter(cliente__cpf="11122233344").count() == 1
+
+
+def _gerar_sinteticos(saida=None):
+    call_command(
+        "gerar_dados_sinteticos",
+        "--clientes",
+        "12",
+        "--transacoes",
+        "600",
+        "--dias",
+        "10",
+        "--ate",
+        "2025-01-31",
+        "--seed",
+        "7",
+        "--saldos-diarios",
+        stdout=saida or StringIO(),
+    )
+    return list(
+        Transacao.objects.order_by("data", "id").values_list(
+            "conta__cliente__cpf", "tipo", "valor", "data", "saldo_apos"
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_comando_gerar_dados_sinteticos_fecha_saldos(settings):
+    settings.SENHA_PBKDF2_ITERACOES = 1000
+    saida = StringIO()
+
+    _gerar_sinteticos(saida)
+
+    assert "12 contas e" in saida.getvalue()
+    assert Transacao.objects.count() >= 600
+    for conta in ContaBancaria.objects.all():
+        historico = conta.transacoes.aggregate(total=Sum(valor_com_sinal()))["total"]
+        assert conta.saldo == (historico or 0)
+        ultima = conta.transacoes.order_by("-data", "-id").first()
+        if ultima is not None:
+            assert ultima.saldo_apos == conta.saldo
+            assert saldo_em(conta.pk, date(2025, 1, 31)) == conta.saldo
+    assert not Transacao.objects.filter(saldo_apos__lt=0).exists()
+
+
+@pytest.mark.django_db
+def test_comando_gerar_dados_sinteticos_deterministico(settings):
+    settings.SENHA_PBKDF2_ITERACOES = 1000
+    primeira = _gerar_sinteticos()
+    Cliente.objects.all().delete()
+
+    assert _gerar_sinteticos() == primeira
+
+
+@pytest.mark.django_db
+def test_arquivar_transacoes_preserva_historico_e_saldos(
+    conta_com_historico, arquivo_frio
+):
+    conta_id = conta_com_historico.pk
+    dias = [date(2025, 1, dia) for dia in range(1, 12)]
+    saldos = [_saldo_por_soma(conta_com_historico, dia) for dia in dias]
+    antigas = list(
+        conta_com_historico.transacoes.filter(data__lt=inicio_do_dia(date(2025, 1, 8)))
+        .order_by("data", "id")
+        .values_list("id", "tipo", "valor", "data")
+    )
+
+    segmentos = arquivar_transacoes(date(2025, 1, 8))
+
+    assert len(segmentos) == 1
+    segmento = SegmentoArquivado.objects.get()
+    assert segmento.transacoes == 4
+    assert (arquivo_frio / segmento.arquivo).exists()
+    assert conta_com_historico.transacoes.count() == 1
+    conta_com_historico.refresh_from_db()
+    assert conta_com_historico.arquivado_ate == date(2025, 1, 8)
+    assert [
+        (linha.id, linha.tipo, linha.valor, linha.data)
+        for linha in transacoes_arquivadas(conta_com_historico)
+    ] == antigas
+    assert [
+        linha.id
+        for linha in transacoes_arquivadas(conta_com_historico, decrescente=True)
+    ] == [pk for pk, *_ in reversed(antigas)]
+    assert [
+        linha.valor
+        for linha in transacoes_arquivadas(
+            conta_com_historico, data_inicio=date(2025, 1, 2), data_fim=date(2025, 1, 5)
+        )
+    ] == [Decimal("40.00")]
+
+    # Os snapshots dos dias arquivados sobrevivem a uma nova consolidação.
+    recalcular_saldos_diarios([conta_id])
+    assert [saldo_em(conta_id, dia) for dia in dias] == saldos
+    assert arquivar_transacoes(date(2025, 1, 8)) == []
+
+
+@pytest.mark.django_db
+def test_leitura_do_arquivo_descomprime_so_os_blocos_necessarios(
+    conta_generica, arquivo_frio, monkeypatch
+):
+    monkeypatch.setattr(arquivamento_service, "LINHAS_POR_BLOCO", 2)
+    Transacao.objects.bulk_create(
+        Transacao(
+            conta=conta_generica,
+            tipo="D",
+            valor=Decimal(dia),
+            data=timezone.make_aware(datetime(2025, 1, dia, 12)),
+        )
+        for dia in range(1, 11)
+    )
+    arquivar_transacoes(date(2025, 1, 20))
+    conta_generica.refresh_from_db()
+    blocos = []
+    trecho = arquivamento_service._trecho
+    monkeypatch.setattr(
+        arquivamento_service,
+        "_trecho",
+        lambda linhas, *args: blocos.append(len(linhas)) or trecho(linhas, *args),
+    )
+    # Como uma página do extrato: as 3 mais novas antes do cursor do dia 8.
+    antes_de = (timezone.make_aware(datetime(2025, 1, 8, 12)), 0)
+
+    pagina = list(
+        itertools.islice(
+            transacoes_arquivadas(conta_generica, decrescente=True, antes_de=antes_de),
+            3,
+        )
+    )
+
+    assert [linha.valor for linha in pagina] == [Decimal(7), Decimal(6), Decimal(5)]
+    assert blocos == [2, 2]
+    assert len(SegmentoArquivado.objects.get().indice[str(conta_generica.pk)]) == 5
+
+
+@pytest.mark.django_db
+def test_comando_arquivar_transacoes(conta_com_historico, arquivo_frio):
+    saida = StringIO()
+
+    call_command("arquivar_transacoes", "--antes-de", "2025-01-04", stdout=saida)
+
+    assert "3 transações anteriores a 2025-01-04 arquivadas em 1 segmentos" in (
+        saida.getvalue()
+    )
+    assert conta_com_historico.transacoes.count() == 2
+
+
+@pytest.mark.django_db
+def test_saldo_em_antes_da_primeira_transacao_arquivada(conta_generica, arquivo_frio):
+    depositar_valor(conta_id=conta_generica.pk, valor=Decimal("100.00"))
+    Transacao.objects.filter(conta=conta_generica).update(
+        data=inicio_do_dia(date(2024, 1, 10)) + timedelta(hours=12)
+    )
+    antes = [saldo_em(conta_generica.pk, date(2024, 1, dia)) for dia in (5, 10, 11)]
+
+    arquivar_transacoes(date(2025, 1, 1))
+
+    depois = [saldo_em(conta_generica.pk, date(2024, 1, dia)) for dia in (5, 10, 11)]
+    assert antes == depois == [Decimal("0.00"), Decimal("100.00"), Decimal("100.00")]
+    recalcular_saldos_diarios([conta_generica.pk])
+    assert saldo_em(conta_generica.pk, date(2024, 1, 5)) == Decimal("0.00")
+
+
+@pytest.mark.django_db
+def test_arquivar_de_novo_com_transacao_retroativa(conta_com_historico, arquivo_frio):
+    arquivar_transacoes(date(2025, 1, 8))
+    retroativa = Transacao.objects.create(
+        conta=conta_com_historico,
+        tipo="D",
+        valor=Decimal("5.00"),
+        data=inicio_do_dia(date(2025, 1, 2)),
+    )
+
+    arquivar_transacoes(date(2025, 1, 8))
+
+    segmentos = list(SegmentoArquivado.objects.order_by("pk"))
+    assert len(segmentos) == 2
+    assert segmentos[0].arquivo != segmentos[1].arquivo
+    assert all((arquivo_frio / s.arquivo).exists() for s in segmentos)
+    assert sorted(p.name for p in arquivo_frio.iterdir()) == sorted(
+        s.arquivo for s in segmentos
+    )
+    conta_com_historico.refresh_from_db()
+    linhas = list(transacoes_arquivadas(conta_com_historico))
+    assert [linha.valor for linha in linhas] == [
+        Decimal("100.00"),
+        Decimal("10.00"),
+        Decimal("5.00"),
+        Decimal("40.00"),
+        Decimal("25.00"),
+    ]
+    assert [linha.id for linha in linhas].count(retroativa.pk) == 1
+    decrescentes = list(transacoes_arquivadas(conta_com_historico, decrescente=True))
+    assert decrescentes == linhas[::-1]
@@ -1,12 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+from urllib.parse import parse_qs, urlparse
+
 import pytest
 from django.urls import reverse
-from rest_framework.test import APIClient
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 from rest_framework import status
 from decimal import Decimal
+from datetime import date, datetime, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import (
+    OperationalError,
+    connection,
+    connections,
+    router,
+    transaction,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
-from contas.models import Cliente, ContaBancaria, Transacao
+from contas.authentication import (
+    _obter_cache_local,
+    invalidar_clientes,
+    obter_estatisticas_cache_token,
+)
+from contas.conexoes import obter_estatisticas_conexoes, zerar_estatisticas_conexoes
+from contas.hashers import _obter_pool
+from contas.models import ChaveIdempotencia, Cliente, ContaBancaria, Transacao
+from contas.replicas import leitura_replica
+from contas.services import arquivamento_service
+from contas.services.arquivamento_service import arquivar_transacoes
+from contas.services.cache_saldo_service import obter_saldo
+from contas.views import consultar_saldo
+from contas.serializers import (
+    CAMPOS_TRANSACAO_VALORES,
+    TransacaoSerializer,
+    serializar_transacoes,
+)
 from rest_framework.authtoken.models import Token
 from contas.services.cliente_services import criar_cliente_e_conta
+from contas.services.transferencia_service import transferir_valor
+
+from .conftest import ALIAS_REPLICA_TESTE, ErroBancoFalso
 
 
 @pytest.fixture
@@ -159,6 +200,69 @@ class TestLoginClienteView:
         assert "non_field_errors" in response.data
         assert "Credenciais inválidas" in str(response.data["non_field_errors"][0])
 
+    def test_login_regrava_hash_quando_custo_muda(
+        self, api_client, settings, usuario_teste_data
+    ):
+        settings.SENHA_PBKDF2_ITERACOES = 1000
+        data = usuario_teste_data.copy()
+        password = data.pop("password")
+        cliente = Cliente.objects.create_user(**data, password=password)
+        assert cliente.password.startswith("pbkdf2_sha256$1000$")
+
+        settings.SENHA_PBKDF2_ITERACOES = 2000
+        response = api_client.post(
+            reverse("autenticar_cliente"),
+            {"cpf": cliente.cpf, "password": password},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        cliente.refresh_from_db()
+        assert cliente.password.startswith("pbkdf2_sha256$2000$")
+        assert cliente.check_password(password)
+
+    def test_login_migra_para_hasher_configurado(
+        self, api_client, settings, usuario_teste_data
+    ):
+        data = usuario_teste_data.copy()
+        password = data.pop("password")
+        cliente = Cliente.objects.create_user(**data, password=password)
+        assert cliente.password.startswith("pbkdf2_sha256$")
+
+        settings.PASSWORD_HASHERS = [
+            "contas.hashers.ScryptConfiguravelPasswordHasher",
+            "contas.hashers.PBKDF2ConfiguravelPasswordHasher",
+        ]
+        response = api_client.post(
+            reverse("autenticar_cliente"),
+            {"cpf": cliente.cpf, "password": password},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        cliente.refresh_from_db()
+        assert cliente.password.startswith("scrypt$")
+
+    def test_login_pool_saturado_retorna_503(
+        self, api_client, pool_hashing, cliente_registrado_para_views
+    ):
+        pool_hashing.SENHA_POOL_WORKERS = 1
+        pool_hashing.SENHA_POOL_FILA = 0
+        pool_hashing.SENHA_POOL_TIMEOUT = 0.01
+        pool = _obter_pool()
+        # Ocupa a única vaga, como um login lento em andamento.
+        pool._vagas.acquire()
+        try:
+            response = api_client.post(
+                reverse("autenticar_cliente"),
+                {"cpf": cliente_registrado_para_views.cpf, "password": "x"},
+                format="json",
+            )
+        finally:
+            pool._vagas.release()
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
 
 @pytest.mark.django_db
 class TestOperacoesContaView:
@@ -230,3 +334,1254 @@ class TestOperacoesContaView:
         assert "As credenciais de autenticação não foram fornecidas." in str(
             response.data["errors"]["detail"][0]
         )
+
+
+@pytest.fixture
+def contas_destino_lote(db):
+    contas = []
+    for i in range(3):
+        _, conta, _ = criar_cliente_e_conta(
+            cpf=f"4440000000{i}",
+            nome=f"Funcionario {i}",
+            email=f"funcionario{i}@example.com",
+            senha="password123",
+        )
+        contas.append(conta)
+    return contas
+
+
+@pytest.mark.django_db
+class TestTransferenciasLoteView:
+    def test_lote_tudo_ou_nada_sucesso(
+        self, cliente_autenticado_com_conta, contas_destino_lote
+    ):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        conta_obj.saldo = Decimal("1000.00")
+        conta_obj.save()
+        url = reverse("conta-transferencias-lote", kwargs={"pk": conta_obj.pk})
+        payload = {
+            "transferencias": [
+                {"conta_destino": conta.numero_conta, "valor": "100.00"}
+                for conta in contas_destino_lote
+            ]
+        }
+
+        response = client.post(url, payload, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Decimal(response.data["saldo"]) == Decimal("700.00")
+        assert all(r["status"] == "efetuada" for r in response.data["resultados"])
+        conta_obj.refresh_from_db()
+        assert conta_obj.saldo == Decimal("700.00")
+        for conta in contas_destino_lote:
+            conta.refresh_from_db()
+            assert conta.saldo == Decimal("100.00")
+        assert Transacao.objects.filter(conta=conta_obj, tipo="TE").count() == 3
+
+    def test_lote_tudo_ou_nada_rejeita_destino_inexistente(
+        self, cliente_autenticado_com_conta, contas_destino_lote
+    ):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        conta_obj.saldo = Decimal("1000.00")
+        conta_obj.save()
+        url = reverse("conta-transferencias-lote", kwargs={"pk": conta_obj.pk})
+        payload = {
+            "transferencias": [
+                {"conta_destino": contas_destino_lote[0].numero_conta, "valor": "10"},
+                {"conta_destino": "99999999", "valor": "10"},
+            ]
+        }
+
+        response = client.post(url, payload, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [r["status"] for r in response.data["resultados"]] == [
+            "rejeitada",
+            "rejeitada",
+        ]
+        assert response.data["resultados"][0]["erro"] == (
+            "Lote rejeitado: há transferências inválidas."
+        )
+        conta_obj.refresh_from_db()
+        assert conta_obj.saldo == Decimal("1000.00")
+        assert not Transacao.objects.filter(conta=conta_obj).exists()
+
+    def test_lote_tudo_ou_nada_saldo_insuficiente_rejeita_todos(
+        self, cliente_autenticado_com_conta, contas_destino_lote
+    ):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        conta_obj.saldo = Decimal("10.00")
+        conta_obj.save()
+        url = reverse("conta-transferencias-lote", kwargs={"pk": conta_obj.pk})
+        payload = {
+            "transferencias": [
+                {"conta_destino": contas_destino_lote[0].numero_conta, "valor": "8"},
+                {"conta_destino": contas_destino_lote[1].numero_conta, "valor": "8"},
+            ]
+        }
+
+        response = client.post(url, payload, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data["erro"] == "Saldo insuficiente para o lote."
+        for resultado in response.data["resultados"]:
+            assert resultado["status"] == "rejeitada"
+            assert resultado["erro"] == "Saldo insuficiente para o lote."
+        conta_obj.refresh_from_db()
+        assert conta_obj.saldo == Decimal("10.00")
+        assert not Transacao.objects.filter(conta=conta_obj).exists()
+
+    def test_lote_relatorio_aplica_itens_validos(
+        self, cliente_autenticado_com_conta, contas_destino_lote
+    ):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        conta_obj.saldo = Decimal("150.00")
+        conta_obj.save()
+        url = reverse("conta-transferencias-lote", kwargs={"pk": conta_obj.pk})
+        payload = {
+            "modo": "relatorio",
+            "transferencias": [
+                {"conta_destino": contas_destino_lote[0].numero_conta, "valor": "100"},
+                {"conta_destino": "99999999", "valor": "10"},
+                {"conta_destino": contas_destino_lote[1].numero_conta, "valor": "80"},
+                {"conta_destino": contas_destino_lote[2].numero_conta, "valor": "50"},
+            ],
+        }
+
+        response = client.post(url, payload, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [r["status"] for r in response.data["resultados"]] == [
+            "efetuada",
+            "rejeitada",
+            "rejeitada",
+            "efetuada",
+        ]
+        conta_obj.refresh_from_db()
+        assert conta_obj.saldo == Decimal("0.00")
+        assert Transacao.objects.filter(tipo="TR").count() == 2
+
+
+@pytest.mark.django_db
+class TestExtratoPaginadoView:
+    def test_extrato_percorre_todas_as_paginas(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        data_base = timezone.now()
+        Transacao.objects.bulk_create(
+            [
+                Transacao(
+                    conta=conta_obj,
+                    tipo="D",
+                    valor=Decimal("10.00"),
+                    # Duas transações por instante para exercitar o desempate por id
+                    data=data_base - timedelta(minutes=i // 2),
+                )
+                for i in range(7)
+            ]
+        )
+        esperado = list(
+            Transacao.objects.filter(conta=conta_obj)
+            .order_by("-data", "-id")
+            .values_list("id", flat=True)
+        )
+        url = reverse("conta-extrato", kwargs={"pk": conta_obj.pk})
+
+        ids = []
+        proxima = f"{url}?page_size=3"
+        while proxima:
+            response = client.get(proxima)
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.data["results"]) <= 3
+            ids.extend(t["id"] for t in response.data["results"])
+            proxima = response.data["next"]
+
+        assert ids == esperado
+
+    def test_extrato_sem_count_nem_offset(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        Transacao.objects.bulk_create(
+            [
+                Transacao(conta=conta_obj, tipo="D", valor=Decimal("1.00"))
+                for _ in range(5)
+            ]
+        )
+        url = reverse("conta-extrato", kwargs={"pk": conta_obj.pk})
+        primeira = client.get(f"{url}?page_size=2")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(primeira.data["next"])
+
+        assert response.status_code == status.HTTP_200_OK
+        sql = " ".join(q["sql"].upper() for q in queries.captured_queries)
+        assert "COUNT(" not in sql
+        assert "OFFSET" not in sql
+
+    def test_extrato_cursor_invalido(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-extrato", kwargs={"pk": conta_obj.pk})
+
+        response = client.get(f"{url}?cursor=invalido")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_extrato_por_periodo(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        for dia in (9, 10, 11, 12):
+            Transacao.objects.create(
+                conta=conta_obj,
+                tipo="D",
+                valor=Decimal(dia),
+                data=timezone.make_aware(datetime(2025, 3, dia, 12)),
+            )
+        url = reverse("conta-extrato", kwargs={"pk": conta_obj.pk})
+
+        response = client.get(
+            f"{url}?data_inicio=2025-03-10&data_fim=2025-03-11&page_size=1"
+        )
+        valores = [t["valor"] for t in response.data["results"]]
+        valores += [
+            t["valor"] for t in client.get(response.data["next"]).data["results"]
+        ]
+
+        assert valores == ["11.00", "10.00"]
+        invalido = client.get(f"{url}?data_inicio=2025-03-11&data_fim=2025-03-10")
+        assert invalido.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestExportacaoExtratoView:
+    @pytest.fixture
+    def conta_com_historico(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        datas = [
+            timezone.make_aware(datetime(2025, 1, dia, 12, 0)) for dia in (5, 10, 20)
+        ]
+        Transacao.objects.bulk_create(
+            [
+                Transacao(conta=conta_obj, tipo="D", valor=Decimal("10.50"), data=data)
+                for data in datas
+            ]
+        )
+        return client, conta_obj
+
+    def test_exportacao_csv(self, conta_com_historico):
+        client, conta_obj = conta_com_historico
+        url = reverse("conta-extrato-export", kwargs={"pk": conta_obj.pk})
+
+        response = client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"].startswith("text/csv")
+        linhas = b"".join(response.streaming_content).decode().splitlines()
+        assert linhas[0] == "id,conta,tipo,tipo_descricao,valor,saldo_apos,data"
+        assert len(linhas) == 4
+        assert linhas[1].endswith(",D,Depósito,10.50,,2025-01-05T12:00:00Z")
+
+    def test_exportacao_ndjson_com_periodo(self, conta_com_historico):
+        client, conta_obj = conta_com_historico
+        url = reverse("conta-extrato-export", kwargs={"pk": conta_obj.pk})
+
+        response = client.get(
+            url,
+            {
+                "formato": "ndjson",
+                "data_inicio": "2025-01-06",
+                "data_fim": "2025-01-20",
+            },
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        registros = [
+            json.loads(linha)
+            for linha in b"".join(response.streaming_content).decode().splitlines()
+        ]
+        esperado = TransacaoSerializer(
+            conta_obj.transacoes.filter(data__day__in=[10, 20]).order_by("data"),
+            many=True,
+        ).data
+        assert registros == json.loads(json.dumps(esperado))
+
+    def test_exportacao_formato_invalido(self, conta_com_historico):
+        client, conta_obj = conta_com_historico
+        url = reverse("conta-extrato-export", kwargs={"pk": conta_obj.pk})
+
+        response = client.get(url, {"formato": "xlsx"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestArquivoFrio:
+    @pytest.fixture
+    def conta_arquivavel(self, cliente_autenticado_com_conta, arquivo_frio):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        # Dois lançamentos por dia no mesmo instante, para o desempate por id.
+        Transacao.objects.bulk_create(
+            [
+                Transacao(
+                    conta=conta_obj,
+                    tipo=tipo,
+                    valor=Decimal(dia),
+                    saldo_apos=Decimal(dia * 10),
+                    data=timezone.make_aware(datetime(2025, 1, dia, 12, 0, 0, 5000)),
+                )
+                for dia in range(1, 13)
+                for tipo in ("D", "S")
+            ]
+        )
+        return client, conta_obj
+
+    def _paginas(self, client, url, **consulta):
+        resposta = client.get(url, {"page_size": 5, **consulta})
+        paginas = [resposta.json()["results"]]
+        while resposta.json()["next"]:
+            resposta = client.get(resposta.json()["next"])
+            paginas.append(resposta.json()["results"])
+        return paginas
+
+    def _exportar(self, client, conta, **consulta):
+        url = reverse("conta-extrato-export", kwargs={"pk": conta.pk})
+        response = client.get(url, consulta)
+        return b"".join(response.streaming_content)
+
+    # Com 3 linhas por bloco, os pares do mesmo instante cruzam os blocos.
+    @pytest.mark.parametrize("linhas_por_bloco", [500, 3])
+    def test_extrato_e_exportacao_iguais_apos_arquivar(
+        self, conta_arquivavel, monkeypatch, linhas_por_bloco
+    ):
+        monkeypatch.setattr(arquivamento_service, "LINHAS_POR_BLOCO", linhas_por_bloco)
+        client, conta = conta_arquivavel
+        urls = [
+            reverse("conta-extrato", kwargs={"pk": conta.pk}),
+            reverse("extrato_async", kwargs={"pk": conta.pk}),
+        ]
+        periodos = [{}, {"data_inicio": "2025-01-03", "data_fim": "2025-01-09"}]
+        antes = [self._paginas(client, url, **p) for url in urls for p in periodos]
+        exportacoes = [
+            self._exportar(client, conta, formato=formato, **periodo)
+            for formato in ("csv", "ndjson")
+            for periodo in periodos
+        ]
+
+        assert arquivar_transacoes(date(2025, 1, 7))
+        assert conta.transacoes.count() == 12
+
+        depois = [self._paginas(client, url, **p) for url in urls for p in periodos]
+        assert depois == antes
+        assert len(antes[0]) == 5
+        assert [
+            self._exportar(client, conta, formato=formato, **periodo)
+            for formato in ("csv", "ndjson")
+            for periodo in periodos
+        ] == exportacoes
+
+    def test_periodo_recente_nao_abre_o_arquivo(
+        self, conta_arquivavel, arquivo_frio, monkeypatch
+    ):
+        client, conta = conta_arquivavel
+        arquivar_transacoes(date(2025, 1, 7))
+        monkeypatch.setattr(
+            arquivamento_service,
+            "_linhas_da_conta",
+            mock.Mock(side_effect=AssertionError),
+        )
+        url = reverse("conta-extrato", kwargs={"pk": conta.pk})
+
+        primeira = client.get(url, {"page_size": 5})
+        periodo = client.get(url, {"data_inicio": "2025-01-10"})
+        exportacao = self._exportar(client, conta, data_inicio="2025-01-08")
+
+        assert primeira.status_code == periodo.status_code == status.HTTP_200_OK
+        assert len(periodo.json()["results"]) == 6
+        assert len(exportacao.decode().splitlines()) == 11
+
+
+@pytest.mark.django_db
+class TestSerializacaoRapidaTransacoes:
+    @pytest.fixture
+    def transacoes_variadas(self, conta_generica):
+        base = timezone.now().replace(microsecond=123456)
+        Transacao.objects.bulk_create(
+            [
+                Transacao(
+                    conta=conta_generica,
+                    tipo=tipo,
+                    valor=Decimal(valor),
+                    saldo_apos=None if saldo is None else Decimal(saldo),
+                    data=base - timedelta(days=i, seconds=i),
+                )
+                for i, (tipo, valor, saldo) in enumerate(
+                    [
+                        ("D", "0.01", "0.01"),
+                        ("S", "12345678.90", "0.00"),
+                        ("TE", "100", None),
+                        ("TR", "7.5", "-3.20"),
+                    ]
+                )
+            ]
+        )
+        return conta_generica
+
+    @pytest.mark.parametrize("fuso", ["UTC", "America/Sao_Paulo"])
+    def test_saida_identica_ao_serializer(self, transacoes_variadas, fuso):
+        from rest_framework.renderers import JSONRenderer
+
+        transacoes = transacoes_variadas.transacoes.all()
+        with timezone.override(fuso):
+            esperado = TransacaoSerializer(transacoes, many=True).data
+            rapido = serializar_transacoes(
+                transacoes.values_list(*CAMPOS_TRANSACAO_VALORES)
+            )
+
+        assert JSONRenderer().render(rapido) == JSONRenderer().render(esperado)
+
+    def test_extrato_usa_caminho_rapido(self, cliente_autenticado_com_conta):
+        client, _, conta = cliente_autenticado_com_conta
+        Transacao.objects.create(conta=conta, tipo="D", valor=Decimal("5.00"))
+        url = reverse("conta-extrato", kwargs={"pk": conta.pk})
+
+        response = client.get(url)
+
+        assert (
+            response.data["results"]
+            == TransacaoSerializer(conta.transacoes.all(), many=True).data
+        )
+
+
+@pytest.mark.django_db
+class TestSaldoEmDataView:
+    def test_saldo_em_data(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-saldo-em", kwargs={"pk": conta_obj.pk})
+        client.post(
+            reverse("conta-deposito", kwargs={"pk": conta_obj.pk}),
+            {"valor": "80.00"},
+            format="json",
+        )
+        hoje = timezone.localdate()
+
+        response = client.get(url, {"data": hoje.isoformat()})
+        response_ontem = client.get(url, {"data": str(hoje - timedelta(days=1))})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["saldo"] == "80.00"
+        assert response_ontem.data["saldo"] == "0.00"
+
+    def test_saldo_em_data_invalida(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-saldo-em", kwargs={"pk": conta_obj.pk})
+
+        response = client.get(url, {"data": "ontem"})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def _consultas_token(queries):
+    return [q for q in queries.captured_queries if "authtoken_token" in q["sql"]]
+
+
+@pytest.mark.django_db
+class TestAutenticacaoComCache:
+    def test_token_em_cache_dispensa_consulta(self, cliente_autenticado_com_conta):
+        client, _, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta_obj.pk})
+
+        with CaptureQueriesContext(connection) as primeira:
+            assert client.get(url).status_code == status.HTTP_200_OK
+        with CaptureQueriesContext(connection) as segunda:
+            assert client.get(url).status_code == status.HTTP_200_OK
+
+        assert len(_consultas_token(primeira)) == 1
+        assert _consultas_token(segunda) == []
+        estatisticas = obter_estatisticas_cache_token()
+        assert estatisticas["misses"] == 1
+        assert estatisticas["hits"] == 1
+
+    def test_cliente_desativado_perde_acesso(self, cliente_autenticado_com_conta):
+        client, cliente_obj, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta_obj.pk})
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        cliente_obj.is_active = False
+        cliente_obj.save()
+
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_logout_invalida_token(self, cliente_autenticado_com_conta):
+        client, cliente_obj, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta_obj.pk})
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        response = client.post(reverse("logout_cliente"))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert not Token.objects.filter(user=cliente_obj).exists()
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+        assert obter_estatisticas_cache_token()["invalidacoes"] == 1
+
+    def test_rotacao_de_token(self, cliente_autenticado_com_conta):
+        client, cliente_obj, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta_obj.pk})
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+        Token.objects.filter(user=cliente_obj).delete()
+        novo_token = Token.objects.create(user=cliente_obj)
+
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+        client.credentials(HTTP_AUTHORIZATION=f"Token {novo_token.key}")
+        assert client.get(url).status_code == status.HTTP_200_OK
+
+    def test_revogacao_chega_ao_lru_de_outro_worker(
+        self, settings, cliente_autenticado_com_conta
+    ):
+        # Num só processo o LocMem faz o papel do Redis compartilhado.
+        settings.TOKEN_AUTH_CACHE_ALIAS = "default"
+        client, cliente_obj, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta_obj.pk})
+        assert client.get(url).status_code == status.HTTP_200_OK
+        key = Token.objects.get(user=cliente_obj).key
+        entrada = _obter_cache_local().obter(key)
+
+        # update() não dispara sinais; outro worker ainda tem a entrada antiga.
+        Cliente.objects.filter(pk=cliente_obj.pk).update(is_active=False)
+        invalidar_clientes([cliente_obj.pk])
+        _obter_cache_local().definir(key, entrada)
+
+        assert client.get(url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_ttl_zero_consulta_o_banco_sempre(
+        self, settings, cliente_autenticado_com_conta
+    ):
+        settings.TOKEN_AUTH_CACHE_TTL = 0
+        client, _, conta_obj = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta_obj.pk})
+
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as consultas:
+                assert client.get(url).status_code == status.HTTP_200_OK
+            assert len(_consultas_token(consultas)) == 1
+        assert obter_estatisticas_cache_token()["entradas"] == 0
+
+
+@pytest.mark.django_db
+class TestOperacoesContaAlheia:
+    @pytest.fixture
+    def conta_alheia(self, conta_generica):
+        ContaBancaria.objects.filter(pk=conta_generica.pk).update(
+            saldo=Decimal("100.00")
+        )
+        return conta_generica
+
+    @pytest.mark.parametrize(
+        "operacao, payload",
+        [
+            ("deposito", {"valor": "10.00"}),
+            ("saque", {"valor": "10.00"}),
+            ("transferencia", {"conta_destino": None, "valor": "10.00"}),
+        ],
+    )
+    def test_conta_alheia_responde_404_sem_alterar_saldo(
+        self, cliente_autenticado_com_conta, conta_alheia, operacao, payload
+    ):
+        client, _, conta_propria = cliente_autenticado_com_conta
+        if "conta_destino" in payload:
+            payload = {**payload, "conta_destino": conta_propria.numero_conta}
+        url = reverse(f"conta-{operacao}", kwargs={"pk": conta_alheia.pk})
+
+        response = client.post(url, payload, format="json")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        conta_alheia.refresh_from_db()
+        assert conta_alheia.saldo == Decimal("100.00")
+        assert not Transacao.objects.filter(conta=conta_alheia).exists()
+
+    @pytest.mark.parametrize("operacao", ["deposito", "saque", "transferencia"])
+    def test_conta_alheia_com_corpo_invalido_responde_404(
+        self, cliente_autenticado_com_conta, conta_alheia, operacao
+    ):
+        client, _, conta_propria = cliente_autenticado_com_conta
+        url_alheia = reverse(f"conta-{operacao}", kwargs={"pk": conta_alheia.pk})
+        url_propria = reverse(f"conta-{operacao}", kwargs={"pk": conta_propria.pk})
+
+        response = client.post(url_alheia, {"valor": "abc"}, format="json")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        response = client.post(url_propria, {"valor": "abc"}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_conta_inexistente_responde_404(self, cliente_autenticado_com_conta):
+        client, _, _ = cliente_autenticado_com_conta
+        url = reverse("conta-deposito", kwargs={"pk": 999999})
+
+        response = client.post(url, {"valor": "10.00"}, format="json")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_saque_sem_saldo_responde_400(self, cliente_autenticado_com_conta):
+        client, _, conta = cliente_autenticado_com_conta
+        url = reverse("conta-saque", kwargs={"pk": conta.pk})
+
+        response = client.post(url, {"valor": "10.00"}, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "Saldo insuficiente" in str(response.data)
+
+
+def _contar_consultas(client, metodo, url, payload=None):
+    with CaptureQueriesContext(connection) as queries:
+        response = getattr(client, metodo)(url, payload, format="json")
+    assert response.status_code == status.HTTP_200_OK, response.data
+    return len(queries.captured_queries)
+
+
+@pytest.mark.django_db
+class TestConsultasPorEndpoint:
+    # O token já está em cache depois da primeira requisição; a partir daí
+    # cada endpoint deve ter um número fixo de consultas, qualquer que seja
+    # o tamanho do resultado.
+
+    @pytest.fixture
+    def client(self, cliente_autenticado_com_conta):
+        client, cliente, conta = cliente_autenticado_com_conta
+        client.get(reverse("conta-list"))
+        return client, cliente, conta
+
+    def test_listagem_de_contas(self, client):
+        client, cliente, _ = client
+        url = reverse("conta-list")
+
+        assert _contar_consultas(client, "get", url) == 1
+        ContaBancaria.objects.bulk_create(
+            [ContaBancaria(cliente=cliente, numero_conta=f"9{i:07d}") for i in range(5)]
+        )
+        assert _contar_consultas(client, "get", url) == 1
+
+    def test_detalhe_da_conta(self, client):
+        client, _, conta = client
+        url = reverse("conta-detail", kwargs={"pk": conta.pk})
+        assert _contar_consultas(client, "get", url) == 1
+
+    def test_extrato(self, client):
+        client, _, conta = client
+        url = reverse("conta-extrato", kwargs={"pk": conta.pk})
+
+        Transacao.objects.create(conta=conta, tipo="D", valor=Decimal("1.00"))
+        poucas = _contar_consultas(client, "get", url)
+        Transacao.objects.bulk_create(
+            [Transacao(conta=conta, tipo="D", valor=Decimal("1.00")) for _ in range(30)]
+        )
+        assert _contar_consultas(client, "get", url) == poucas == 2
+
+    @pytest.mark.parametrize("operacao", ["deposito", "saque"])
+    def test_operacoes_nao_recarregam_conta(self, client, operacao):
+        client, _, conta = client
+        ContaBancaria.objects.filter(pk=conta.pk).update(saldo=Decimal("100.00"))
+        url = reverse(f"conta-{operacao}", kwargs={"pk": conta.pk})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(url, {"valor": "10.00"}, format="json")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["conta"]["cliente"]["cpf"] == conta.cliente.cpf
+        selects_cliente = [
+            q
+            for q in queries.captured_queries
+            if q["sql"].startswith('SELECT "contas_cliente"')
+        ]
+        assert selects_cliente == []
+        # Titularidade, saldo e atualização no mesmo UPDATE ... RETURNING.
+        consultas_conta = [
+            q["sql"].split()[0]
+            for q in queries.captured_queries
+            if '"contas_contabancaria"' in q["sql"].split("WHERE")[0]
+        ]
+        assert consultas_conta == ["UPDATE"]
+
+    @pytest.mark.parametrize(
+        "modelo, quantidade",
+        [("contabancaria", 10), ("transacao", 10)],
+    )
+    def test_admin_changelist(self, client, settings, modelo, quantidade):
+        # Sem collectstatic nos testes não há manifest para os assets do admin.
+        settings.STORAGES = {
+            **settings.STORAGES,
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+        _, cliente, conta = client
+        admin = Cliente.objects.create_superuser(
+            cpf="99988877766", email="admin@example.com", nome="Admin", password="x"
+        )
+        admin_client = APIClient()
+        admin_client.force_login(admin)
+        url = reverse(f"admin:contas_{modelo}_changelist")
+
+        def contar():
+            with CaptureQueriesContext(connection) as queries:
+                assert admin_client.get(url).status_code == 200
+            return len(queries.captured_queries)
+
+        poucas = contar()
+        ContaBancaria.objects.bulk_create(
+            [
+                ContaBancaria(cliente=cliente, numero_conta=f"8{i:07d}")
+                for i in range(quantidade)
+            ]
+        )
+        Transacao.objects.bulk_create(
+            [
+                Transacao(conta=conta, tipo="D", valor=Decimal("1.00"))
+                for _ in range(quantidade)
+            ]
+        )
+        assert contar() == poucas
+
+
+@pytest.mark.django_db
+class TestIdempotencia:
+    @pytest.fixture
+    def conta(self, cliente_autenticado_com_conta):
+        client, _, conta = cliente_autenticado_com_conta
+        ContaBancaria.objects.filter(pk=conta.pk).update(saldo=Decimal("100.00"))
+        return client, conta
+
+    def _depositar(self, client, conta, chave, valor="10.00"):
+        return client.post(
+            reverse("conta-deposito", kwargs={"pk": conta.pk}),
+            {"valor": valor},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=chave,
+        )
+
+    def test_repeticao_devolve_resposta_guardada_sem_tocar_na_conta(self, conta):
+        client, conta = conta
+
+        primeira = self._depositar(client, conta, "chave-1")
+        with CaptureQueriesContext(connection) as queries:
+            segunda = self._depositar(client, conta, "chave-1")
+
+        assert primeira.status_code == segunda.status_code == status.HTTP_200_OK
+        assert segunda.content == primeira.content
+        assert segunda["Idempotent-Replayed"] == "true"
+        assert not any(
+            "contas_contabancaria" in q["sql"] or "contas_transacao" in q["sql"]
+            for q in queries.captured_queries
+        )
+        conta.refresh_from_db()
+        assert conta.saldo == Decimal("110.00")
+        assert conta.transacoes.count() == 1
+
+    def test_mesma_chave_com_outro_corpo_retorna_422(self, conta):
+        client, conta = conta
+
+        self._depositar(client, conta, "chave-1")
+        response = self._depositar(client, conta, "chave-1", valor="20.00")
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        conta.refresh_from_db()
+        assert conta.saldo == Decimal("110.00")
+
+    def test_erro_nao_e_guardado(self, conta):
+        client, conta = conta
+        url = reverse("conta-saque", kwargs={"pk": conta.pk})
+
+        def sacar():
+            return client.post(
+                url, {"valor": "150.00"}, format="json", HTTP_IDEMPOTENCY_KEY="s-1"
+            )
+
+        assert sacar().status_code == status.HTTP_400_BAD_REQUEST
+        ContaBancaria.objects.filter(pk=conta.pk).update(saldo=Decimal("200.00"))
+        assert sacar().status_code == status.HTTP_200_OK
+        conta.refresh_from_db()
+        assert conta.saldo == Decimal("50.00")
+
+    def test_chave_vencida_executa_de_novo(self, conta):
+        client, conta = conta
+
+        self._depositar(client, conta, "chave-1")
+        ChaveIdempotencia.objects.update(expira_em=timezone.now())
+        response = self._depositar(client, conta, "chave-1")
+
+        assert "Idempotent-Replayed" not in response
+        conta.refresh_from_db()
+        assert conta.saldo == Decimal("120.00")
+
+    def test_requisicao_simultanea_e_desfeita(self, conta, monkeypatch):
+        from contas import idempotencia
+
+        client, conta = conta
+        primeira = self._depositar(client, conta, "chave-1")
+
+        # Simula a segunda requisição lendo antes de a primeira gravar a chave:
+        # a inserção viola a restrição única e a operação inteira é desfeita.
+        respostas = iter([None, ChaveIdempotencia.objects.get()])
+        monkeypatch.setattr(
+            idempotencia, "_buscar", lambda cliente, chave: next(respostas)
+        )
+        segunda = client.post(
+            reverse("conta-deposito", kwargs={"pk": conta.pk}),
+            {"valor": "10.00"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="chave-1",
+        )
+
+        assert segunda.content == primeira.content
+        conta.refresh_from_db()
+        assert conta.saldo == Decimal("110.00")
+        assert conta.transacoes.count() == 1
+
+    def test_transferencia_repetida(self, conta, conta_generica):
+        client, conta = conta
+        url = reverse("conta-transferencia", kwargs={"pk": conta.pk})
+        payload = {"conta_destino": conta_generica.numero_conta, "valor": "30.00"}
+
+        for _ in range(3):
+            response = client.post(
+                url, payload, format="json", HTTP_IDEMPOTENCY_KEY="t-1"
+            )
+            assert response.status_code == status.HTTP_200_OK
+
+        conta.refresh_from_db()
+        assert conta.saldo == Decimal("70.00")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_transferencia_com_chave_retenta_falha_de_serializacao(
+    cliente_autenticado_com_conta, conta_generica, settings, monkeypatch
+):
+    from contas import views
+
+    settings.TRANSACAO_RETENTATIVA_ESPERA_BASE = 0
+    _, cliente, conta = cliente_autenticado_com_conta
+    ContaBancaria.objects.filter(pk=conta.pk).update(saldo=Decimal("100.00"))
+    chamadas = []
+
+    def transferir_com_conflito(**kwargs):
+        chamadas.append(1)
+        if len(chamadas) == 1:
+            raise OperationalError("could not serialize access") from ErroBancoFalso(
+                "40001"
+            )
+        return transferir_valor(**kwargs)
+
+    monkeypatch.setattr(views, "transferir_valor", transferir_com_conflito)
+
+    request = APIRequestFactory().post(
+        "/transferencia/",
+        {
+            "conta_origem": conta.numero_conta,
+            "conta_destino": conta_generica.numero_conta,
+            "valor": "30.00",
+        },
+        format="json",
+        HTTP_IDEMPOTENCY_KEY="t-retentada",
+    )
+    force_authenticate(request, user=cliente)
+
+    response = views.transferencia(request)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(chamadas) == 2
+    conta.refresh_from_db()
+    assert conta.saldo == Decimal("70.00")
+    assert ChaveIdempotencia.objects.get().status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+class TestLeituraAsync:
+    @pytest.fixture
+    def conta_com_movimento(self, cliente_autenticado_com_conta):
+        client, _, conta = cliente_autenticado_com_conta
+        agora = timezone.now()
+        Transacao.objects.bulk_create(
+            [
+                Transacao(
+                    conta=conta,
+                    tipo="D",
+                    valor=Decimal("1.50"),
+                    saldo_apos=Decimal("1.50") * (i + 1),
+                    data=agora - timedelta(minutes=i),
+                )
+                for i in range(7)
+            ]
+        )
+        ContaBancaria.objects.filter(pk=conta.pk).update(saldo=Decimal("10.50"))
+        return client, conta
+
+    def test_extrato_por_periodo_igual_ao_sincrono(self, conta_com_movimento):
+        client, conta = conta_com_movimento
+        hoje = timezone.localdate().isoformat()
+        for consulta in (f"data_inicio={hoje}", "data_inicio=2025-03-11&data_fim=x"):
+            sincrono = client.get(
+                f"{reverse('conta-extrato', kwargs={'pk': conta.pk})}?{consulta}"
+            )
+            assincrono = client.get(
+                f"{reverse('extrato_async', kwargs={'pk': conta.pk})}?{consulta}"
+            )
+
+            assert assincrono.status_code == sincrono.status_code
+            assert assincrono.json() == sincrono.json()
+
+    def test_extrato_igual_ao_sincrono(self, conta_com_movimento):
+        client, conta = conta_com_movimento
+        url_sync = reverse("conta-extrato", kwargs={"pk": conta.pk})
+        url_async = reverse("extrato_async", kwargs={"pk": conta.pk})
+
+        sync = client.get(url_sync, {"page_size": 3})
+        assincrono = client.get(url_async, {"page_size": 3})
+        assert assincrono.status_code == status.HTTP_200_OK
+        assert assincrono.content == sync.content.replace(
+            url_sync.encode(), url_async.encode()
+        )
+
+        cursor = parse_qs(urlparse(assincrono.json()["next"]).query)["cursor"][0]
+        segunda = client.get(url_async, {"page_size": 3, "cursor": cursor})
+        segunda_sync = client.get(url_sync, {"page_size": 3, "cursor": cursor})
+        assert segunda.json()["results"] == segunda_sync.json()["results"]
+
+    def test_saldo(self, conta_com_movimento):
+        client, conta = conta_com_movimento
+
+        cache.clear()
+        respostas = [
+            client.get(reverse("saldo_async", kwargs={"pk": conta.pk}))
+            for _ in range(2)  # a primeira vem do banco, a segunda do cache
+        ]
+        sincrono = client.get(reverse("conta-detail", kwargs={"pk": conta.pk}))
+
+        for response in respostas:
+            assert response.status_code == status.HTTP_200_OK
+            assert response.json() == sincrono.json()
+        assert respostas[0].json()["saldo"] == "10.50"
+        assert respostas[0].json()["cliente"]["cpf"] == conta.cliente.cpf
+
+    def test_sem_token_retorna_401(self, api_client, conta_generica):
+        response = api_client.get(
+            reverse("saldo_async", kwargs={"pk": conta_generica.pk})
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response["WWW-Authenticate"] == "Token"
+        assert "detail" in response.json()["errors"]
+
+    def test_conta_alheia_e_cursor_invalido_retornam_404(
+        self, conta_com_movimento, conta_generica
+    ):
+        client, conta = conta_com_movimento
+
+        alheia = client.get(reverse("extrato_async", kwargs={"pk": conta_generica.pk}))
+        cursor_invalido = client.get(
+            reverse("extrato_async", kwargs={"pk": conta.pk}), {"cursor": "xyz"}
+        )
+
+        assert alheia.status_code == status.HTTP_404_NOT_FOUND
+        assert cursor_invalido.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_token_em_cache_nao_consulta_banco(self, conta_com_movimento):
+        client, conta = conta_com_movimento
+        url = reverse("saldo_async", kwargs={"pk": conta.pk})
+
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+
+        assert _consultas_token(queries) == []
+        # O saldo também vem do cache (cache_saldo_service).
+        assert len(queries.captured_queries) == 0
+
+    def test_somente_get(self, conta_com_movimento):
+        client, conta = conta_com_movimento
+
+        response = client.post(reverse("saldo_async", kwargs={"pk": conta.pk}))
+
+        assert response.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", ALIAS_REPLICA_TESTE])
+class TestReplicasLeitura:
+    @pytest.fixture
+    def replica_atrasada(self, settings):
+        # A réplica tem o cliente e a conta, mas ainda não viu o saldo de 100.
+        settings.DATABASE_REPLICAS = [ALIAS_REPLICA_TESTE]
+        cliente, conta, token = criar_cliente_e_conta(
+            cpf="44455566677", nome="Replica", email="replica@example.com", senha="x"
+        )
+        cliente.save(using=ALIAS_REPLICA_TESTE, force_insert=True)
+        conta.save(using=ALIAS_REPLICA_TESTE, force_insert=True)
+        ContaBancaria.objects.filter(pk=conta.pk).update(saldo=Decimal("100.00"))
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        yield client, cliente, conta
+        cache.clear()
+
+    def _saldo(self, client, url_name, conta):
+        response = client.get(reverse(url_name, kwargs={"pk": conta.pk}))
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()["saldo"]
+
+    @pytest.mark.parametrize("url_name", ["conta-detail", "saldo_async"])
+    def test_leitura_vem_da_replica(self, replica_atrasada, url_name):
+        client, _, conta = replica_atrasada
+
+        assert self._saldo(client, url_name, conta) == "0.00"
+
+    def test_cliente_le_do_primario_depois_de_escrever(self, replica_atrasada):
+        client, _, conta = replica_atrasada
+
+        response = client.post(
+            reverse("conta-deposito", kwargs={"pk": conta.pk}),
+            {"valor": "10.00"},
+            format="json",
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        assert self._saldo(client, "conta-detail", conta) == "110.00"
+        assert self._saldo(client, "saldo_async", conta) == "110.00"
+
+        # Fim da janela: volta para a réplica.
+        cache.clear()
+        assert self._saldo(client, "conta-detail", conta) == "0.00"
+
+    def test_escritas_e_travas_ficam_no_primario(self, replica_atrasada):
+        with leitura_replica():
+            assert router.db_for_read(ContaBancaria) == ALIAS_REPLICA_TESTE
+            assert router.db_for_write(ContaBancaria) == "default"
+            assert ContaBancaria.objects.select_for_update().db == "default"
+            with transaction.atomic():
+                assert router.db_for_read(ContaBancaria) == "default"
+
+        assert router.db_for_read(ContaBancaria) == "default"
+
+    def test_sem_replicas_tudo_no_primario(self, replica_atrasada, settings):
+        client, _, conta = replica_atrasada
+        settings.DATABASE_REPLICAS = []
+
+        with leitura_replica():
+            assert router.db_for_read(ContaBancaria) == "default"
+        assert self._saldo(client, "conta-detail", conta) == "100.00"
+
+    def test_admin_lista_da_replica(self, replica_atrasada, settings):
+        settings.STORAGES = {
+            **settings.STORAGES,
+            "staticfiles": {
+                "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"
+            },
+        }
+        admin = Cliente.objects.create_superuser(
+            cpf="99988877766", email="admin@example.com", nome="Admin", password="x"
+        )
+        admin_client = APIClient()
+        admin_client.force_login(admin)
+
+        with CaptureQueriesContext(connections[ALIAS_REPLICA_TESTE]) as queries:
+            response = admin_client.get(
+                reverse("admin:contas_contabancaria_changelist")
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert any("contas_contabancaria" in q["sql"] for q in queries)
+
+
+@pytest.mark.django_db
+class TestEstatisticasConexoes:
+    def test_somente_admin(self, cliente_autenticado_com_conta):
+        client, _, _ = cliente_autenticado_com_conta
+
+        response = client.get(reverse("estatisticas_conexoes"))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_estatisticas_do_worker(self, settings):
+        admin = Cliente.objects.create_superuser(
+            cpf="99988877766", email="admin@example.com", nome="Admin", password="x"
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        response = client.get(reverse("estatisticas_conexoes"))
+
+        assert response.status_code == status.HTTP_200_OK
+        dados = response.json()
+        assert dados["modo"] == settings.DB_CONEXOES
+        assert isinstance(dados["pid"], int)
+        assert "conexoes_obtidas" in dados["bancos"]["default"]
+
+    def test_conta_conexoes_obtidas(self):
+        def consultar():
+            with connections["default"].cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connections["default"].close()
+
+        zerar_estatisticas_conexoes()
+        thread = threading.Thread(target=consultar)
+        thread.start()
+        thread.join()
+
+        bancos = obter_estatisticas_conexoes()["bancos"]
+        assert bancos["default"]["conexoes_obtidas"] == 1
+
+
+@pytest.mark.django_db
+class TestCacheSaldo:
+    def test_consulta_repetida_nao_vai_ao_banco(self, cliente_autenticado_com_conta):
+        client, _, conta = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta.pk})
+
+        primeira = client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            segunda = client.get(url)
+
+        assert len(queries.captured_queries) == 0
+        assert segunda.json() == primeira.json()
+
+    def test_deposito_atualiza_cache(
+        self, cliente_autenticado_com_conta, django_capture_on_commit_callbacks
+    ):
+        client, _, conta = cliente_autenticado_com_conta
+        url = reverse("conta-detail", kwargs={"pk": conta.pk})
+        client.get(url)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            client.post(
+                reverse("conta-deposito", kwargs={"pk": conta.pk}),
+                {"valor": "25.00"},
+                format="json",
+            )
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+
+        assert len(queries.captured_queries) == 0
+        assert response.json()["saldo"] == "25.00"
+
+    def test_conta_alheia_em_cache_retorna_404(
+        self, cliente_autenticado_com_conta, conta_generica
+    ):
+        client, _, _ = cliente_autenticado_com_conta
+        outro = APIClient()
+        outro.force_authenticate(conta_generica.cliente)
+        url = reverse("conta-detail", kwargs={"pk": conta_generica.pk})
+        outro.get(url)
+        assert obter_saldo(conta_generica.pk) is not None
+
+        response = client.get(url)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_consultar_saldo_usa_cache(self, cliente_autenticado_com_conta):
+        _, cliente, conta = cliente_autenticado_com_conta
+
+        def consultar():
+            request = APIRequestFactory().get("/")
+            force_authenticate(request, user=cliente)
+            return consultar_saldo(request)
+
+        primeira = consultar()
+        with CaptureQueriesContext(connection) as queries:
+            segunda = consultar()
+
+        assert len(queries.captured_queries) == 0
+        assert segunda.data == primeira.data
+        assert segunda.data["numero_conta"] == conta.numero_conta
+
+
+def _amostra(nome, **labels):
+    return REGISTRY.get_sample_value(nome, labels) or 0
+
+
+@pytest.mark.django_db
+class TestMetricas:
+    def test_latencia_e_consultas_por_endpoint(self, cliente_autenticado_com_conta):
+        client, _, conta = cliente_autenticado_com_conta
+        rota = {"rota": "conta-deposito"}
+        latencia = {"metodo": "POST", "status": "200", **rota}
+        antes = _amostra("banco_http_requisicao_segundos_count", **latencia)
+        consultas_antes = _amostra("banco_db_consultas_por_requisicao_sum", **rota)
+
+        with CaptureQueriesContext(connection) as queries:
+            client.post(
+                reverse("conta-deposito", kwargs={"pk": conta.pk}),
+                {"valor": "10.00"},
+                format="json",
+            )
+
+        assert _amostra("banco_http_requisicao_segundos_count", **latencia) == antes + 1
+        consultas = _amostra("banco_db_consultas_por_requisicao_sum", **rota)
+        assert consultas - consultas_antes == len(queries.captured_queries)
+
+    def test_erros_por_excecao(self, cliente_autenticado_com_conta):
+        client, _, _ = cliente_autenticado_com_conta
+        erro = {"excecao": "Http404", "status": "404"}
+        antes = _amostra("banco_api_erros_total", **erro)
+
+        response = client.get(reverse("conta-detail", kwargs={"pk": 999999}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert _amostra("banco_api_erros_total", **erro) == antes + 1
+
+    def test_espera_de_trava_na_transferencia(
+        self, cliente_autenticado_com_conta, conta_generica
+    ):
+        client, _, conta = cliente_autenticado_com_conta
+        conta.saldo = Decimal("50.00")
+        conta.save()
+        trava = {"operacao": "transferencia"}
+        antes = _amostra("banco_espera_trava_contas_segundos_count", **trava)
+
+        response = client.post(
+            reverse("conta-transferencia", kwargs={"pk": conta.pk}),
+            {"conta_destino": conta_generica.numero_conta, "valor": "5.00"},
+            format="json",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert (
+            _amostra("banco_espera_trava_contas_segundos_count", **trava) == antes + 1
+        )
+
+    def test_endpoint_metrics(self, api_client, settings):
+        settings.METRICAS_TOKEN = "segredo"
+
+        assert api_client.get("/metrics").status_code == status.HTTP_403_FORBIDDEN
+        response = api_client.get("/metrics", HTTP_AUTHORIZATION="Bearer segredo")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"banco_http_requisicao_segundos_bucket" in response.content
+
+    def test_endpoint_metrics_sem_token_so_com_debug(self, api_client, settings):
+        settings.METRICAS_TOKEN = ""
+
+        assert api_client.get("/metrics").status_code == status.HTTP_403_FORBIDDEN
+        settings.DEBUG = True
+        assert api_client.get("/metrics").status_code == status.HTTP_200_OK
+
+    def test_soma_os_workers(self, api_client, settings, tmp_path, monkeypatch):
+        # Cada processo simula um worker do gunicorn gravando no diretório.
+        codigo = (
+            "from contas.metricas import ERROS; "
+            "ERROS.labels('ErroDeWorker', 500).inc()"
+        )
+        ambiente = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+        for _ in range(2):
+            subprocess.run(
+                [sys.executable, "-c", codigo],
+                env=ambiente,
+                cwd=settings.BASE_DIR,
+                check=True,
+            )
+        monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+        settings.METRICAS_TOKEN = "segredo"
+
+        response = api_client.get("/metrics", HTTP_AUTHORIZATION="Bearer segredo")
+
+        familias = text_string_to_metric_families(response.content.decode())
+        amostras = [
+            amostra.value
+            for familia in familias
+            for amostra in familia.samples
+            if amostra.labels.get("excecao") == "ErroDeWorker"
+        ]
+        assert amostras == [2.0]
@@ -3,6 +3,7 @@ from rest_framework.routers import DefaultRouter
 
 from . import viewsets
 from . import views
+from . import views_async
 
 router = DefaultRouter()
 router.register(r"contas", viewsets.ContaViewSet, basename="conta")
@@ -10,9 +11,22 @@ router.register(r"contas", viewsets.ContaViewSet, basename="conta")
 function_based_urls = [
     path("registrar/", views.registrar_cliente, name="registrar_cliente"),
     path("login/", views.autenticar_cliente, name="autenticar_cliente"),
+    path("logout/", views.logout_cliente, name="logout_cliente"),
+    path(
+        "interno/conexoes/",
+        views.estatisticas_conexoes,
+        name="estatisticas_conexoes",
+    ),
+]
+
+# Leitura assíncrona (ver contas/views_async.py)
+async_urls = [
+    path("async/contas/<int:pk>/saldo/", views_async.saldo, name="saldo_async"),
+    path("async/contas/<int:pk>/extrato/", views_async.extrato, name="extrato_async"),
 ]
 
 urlpatterns = [
     path("", include(router.urls)),
     path("", include(function_based_urls)),
+    path("", include(async_urls)),
 ]
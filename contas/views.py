@@ -1,14 +1,29 @@
+import functools
+
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 
 # from django.contrib.auth import authenticate
-from django.shortcuts import get_object_or_404
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.db import OperationalError, connections, router
 
+from contas.conexoes import obter_estatisticas_conexoes
+from contas.idempotencia import idempotente
 from contas.models import Cliente, ContaBancaria, Transacao
+from contas.pagination import ExtratoCursorPagination
+from contas.replicas import ler_da_replica, registrar_escrita
+from contas.services.arquivamento_service import transacoes_arquivadas
+from contas.services.cache_saldo_service import (
+    guardar_conta_do_cliente,
+    guardar_saldo,
+    montar_conta,
+    obter_conta_do_cliente,
+    obter_saldo,
+)
 from contas.services.cliente_services import (
     criar_cliente_e_conta,
     depositar_valor,
@@ -21,12 +36,22 @@ from .serializers import (
     ClienteCreateSerializer,
     LoginSerializer,
     ContaBancariaSerializer,
-    TransacaoSerializer,
     DepositoSaqueSerializer,
     TransferenciaSerializer,
+    CAMPOS_TRANSACAO_VALORES,
+    serializar_transacoes,
 )
 
 
+def _erro_interno(mensagem, exc):
+    # Deadlock ou falha de serialização dentro de uma transação já aberta (a
+    # de @idempotente) sobe para a retentativa que a envolve, em vez de virar 500.
+    conexao = connections[router.db_for_write(ContaBancaria)]
+    if isinstance(exc, OperationalError) and conexao.in_atomic_block:
+        raise exc
+    return Response({"erro": mensagem}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def registrar_cliente(request):
@@ -40,6 +65,9 @@ def registrar_cliente(request):
                 data_nascimento=serializer.validated_data.get("data_nascimento"),
                 senha=serializer.validated_data["password"],
             )
+            # O cliente ainda não está autenticado nesta requisição, então o
+            # middleware não tem como fixá-lo no primário.
+            registrar_escrita(cliente.pk)
 
             cliente_data = ClienteSerializer(cliente).data
             return Response(
@@ -85,6 +113,16 @@ def autenticar_cliente(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+def logout_cliente(request):
+    # Apagar o token também o remove do cache de autenticação (contas/signals.py).
+    if request.auth is not None:
+        request.auth.delete()
+    return Response({"mensagem": "Logout realizado com sucesso."})
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@idempotente
 def deposito(request):
     serializer = DepositoSaqueSerializer(data=request.data)
     if serializer.is_valid():
@@ -92,16 +130,9 @@ def deposito(request):
         valor_req = serializer.validated_data["valor"]
 
         try:
-            conta_bancaria = get_object_or_404(
-                ContaBancaria, numero_conta=numero_conta_req
+            conta_atualizada = depositar_valor(
+                numero_conta_req, valor_req, cliente=request.user
             )
-            if conta_bancaria.cliente != request.user:
-                return Response(
-                    {"erro": "Você não tem permissão para depositar nesta conta."},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            conta_atualizada = depositar_valor(numero_conta_req, valor_req)
 
             conta_data = ContaBancariaSerializer(conta_atualizada).data
             return Response(
@@ -112,6 +143,11 @@ def deposito(request):
                 status=status.HTTP_200_OK,
             )
 
+        except PermissionDenied:
+            return Response(
+                {"erro": "Você não tem permissão para depositar nesta conta."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
         except ObjectDoesNotExist:
             return Response(
                 {"erro": f"Conta {numero_conta_req} não encontrada."},
@@ -119,16 +155,14 @@ def deposito(request):
             )
         except ValueError as e:
             return Response({"erro": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
-            return Response(
-                {"erro": "Ocorreu um erro ao processar o depósito"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        except Exception as exc:
+            return _erro_interno("Ocorreu um erro ao processar o depósito", exc)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotente
 def saque(request):
     serializer = DepositoSaqueSerializer(data=request.data)
     if serializer.is_valid():
@@ -136,16 +170,9 @@ def saque(request):
         valor_req = serializer.validated_data["valor"]
 
         try:
-            conta_bancaria = get_object_or_404(
-                ContaBancaria, numero_conta=numero_conta_req
+            conta_atualizada = sacar_valor(
+                numero_conta_req, valor_req, cliente=request.user
             )
-            if conta_bancaria.cliente != request.user:
-                return Response(
-                    {"erro": "Você não tem permissão para sacar nesta conta."},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            conta_atualizada = sacar_valor(numero_conta_req, valor_req)
 
             conta_data = ContaBancariaSerializer(conta_atualizada).data
             return Response(
@@ -156,21 +183,36 @@ def saque(request):
                 status=status.HTTP_200_OK,
             )
 
-        except ValueError as e:
-            return Response({"erro": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
+        except PermissionDenied:
             return Response(
-                {"erro": "Ocorreu um erro ao processar o saque"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                {"erro": "Você não tem permissão para sacar nesta conta."},
+                status=status.HTTP_403_FORBIDDEN,
             )
+        except ObjectDoesNotExist:
+            return Response(
+                {"erro": f"Conta {numero_conta_req} não encontrada."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except ValueError as e:
+            return Response({"erro": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as exc:
+            return _erro_interno("Ocorreu um erro ao processar o saque", exc)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@ler_da_replica
 def consultar_saldo(request):
     try:
-        conta = ContaBancaria.objects.get(cliente=request.user)
+        conta_id = obter_conta_do_cliente(request.user.pk)
+        entrada = obter_saldo(conta_id) if conta_id is not None else None
+        if entrada is not None:
+            conta = montar_conta(entrada, request.user)
+        else:
+            conta = ContaBancaria.objects.com_cliente().get(cliente=request.user)
+            guardar_conta_do_cliente(request.user.pk, conta.pk)
+            guardar_saldo(conta)
         serializer = ContaBancariaSerializer(conta)
         return Response(serializer.data)
     except ContaBancaria.DoesNotExist:
@@ -192,12 +234,22 @@ def consultar_saldo(request):
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
+@ler_da_replica
 def extrato_transacoes(request):
     try:
-        conta = ContaBancaria.objects.get(cliente=request.user)
-        transacoes = conta.transacoes.all()  # type: ignore
+        conta = ContaBancaria.objects.com_cliente().get(cliente=request.user)
+        paginator = ExtratoCursorPagination()
+        transacoes = paginator.paginate_queryset(
+            conta.transacoes.values_list(  # type: ignore
+                *CAMPOS_TRANSACAO_VALORES, named=True
+            ),
+            request,
+            arquivadas=functools.partial(
+                transacoes_arquivadas, conta, decrescente=True
+            ),
+        )
 
-        transacoes_data = TransacaoSerializer(transacoes, many=True).data
+        transacoes_data = serializar_transacoes(transacoes)
         conta_data = ContaBancariaSerializer(conta).data
 
         return Response(
@@ -207,8 +259,11 @@ def extrato_transacoes(request):
                     "saldo_atual": conta_data["saldo"],
                 },
                 "extrato": transacoes_data,
+                "next": paginator.get_next_link(),
             }
         )
+    except NotFound:
+        raise
     except ContaBancaria.DoesNotExist:
         return Response(
             {"erro": "Nenhuma conta bancária encontrada para este cliente."},
@@ -223,6 +278,7 @@ def extrato_transacoes(request):
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@idempotente
 def transferencia(request):
     serializer = TransferenciaSerializer(data=request.data)
     if serializer.is_valid():
@@ -231,19 +287,11 @@ def transferencia(request):
         valor_transf = serializer.validated_data["valor"]
 
         try:
-            conta_origem_obj = get_object_or_404(
-                ContaBancaria, numero_conta=conta_origem_num
-            )
-            if conta_origem_obj.cliente != request.user:
-                return Response(
-                    {"erro": "Você só pode transferir a partir da sua própria conta."},
-                    status=status.HTTP_403_FORBIDDEN,
-                )
-
-            _, _ = transferir_valor(
+            transferir_valor(
                 conta_origem_numero=conta_origem_num,
                 conta_destino_numero=conta_destino_num,
                 valor_transferencia=valor_transf,
+                cliente=request.user,
             )
 
             return Response(
@@ -253,11 +301,17 @@ def transferencia(request):
                 status=status.HTTP_200_OK,
             )
 
+        except PermissionDenied as e:
+            return Response({"erro": str(e)}, status=status.HTTP_403_FORBIDDEN)
         except ValueError as e:
             return Response({"erro": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        except Exception:
-            return Response(
-                {"erro": "Ocorreu um erro ao processar a transferência."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+        except Exception as exc:
+            return _erro_interno("Ocorreu um erro ao processar a transferência.", exc)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def estatisticas_conexoes(request):
+    # Estatísticas do worker que atendeu a requisição, não do serviço todo.
+    return Response(obter_estatisticas_conexoes())
@@ -0,0 +1,122 @@
+import functools
+
+from asgiref.sync import sync_to_async
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from contas.authentication import autenticar_token_async
+from contas.models import ContaBancaria, Transacao
+from contas.pagination import ExtratoCursorPagination
+from contas.replicas import ler_da_replica
+from contas.services.arquivamento_service import transacoes_arquivadas
+from contas.services.cache_saldo_service import (
+    guardar_saldo,
+    montar_conta,
+    obter_saldo_async,
+)
+from contas.serializers import (
+    CAMPOS_TRANSACAO_VALORES,
+    ContaBancariaSerializer,
+    PeriodoExtratoSerializer,
+    serializar_transacoes,
+)
+from contas.services.exportacao_service import filtrar_periodo
+
+# Caminho de leitura assíncrono (saldo e extrato). São views async do Django,
+# não do DRF (que não tem views async): autenticação, erros e renderização
+# seguem o mesmo formato das views DRF para que os clientes não percebam a
+# diferença. Sob ASGI (uvicorn) cada consulta libera o event loop enquanto
+# espera o banco; sob WSGI continuam funcionando, uma por requisição.
+
+
+def _resposta(dados, status=200, headers=None):
+    return HttpResponse(
+        JSONRenderer().render(dados),
+        status=status,
+        content_type="application/json",
+        headers=headers,
+    )
+
+
+def _resposta_erro(exc):
+    # Mesmo corpo produzido por custom_api_exception_handler.
+    if isinstance(exc, exceptions.ValidationError):
+        return _resposta(exc.detail, exc.status_code)
+    headers = None
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        headers = {"WWW-Authenticate": "Token"}
+    return _resposta({"errors": {"detail": [exc.detail]}}, exc.status_code, headers)
+
+
+def leitura_autenticada(view):
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            credenciais = await autenticar_token_async(request)
+            if credenciais is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = credenciais
+            return await view(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            return _resposta_erro(exc)
+
+    return require_GET(wrapper)
+
+
+async def _exigir_conta_do_cliente(request, pk, contas=None):
+    if contas is None:
+        contas = ContaBancaria.objects.only(
+            "id", "cliente_id", "numero_conta", "saldo", "versao", "arquivado_ate"
+        )
+    conta = await contas.filter(pk=pk, cliente_id=request.user.pk).afirst()
+    if conta is None:
+        raise exceptions.NotFound()
+    return conta
+
+
+@leitura_autenticada
+@ler_da_replica
+async def saldo(request, pk):
+    # Mesmo corpo do retrieve síncrono, com o cliente aninhado.
+    entrada = await obter_saldo_async(pk)
+    if entrada is not None and entrada["cliente_id"] == request.user.pk:
+        conta = montar_conta(entrada, request.user)
+    else:
+        conta = await _exigir_conta_do_cliente(
+            request, pk, ContaBancaria.objects.com_cliente()
+        )
+        await sync_to_async(guardar_saldo)(conta)
+    return _resposta(ContaBancariaSerializer(conta).data)
+
+
+@leitura_autenticada
+@ler_da_replica
+async def extrato(request, pk):
+    conta = await _exigir_conta_do_cliente(request, pk)
+    periodo = PeriodoExtratoSerializer(data=request.GET)
+    periodo.is_valid(raise_exception=True)
+
+    paginator = ExtratoCursorPagination()
+    transacoes = filtrar_periodo(
+        Transacao.objects.filter(conta_id=pk), **periodo.validated_data
+    )
+    consulta = paginator.consulta_pagina(
+        transacoes.values_list(*CAMPOS_TRANSACAO_VALORES, named=True),
+        Request(request),
+    )
+    resultados = [linha async for linha in consulta]
+    if conta.arquivado_ate and len(resultados) <= paginator.page_size_atual:
+        # Página incompleta: o restante pode estar no arquivo frio, lido em
+        # uma thread para não bloquear o event loop.
+        arquivadas = functools.partial(
+            transacoes_arquivadas, conta, decrescente=True, **periodo.validated_data
+        )
+        resultados = await sync_to_async(paginator.completar)(resultados, arquivadas)
+    pagina = paginator.montar_pagina(resultados)
+    return _resposta(
+        {"next": paginator.get_next_link(), "results": serializar_transacoes(pagina)}
+    )
@@ -1,86 +1,227 @@
+import functools
+
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, StreamingHttpResponse
 
+from .idempotencia import idempotente
 from .models import ContaBancaria, Transacao
+from .pagination import ExtratoCursorPagination
+from .replicas import ler_da_replica
 from .serializers import (
     ContaBancariaSerializer,
     TransacaoSerializer,
     OperacaoSerializer,
     TransferenciaInternaSerializer,
+    TransferenciaLoteSerializer,
+    ResultadoTransferenciaLoteSerializer,
+    ExportacaoExtratoSerializer,
+    PeriodoExtratoSerializer,
+    SaldoEmDataSerializer,
+    CAMPOS_TRANSACAO_VALORES,
+    serializar_transacoes,
 )
+from .services.arquivamento_service import transacoes_arquivadas
+from .services.cache_saldo_service import guardar_saldo, montar_conta, obter_saldo
 from .services.cliente_services import depositar_valor, sacar_valor
-from .services.transferencia_service import transferir_valor
+from .services.exportacao_service import (
+    FORMATOS_EXPORTACAO,
+    filtrar_periodo,
+    linhas_extrato,
+)
+from .services.saldo_diario_service import saldo_em
+from .services.transferencia_service import (
+    LoteRejeitadoError,
+    transferir_em_lote,
+    transferir_valor,
+)
 
 
 class ContaViewSet(viewsets.GenericViewSet):
     queryset = ContaBancaria.objects.all()
     permission_classes = [IsAuthenticated]
+    lookup_value_regex = r"\d+"
 
     def get_queryset(self):
-        return ContaBancaria.objects.filter(cliente=self.request.user)
+        return ContaBancaria.objects.com_cliente().filter(cliente=self.request.user)
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         serializer = ContaBancariaSerializer(queryset, many=True)
         return Response(serializer.data)
 
+    @ler_da_replica
     def retrieve(self, request, pk=None):
-        conta = self.get_object()
+        entrada = obter_saldo(int(pk))
+        if entrada is not None and entrada["cliente_id"] == request.user.pk:
+            conta = montar_conta(entrada, request.user)
+        else:
+            # Conta alheia também cai aqui e recebe 404 do get_object.
+            conta = self.get_object()
+            guardar_saldo(conta)
         serializer = ContaBancariaSerializer(conta)
         return Response(serializer.data)
 
-    @action(detail=True, methods=["get"])
+    @action(
+        detail=True,
+        methods=["get"],
+        serializer_class=TransacaoSerializer,
+        pagination_class=ExtratoCursorPagination,
+    )
+    @ler_da_replica
     def extrato(self, request, pk=None):
         conta = self.get_object()
-        transacoes = conta.transacoes.all()
-        serializer = TransacaoSerializer(transacoes, many=True)
-        return Response(serializer.data)
+        periodo = PeriodoExtratoSerializer(data=request.query_params)
+        periodo.is_valid(raise_exception=True)
+        transacoes = filtrar_periodo(conta.transacoes.all(), **periodo.validated_data)
+        page = self.paginator.paginate_queryset(
+            transacoes.values_list(*CAMPOS_TRANSACAO_VALORES, named=True),
+            request,
+            view=self,
+            arquivadas=functools.partial(
+                transacoes_arquivadas,
+                conta,
+                decrescente=True,
+                **periodo.validated_data,
+            ),
+        )
+        return self.get_paginated_response(serializar_transacoes(page))
 
-    @action(detail=True, methods=["post"], serializer_class=OperacaoSerializer)
-    def deposito(self, request, pk=None):
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path="extrato/export",
+        url_name="extrato-export",
+    )
+    def extrato_export(self, request, pk=None):
         conta = self.get_object()
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        filtros = ExportacaoExtratoSerializer(data=request.query_params)
+        filtros.is_valid(raise_exception=True)
 
-        depositar_valor(
-            numero_conta=conta.numero_conta, valor=serializer.validated_data["valor"]
+        formato = filtros.validated_data["formato"]
+        gerador, content_type = FORMATOS_EXPORTACAO[formato]
+        linhas = linhas_extrato(
+            conta,
+            data_inicio=filtros.validated_data.get("data_inicio"),
+            data_fim=filtros.validated_data.get("data_fim"),
         )
-        conta_atualizada = self.get_object()
-        conta_data = ContaBancariaSerializer(conta_atualizada).data
-        return Response(
-            {"mensagem": "Depósito realizado com sucesso.", "conta": conta_data}
+        response = StreamingHttpResponse(gerador(linhas), content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="extrato_{conta.numero_conta}.{formato}"'
         )
+        return response
 
-    @action(detail=True, methods=["post"], serializer_class=OperacaoSerializer)
-    def saque(self, request, pk=None):
+    @action(detail=True, methods=["get"], url_path="saldo-em")
+    @ler_da_replica
+    def saldo_em(self, request, pk=None):
         conta = self.get_object()
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        filtros = SaldoEmDataSerializer(data=request.query_params)
+        filtros.is_valid(raise_exception=True)
 
-        sacar_valor(
-            numero_conta=conta.numero_conta, valor=serializer.validated_data["valor"]
+        data = filtros.validated_data["data"]
+        return Response(
+            {
+                "numero_conta": conta.numero_conta,
+                "data": data,
+                "saldo": f"{saldo_em(conta.pk, data):.2f}",
+            }
         )
-        conta_atualizada = self.get_object()
-        conta_data = ContaBancariaSerializer(conta_atualizada).data
+
+    def _validar_corpo(self):
+        # Conta alheia responde 404 antes de qualquer erro do corpo, como no
+        # get_object das demais ações; a consulta de titularidade só é feita
+        # aqui quando o corpo é inválido (no caminho feliz a operação confere).
+        serializer = self.get_serializer(data=self.request.data)
+        if not serializer.is_valid():
+            if not self.get_queryset().filter(pk=self.kwargs["pk"]).exists():
+                raise Http404
+            raise ValidationError(serializer.errors)
+        return serializer.validated_data
+
+    def _operar(self, operacao, mensagem):
+        # Titularidade, saldo e atualização em uma única ida ao banco; conta
+        # alheia responde 404.
+        dados_validados = self._validar_corpo()
+        try:
+            conta = operacao(
+                conta_id=int(self.kwargs["pk"]),
+                valor=dados_validados["valor"],
+                cliente=self.request.user,
+            )
+        except (ContaBancaria.DoesNotExist, PermissionDenied):
+            raise Http404
         return Response(
-            {"mensagem": "Saque realizado com sucesso.", "conta": conta_data}
+            {"mensagem": mensagem, "conta": ContaBancariaSerializer(conta).data}
         )
 
+    @action(detail=True, methods=["post"], serializer_class=OperacaoSerializer)
+    @idempotente
+    def deposito(self, request, pk=None):
+        return self._operar(depositar_valor, "Depósito realizado com sucesso.")
+
+    @action(detail=True, methods=["post"], serializer_class=OperacaoSerializer)
+    @idempotente
+    def saque(self, request, pk=None):
+        return self._operar(sacar_valor, "Saque realizado com sucesso.")
+
     @action(
         detail=True, methods=["post"], serializer_class=TransferenciaInternaSerializer
     )
+    @idempotente
     def transferencia(self, request, pk=None):
+        dados_validados = self._validar_corpo()
+
+        try:
+            transferir_valor(
+                conta_origem_id=int(pk),
+                conta_destino_numero=dados_validados["conta_destino"],
+                valor_transferencia=dados_validados["valor"],
+                cliente=request.user,
+            )
+        except PermissionDenied:
+            raise Http404
+        return Response({"mensagem": "Transferência realizada com sucesso."})
+
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="transferencias-lote",
+        serializer_class=TransferenciaLoteSerializer,
+    )
+    @idempotente
+    def transferencias_lote(self, request, pk=None):
         conta_origem = self.get_object()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        dados_validados = serializer.validated_data
+        try:
+            conta_origem, resultados = transferir_em_lote(
+                conta_origem_numero=conta_origem.numero_conta,
+                itens=serializer.validated_data["transferencias"],
+                modo=serializer.validated_data["modo"],
+            )
+        except LoteRejeitadoError as e:
+            return Response(
+                {
+                    "erro": str(e),
+                    "resultados": ResultadoTransferenciaLoteSerializer(
+                        e.resultados, many=True
+                    ).data,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-        transferir_valor(
-            conta_origem_numero=conta_origem.numero_conta,
-            conta_destino_numero=dados_validados["conta_destino"],
-            valor_transferencia=dados_validados["valor"],
+        efetuadas = sum(1 for r in resultados if not r["erro"])
+        return Response(
+            {
+                "mensagem": f"{efetuadas} de {len(resultados)} transferências realizadas com sucesso.",
+                "saldo": conta_origem.saldo,
+                "resultados": ResultadoTransferenciaLoteSerializer(
+                    resultados, many=True
+                ).data,
+            }
         )
-        return Response({"mensagem": "Transferência realizada com sucesso."})
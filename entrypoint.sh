@@ -5,6 +5,24 @@ python /app/wait_for_db.py # Chame o script Python
 echo "Aplicando migrações do banco de dados..."
 python manage.py migrate --noinput
 
-echo "Iniciando Gunicorn..."
+# Partições mensais de contas_transacao para os próximos meses (só PostgreSQL).
+python manage.py criar_particoes_transacao
+
+# SERVIDOR_MODO=asgi troca os workers síncronos (2 workers x 2 threads) por
+# workers uvicorn: cada worker atende muitas leituras concorrentes enquanto
+# elas esperam o banco (ver contas/views_async.py).
+SERVIDOR_MODO=${SERVIDOR_MODO:-wsgi}
+WEB_WORKERS=${WEB_WORKERS:-2}
+
+# Métricas do Prometheus somadas entre os workers (contas/metricas.py). O
+# diretório é limpo a cada início para não somar valores de execuções antigas.
+export PROMETHEUS_MULTIPROC_DIR=${PROMETHEUS_MULTIPROC_DIR:-/tmp/metricas}
+rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+echo "Iniciando Gunicorn ($SERVIDOR_MODO)..."
 # Use exec para que Gunicorn se torne o processo principal (PID 1) e receba sinais corretamente
-exec gunicorn banco_project.wsgi:application --bind 0.0.0.0:8000 --workers 2 --threads 2 --worker-tmp-dir /dev/shm
\ No newline at end of file
+if [ "$SERVIDOR_MODO" = "asgi" ]; then
+    exec gunicorn banco_project.asgi:application --bind 0.0.0.0:8000 --workers "$WEB_WORKERS" --worker-class uvicorn_worker.UvicornWorker --worker-tmp-dir /dev/shm
+fi
+exec gunicorn banco_project.wsgi:application --bind 0.0.0.0:8000 --workers "$WEB_WORKERS" --threads 2 --worker-tmp-dir /dev/shm
\ No newline at end of file
@@ -0,0 +1,11 @@
+# Lido automaticamente pelo gunicorn (diretório de trabalho /app).
+import os
+
+
+def child_exit(server, worker):
+    # Com PROMETHEUS_MULTIPROC_DIR, os gauges de um worker que saiu não devem
+    # mais aparecer em /metrics (contadores e histogramas continuam somando).
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)